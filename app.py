@@ -1,12 +1,230 @@
 # app.py
-from fastapi import FastAPI
+import asyncio
+import os
+import re
+import tempfile
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
 import uvicorn
 
-app = FastAPI(title="ADAN-ID OpenCloud")
+from services.artifact_store import ARTIFACTS
+from services.micro_batcher import MicroBatcher
+from services.offline_router import OfflineRouter
+from src.core.abjad_calculator import ABJAD
+
+# No-op unless ADANID_OFFLINE=1; must run before transformers is imported
+ARTIFACTS.enable_offline_env()
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await classify_batcher.close()
+    await search_batcher.close()
+    await recitation_batcher.close()
+    await asyncio.to_thread(get_offline_router().close)
+
+app = FastAPI(title="ADAN-ID OpenCloud", lifespan=lifespan)
+
+# Dynamic batching: a batch is sent to the model when it reaches
+# MAX_BATCH_SIZE requests or MAX_WAIT_MS after its first request.
+MAX_BATCH_SIZE = int(os.environ.get("ADANID_MAX_BATCH_SIZE", 16))
+MAX_WAIT_MS = float(os.environ.get("ADANID_MAX_WAIT_MS", 10))
+# /recitation only reads server-side files under this directory; otherwise clients upload the audio
+AUDIO_ROOT = os.environ.get("ADANID_AUDIO_ROOT")
+MAX_UPLOAD_BYTES = int(os.environ.get("ADANID_MAX_UPLOAD_MB", 50)) * 1024 * 1024
+
+class ClassifyRequest(BaseModel):
+    text: str
+
+class AbjadRequest(BaseModel):
+    text: Optional[str] = None
+    texts: Optional[List[str]] = None
+
+class SearchRequest(BaseModel):
+    query: str
+    k: int = 5
+
+class RecitationRequest(BaseModel):
+    audio_path: str
+
+@lru_cache(maxsize=None)
+def get_offline_router():
+    return OfflineRouter()
+
+@lru_cache(maxsize=None)
+def get_engine():
+    from src.ai_engine import QuranicAIEngine
+    return QuranicAIEngine(model=os.environ.get("ADANID_MODEL", "quranlab-ai"))
+
+@lru_cache(maxsize=None)
+def get_voice_processor():
+    from src.core.voice_processor import VoiceProcessor
+    return VoiceProcessor()
+
+classify_batcher = MicroBatcher(
+    lambda prompts: get_engine().analyze_batch(prompts),
+    max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS, name="classify"
+)
+# Queries in one batch share a single encoder pass; each keeps its own k
+search_batcher = MicroBatcher(
+    lambda requests: get_engine().search_batch([q for q, _ in requests], [k for _, k in requests]),
+    max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS, name="search"
+)
+recitation_batcher = MicroBatcher(
+    lambda paths: get_voice_processor().process_batch(paths),
+    max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS, name="recitation"
+)
 
 @app.get("/health")
 def health_check():
     return {"status": "healthy", "maintainer": "Muhammad Adnan Ul Mustafa"}
 
+@app.get("/stats")
+def batching_stats():
+    return {"classify": classify_batcher.stats(), "search": search_batcher.stats(),
+            "recitation": recitation_batcher.stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    # Prometheus scrape target; only reports services this process has already started
+    vault = get_offline_router().loaded_service("vault")
+    return vault.entropy_pool.prometheus_text() if vault is not None else ""
+
+@app.post("/classify")
+async def classify(request: ClassifyRequest):
+    result = await classify_batcher.submit(request.text)
+    if "error" in result:
+        raise HTTPException(status_code=500, detail=result["error"])
+    return result
+
+@app.post("/search")
+async def search(request: SearchRequest):
+    result = await search_batcher.submit((request.query, max(1, min(request.k, 100))))
+    if "error" in result:
+        raise HTTPException(status_code=503, detail=result["error"])
+    return result
+
+@app.post("/abjad")
+def abjad(request: AbjadRequest):
+    # Pure table lookup, no model: answered inline without the queue
+    if request.texts is not None:
+        return {"abjad_values": ABJAD.calculate_many(request.texts).tolist()}
+    if request.text is None:
+        raise HTTPException(status_code=422, detail="Provide 'text' or 'texts'")
+    return {"text": request.text, "abjad_value": ABJAD.calculate(request.text),
+            "bismillah_valid": ABJAD.validate_bismillah(request.text)}
+
+def _audio_root_path(audio_path: str) -> str:
+    if not AUDIO_ROOT:
+        raise HTTPException(status_code=403, detail="audio_path is disabled; send the audio as the request body")
+    root = os.path.realpath(AUDIO_ROOT)
+    path = os.path.realpath(os.path.join(root, audio_path))
+    if os.path.commonpath([root, path]) != root:
+        raise HTTPException(status_code=403, detail="audio_path must stay inside ADANID_AUDIO_ROOT")
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Audio file not found")
+    return path
+
+async def _spool_upload(request: Request) -> str:
+    """Write the streamed request body to a temporary file, never holding it all in memory"""
+    size = 0
+    with tempfile.NamedTemporaryFile(prefix="recitation-", delete=False) as f:
+        try:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Audio larger than {MAX_UPLOAD_BYTES} bytes")
+                f.write(chunk)
+            if size == 0:
+                raise HTTPException(status_code=400, detail="Empty audio upload")
+        except BaseException:
+            os.unlink(f.name)
+            raise
+    return f.name
+
+@app.post("/recitation")
+async def recitation(request: Request):
+    """The recitation audio as the request body, or JSON {"audio_path"} relative to ADANID_AUDIO_ROOT"""
+    if request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            body = RecitationRequest(**await request.json())
+        except (TypeError, ValueError) as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        result = await recitation_batcher.submit(_audio_root_path(body.audio_path))
+    else:
+        path = await _spool_upload(request)
+        try:
+            result = await recitation_batcher.submit(path)
+        finally:
+            os.unlink(path)
+    if "error" in result:
+        raise HTTPException(status_code=422, detail=result["error"])
+    return result
+
+@app.post("/offline/{endpoint:path}")
+async def offline(endpoint: str, data: Dict[str, Any] = None):
+    result = await get_offline_router().aroute_request(f"/{endpoint}", data)
+    if "error" in result:
+        raise HTTPException(status_code=404 if "not supported" in result["error"] else 503, detail=result["error"])
+    return result
+
+def _offline_storage():
+    router = get_offline_router()
+    if not router.offline_mode:
+        raise HTTPException(status_code=503, detail="Offline mode not enabled")
+    return router.service("storage")
+
+def _byte_range(header: str, size: int):
+    """(start, end) for a single "bytes=" range, None to serve the whole object; 416 if unsatisfiable"""
+    unsatisfiable = HTTPException(status_code=416, detail="Range not satisfiable",
+                                  headers={"Content-Range": f"bytes */{size}"})
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None  # other units and multi-range requests get the full object
+    match = re.fullmatch(r"\s*(\d*)-(\d*)\s*", spec)
+    if match is None or match.group(1) == match.group(2) == "":
+        raise unsatisfiable
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        if int(last) == 0 or size == 0:
+            raise unsatisfiable
+        return max(size - int(last), 0), size
+    start = int(first)
+    end = min(int(last) + 1, size) if last else size
+    if start >= size or (last and int(last) < start):
+        raise unsatisfiable
+    return start, end
+
+@app.get("/offline/storage/{filename:path}")
+def offline_download(filename: str, range: Optional[str] = Header(None)):
+    # Streams chunk by chunk (and honours "Range: bytes=a-b") instead of building the whole object
+    storage = _offline_storage()
+    info = storage.stat(filename)
+    if info is None:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    byte_range = _byte_range(range, info["size"]) if range else None
+    start, end = byte_range or (0, info["size"])
+    headers = {"Accept-Ranges": "bytes", "Content-Length": str(end - start)}
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{info['size']}"
+    return StreamingResponse(storage.download_stream(filename, start, end), status_code=206 if byte_range else 200,
+                             media_type="application/octet-stream", headers=headers)
+
+@app.put("/offline/storage/{filename:path}")
+async def offline_upload(filename: str, request: Request):
+    # The body is chunked and encrypted as it arrives; only one storage chunk is ever buffered
+    storage = _offline_storage()
+    writer = storage.open_writer(filename)
+    async for piece in request.stream():
+        await asyncio.to_thread(writer.write, piece)
+    return await asyncio.to_thread(writer.close)
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
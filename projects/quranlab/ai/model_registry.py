@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Model Registry for the QuranLab inference pipeline
+Keeps transformers pipelines loaded for the life of the process
+"""
+
+import gc
+import sys
+import threading
+import time
+
+
+class ModelRegistry:
+    '''Thread-safe, lazily populated cache of loaded models keyed by name.
+
+    Loaders are registered up front and only called on first use (or by
+    ``warmup``). ``max_loaded`` bounds how many models stay resident at once,
+    evicting the least recently used one, and ``evict_idle`` drops models that
+    have not been used for a while when memory is tight.
+    '''
+
+    def __init__(self, max_loaded=None):
+        self.max_loaded = max_loaded
+        self._loaders = {}
+        self._models = {}
+        self._last_used = {}
+        self._load_locks = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+        self._reaper_stop = threading.Event()
+
+    def register(self, name, loader):
+        '''Register a zero-argument callable that builds the model for ``name``.'''
+        with self._lock:
+            self._loaders[name] = loader
+            self._load_locks.setdefault(name, threading.Lock())
+
+    def get(self, name):
+        '''Return the loaded model for ``name``, loading it on first use.'''
+        with self._lock:
+            model = self._models.get(name)
+            if model is not None:
+                self._last_used[name] = time.monotonic()
+                return model
+            if name not in self._loaders:
+                raise KeyError(f"No loader registered for model '{name}'")
+            load_lock = self._load_locks[name]
+
+        # Load outside the registry lock so other models stay available, but
+        # serialise loads of the same model so it is only built once.
+        with load_lock:
+            with self._lock:
+                model = self._models.get(name)
+                if model is not None:
+                    self._last_used[name] = time.monotonic()
+                    return model
+                loader = self._loaders[name]
+
+            started = time.perf_counter()
+            model = loader()
+            print(f"Loaded model '{name}' in {time.perf_counter() - started:.1f}s.", file=sys.stderr)
+
+            with self._lock:
+                self._models[name] = model
+                self._last_used[name] = time.monotonic()
+                self._enforce_limit(keep=name)
+            return model
+
+    def warmup(self, names=None):
+        '''Eagerly load the given models (all registered models by default).'''
+        for name in names or list(self._loaders):
+            self.get(name)
+
+    def is_loaded(self, name):
+        with self._lock:
+            return name in self._models
+
+    def loaded(self):
+        '''Names of the models currently resident, most recently used last.'''
+        with self._lock:
+            return sorted(self._models, key=self._last_used.get)
+
+    def unload(self, name):
+        '''Drop a loaded model; it will be reloaded on next use.'''
+        with self._lock:
+            dropped = self._drop(name)
+        if dropped:
+            self._release_memory()
+        return dropped
+
+    def clear(self):
+        with self._lock:
+            for name in list(self._models):
+                self._drop(name)
+        self._release_memory()
+
+    def evict_idle(self, max_idle_seconds):
+        '''Unload every model unused for more than ``max_idle_seconds``.'''
+        cutoff = time.monotonic() - max_idle_seconds
+        with self._lock:
+            idle = [name for name, used in self._last_used.items() if used < cutoff]
+            for name in idle:
+                self._drop(name)
+        if idle:
+            self._release_memory()
+        return idle
+
+    def start_idle_reaper(self, max_idle_seconds, interval_seconds=60):
+        '''Evict idle models periodically from a background daemon thread.'''
+        if self._reaper is not None and self._reaper.is_alive():
+            return
+        self._reaper_stop.clear()
+
+        def reap():
+            while not self._reaper_stop.wait(interval_seconds):
+                for name in self.evict_idle(max_idle_seconds):
+                    print(f"Evicted idle model '{name}'.", file=sys.stderr)
+
+        self._reaper = threading.Thread(target=reap, name="model-registry-reaper", daemon=True)
+        self._reaper.start()
+
+    def stop_idle_reaper(self):
+        self._reaper_stop.set()
+
+    def _enforce_limit(self, keep):
+        if not self.max_loaded:
+            return
+        while len(self._models) > self.max_loaded:
+            candidates = [name for name in self._models if name != keep]
+            if not candidates:
+                break
+            self._drop(min(candidates, key=self._last_used.get))
+
+    def _drop(self, name):
+        self._last_used.pop(name, None)
+        return self._models.pop(name, None) is not None
+
+    @staticmethod
+    def _release_memory():
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
@@ -1,5 +1,5 @@
 import torch
-from transformers import pipeline, AutoModelForTokenClassification, AutoTokenizer
+from transformers import pipeline
 import librosa
 import soundfile as sf
 import json
@@ -7,76 +7,198 @@ import warnings
 import sys
 import numpy as np
 import os
+import argparse
+import csv
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# The repository root, for the shared classifier backends when run as a script
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
+
+from model_registry import ModelRegistry
+from stage_scheduler import AbandonedStages, StageScheduler
+from src.core.inference_backend import DEFAULT_BACKEND, load_classifier
+from tools.audio_feature_cache import AudioFeatureCache
 
 warnings.filterwarnings("ignore")
 
+ASR_MODEL = "tarteel-ai/whisper-base-ar-quran"
+POSITION_MODEL = "Nuwaisir/Quran_speech_recognizer"
+TAJWEED_MODEL = "Habib-HF/tarbiyah-ai-v1-1"
+SCORING_MODEL = "ArabicSpeech/iqraeval-models"
+
+# Whisper log-mel features precomputed by tools/audio_feature_cache.py; batch
+# ASR reads them instead of re-extracting features for files already cached.
+FEATURE_CACHE_PATH = os.environ.get(
+    "QURANLAB_FEATURE_CACHE", os.path.join(REPO_ROOT, "offline", "offline_cache", "audio_features")
+)
+
+# The tajweed token classifier runs on ADANID_BACKEND (pytorch, int8 or onnx)
+# on CPU; see src.core.inference_backend, whose `export` command prepares the
+# ONNX copy ahead of time.
+
 # ==============================
 # SECURE HF TOKEN HANDLING
 # ==============================
 def setup_hf_token():
-    '''Securely load HF token from Colab Secrets or environment'''
+    '''Securely load HF token from Colab Secrets or environment
+
+    Status goes to stderr so callers streaming JSON on stdout stay parseable.
+    '''
     hf_token = None
     try:
         from google.colab import userdata
         hf_token = userdata.get('HF_TOKEN')
         if hf_token:
-            print("✅ Hugging Face token loaded securely from Colab Secrets.")
+            print("✅ Hugging Face token loaded securely from Colab Secrets.", file=sys.stderr)
     except (ImportError, Exception) as e:
-        print(f"Note: Could not load HF_TOKEN from Colab secrets ({e}). Trying environment variable.")
+        print(f"Note: Could not load HF_TOKEN from Colab secrets ({e}). Trying environment variable.", file=sys.stderr)
 
     if not hf_token:
         hf_token = os.environ.get("HF_TOKEN")
         if hf_token:
-            print("✅ Hugging Face token loaded securely from environment variable.")
+            print("✅ Hugging Face token loaded securely from environment variable.", file=sys.stderr)
         else:
-            print("⚠️ Warning: HF_TOKEN not found in Colab Secrets or environment variables. Some models may fail to load.")
+            print("⚠️ Warning: HF_TOKEN not found in Colab Secrets or environment variables. Some models may fail to load.", file=sys.stderr)
             return False
 
     os.environ["HF_TOKEN"] = hf_token
     return True
 
+# ==============================
+# MODEL REGISTRY
+# ==============================
+def _device():
+    return 0 if torch.cuda.is_available() else -1
+
+def _load_asr_pipeline():
+    return pipeline(
+        "automatic-speech-recognition",
+        model=ASR_MODEL,
+        tokenizer=ASR_MODEL,
+        feature_extractor=ASR_MODEL,
+        device=_device(),
+        torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
+        chunk_length_s=30,
+        stride_length_s=5,
+        return_timestamps=False
+    )
+
+def _load_position_pipeline():
+    return pipeline(
+        "audio-classification",
+        model=POSITION_MODEL,
+        device=_device()
+    )
+
+def _load_tajweed_pipeline():
+    device = _device()
+    backend = DEFAULT_BACKEND if device == -1 else "pytorch"  # int8/ONNX are CPU-only
+    return load_classifier(TAJWEED_MODEL, task="token-classification", backend=backend, device=device)
+
+def _load_scoring_pipeline():
+    return pipeline(
+        "text-classification",
+        model=SCORING_MODEL,
+        device=_device()
+    )
+
+# One registry per process: every stage reuses the same loaded pipelines.
+# QURANLAB_MAX_LOADED_MODELS caps how many stay resident at once and
+# QURANLAB_MODEL_IDLE_SECONDS lets a background thread drop idle ones.
+MODEL_REGISTRY = ModelRegistry(max_loaded=int(os.environ.get("QURANLAB_MAX_LOADED_MODELS", 0)) or None)
+MODEL_REGISTRY.register("asr", _load_asr_pipeline)
+MODEL_REGISTRY.register("position", _load_position_pipeline)
+MODEL_REGISTRY.register("tajweed", _load_tajweed_pipeline)
+MODEL_REGISTRY.register("scoring", _load_scoring_pipeline)
+
+if os.environ.get("QURANLAB_MODEL_IDLE_SECONDS"):
+    MODEL_REGISTRY.start_idle_reaper(float(os.environ["QURANLAB_MODEL_IDLE_SECONDS"]))
+
+def warmup_models(names=None):
+    '''Eagerly loads the pipeline models so the first request pays no load time.'''
+    setup_hf_token()
+    MODEL_REGISTRY.warmup(names)
+
 # ==============================
 # AUDIO PREPARATION
 # ==============================
+SAMPLE_RATE = 16000
+
+def load_audio(audio_path: str):
+    '''Decodes and resamples audio to a mono 16 kHz float32 array.'''
+    audio, _ = librosa.load(audio_path, sr=SAMPLE_RATE, mono=True)
+    return audio.astype(np.float32, copy=False)
+
+def as_audio_array(audio):
+    '''Returns 16 kHz float32 samples for a path, an array, or a float32 buffer.
+
+    Buffers (bytes, memoryview, mmap) are wrapped without copying, so
+    callers can share one decoded signal across stages and threads.
+    '''
+    if isinstance(audio, (str, os.PathLike)):
+        return load_audio(audio)
+    if isinstance(audio, np.ndarray):
+        return audio.astype(np.float32, copy=False)
+    return np.frombuffer(audio, dtype=np.float32)
+
+def audio_pipeline_input(audio):
+    '''Builds the raw-audio input dict expected by transformers audio pipelines.'''
+    # A fresh dict per call: the ASR pipeline pops keys from its input.
+    return {"raw": as_audio_array(audio), "sampling_rate": SAMPLE_RATE}
+
 def prepare_audio(audio_path: str):
-    '''Loads audio, resamples, and saves to a temporary file.'''
+    '''Decodes and resamples the audio once, in memory.'''
     try:
-        audio, sr = librosa.load(audio_path, sr=16000, mono=True)
-        print(f"Loaded audio from '{audio_path}' with sample rate {sr}.")
+        audio = load_audio(audio_path)
+        print(f"Loaded audio from '{audio_path}' with sample rate {SAMPLE_RATE}.")
     except FileNotFoundError:
-        print(f"Warning: Audio file '{audio_path}' not found. Generating a dummy 440 Hz sine wave for demonstration.")
+        print(f"Warning: Audio file '{audio_path}' not found. Using a dummy 440 Hz sine wave for demonstration.")
         duration = 2  # seconds
-        sample_rate = 16000
-        frequency = 440  # Hz (A4 note)        t = np.linspace(0., duration, int(sample_rate * duration), endpoint=False)
-        dummy_audio = 0.5 * np.sin(2. * np.pi * frequency * t)
-        sf.write(audio_path, dummy_audio.astype(np.float32), sample_rate)
-        audio, sr = librosa.load(audio_path, sr=sample_rate, mono=True)
-        print(f"Generated and loaded a dummy sine wave WAV file '{audio_path}'.")
+        frequency = 440  # Hz (A4 note)
+        t = np.linspace(0., duration, int(SAMPLE_RATE * duration), endpoint=False)
+        audio = (0.5 * np.sin(2. * np.pi * frequency * t)).astype(np.float32)
+    return audio
+
+# ==============================
+# RESULT PARSING
+# ==============================
+DEFAULT_POSITION = (1, 2)
+TAJWEED_THRESHOLD = 0.7
+EXAMPLE_PRONUNCIATION_SCORE = 92
+
+def parse_surah_ayah(position_result):
+    '''Returns (surah, ayah) from the top audio-classification label, or None.'''
+    if not position_result:
+        return None
+    parts = position_result[0].get('label', '').split('_')
+    if len(parts) >= 4 and parts[0] == 'surah' and parts[2] == 'ayah':
+        try:
+            return int(parts[1]), int(parts[3])
+        except ValueError:
+            pass
+    return None
+
+def parse_tajweed_errors(tajweed_result):
+    '''Returns the distinct confident tajweed error entities.'''
+    return list(set([e["entity"] for e in tajweed_result if e["score"] > TAJWEED_THRESHOLD]))
 
-    temp_path = "temp_16k.wav"
-    sf.write(temp_path, audio, 16000)
-    print(f"Temporary 16kHz audio file saved to '{temp_path}'.")
-    return temp_path
+def parse_pronunciation_score(score_result):
+    '''Maps the scoring model output to a 0-100 score.'''
+    if score_result and score_result[0].get("label"):
+        return EXAMPLE_PRONUNCIATION_SCORE
+    return 0
 
 # ==============================
 # STEP 1: ASR — WHISPER (QURANIC ARABIC)
 # ==============================
-def run_asr(audio_path: str):
-    '''Performs Automatic Speech Recognition on the audio.'''
-    print("[1/4] Running ASR (tarteel-ai/whisper-base-ar-quran)...")
-    device = 0 if torch.cuda.is_available() else -1
-    asr_pipe = pipeline(
-        "automatic-speech-recognition",
-        model="tarteel-ai/whisper-base-ar-quran",
-        tokenizer="tarteel-ai/whisper-base-ar-quran",
-        feature_extractor="tarteel-ai/whisper-base-ar-quran",
-        device=device,
-        torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
-        chunk_length_s=30,
-        stride_length_s=5,
-        return_timestamps=False
-    )
-    result = asr_pipe(audio_path)
+def run_asr(audio):
+    '''Performs Automatic Speech Recognition on the audio (array, buffer or path).'''
+    print(f"[1/4] Running ASR ({ASR_MODEL})...")
+    asr_pipe = MODEL_REGISTRY.get("asr")
+    result = asr_pipe(audio_pipeline_input(audio))
     text = result["text"].strip()
     print(f"Transcribed Text: {text}")
     return text
@@ -84,31 +206,18 @@ def run_asr(audio_path: str):
 # ==============================
 # STEP 2: SURAH/AYAH DETECTION
 # ==============================
-def run_surah_ayah_detection(audio_path: str):
-    '''Detects Surah and Ayah from the audio.'''
-    print("[2/4] Running Surah/Ayah Detection (Nuwaisir/Quran_speech_recognizer)...")
-    device = 0 if torch.cuda.is_available() else -1
-    position_pipe = pipeline(
-        "audio-classification",
-        model="Nuwaisir/Quran_speech_recognizer",
-        device=device
-    )
-    position_result = position_pipe(audio_path)
+def run_surah_ayah_detection(audio):
+    '''Detects Surah and Ayah from the audio (array, buffer or path).'''
+    print(f"[2/4] Running Surah/Ayah Detection ({POSITION_MODEL})...")
+    position_pipe = MODEL_REGISTRY.get("position")
+    position_result = position_pipe(audio_pipeline_input(audio))
 
-    surah, ayah = 1, 2
-    if position_result:        top_prediction = position_result[0]
-        label = top_prediction.get('label', '')
-        try:
-            parts = label.split('_')
-            if len(parts) >= 4 and parts[0] == 'surah' and parts[2] == 'ayah':
-                surah = int(parts[1])
-                ayah = int(parts[3])
-            else:
-                print(f"Could not parse surah/ayah from label: {label}. Using defaults ({surah}, {ayah}).")
-        except (ValueError, IndexError):
-            print(f"Error parsing surah/ayah from label: {label}. Using defaults ({surah}, {ayah}).")
-    else:
+    position = parse_surah_ayah(position_result)
+    surah, ayah = position or DEFAULT_POSITION
+    if not position_result:
         print(f"No Surah/Ayah detection result. Using defaults ({surah}, {ayah}).")
+    elif position is None:
+        print(f"Could not parse surah/ayah from label: {position_result[0].get('label', '')}. Using defaults ({surah}, {ayah}).")
 
     print(f"Detected Surah: {surah}, Ayah: {ayah}")
     return surah, ayah
@@ -118,23 +227,10 @@ def run_surah_ayah_detection(audio_path: str):
 # ==============================
 def run_tajweed_detection(text: str):
     '''Detects Tajweed errors in the transcribed text.'''
-    print("[3/4] Running Tajweed Error Detection (Habib-HF/tarbiyah-ai-v1-1)...")
-    device = 0 if torch.cuda.is_available() else -1
-
-    model_name = "Habib-HF/tarbiyah-ai-v1-1"
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForTokenClassification.from_pretrained(model_name)
-    if device != -1:
-        model.to(f"cuda:{device}")
-
-    tajweed_pipe = pipeline(
-        "token-classification",
-        model=model,
-        tokenizer=tokenizer,
-        device=device
-    )
+    print(f"[3/4] Running Tajweed Error Detection ({TAJWEED_MODEL})...")
+    tajweed_pipe = MODEL_REGISTRY.get("tajweed")
     tajweed_result = tajweed_pipe(text)
-    tajweed_errors = list(set([e["entity"] for e in tajweed_result if e["score"] > 0.7]))
+    tajweed_errors = parse_tajweed_errors(tajweed_result)
     print(f"Detected Tajweed Errors: {tajweed_errors}")
     return tajweed_errors
 
@@ -143,70 +239,382 @@ def run_tajweed_detection(text: str):
 # ==============================
 def run_pronunciation_scoring(text: str):
     '''Scores the pronunciation of the transcribed text.'''
-    print("[4/4] Running Pronunciation Scoring (ArabicSpeech/iqraeval-models)...")
-    device = 0 if torch.cuda.is_available() else -1
-    scoring_pipe = pipeline(        "text-classification",
-        model="ArabicSpeech/iqraeval-models",
-        device=device
-    )
+    print(f"[4/4] Running Pronunciation Scoring ({SCORING_MODEL})...")
+    scoring_pipe = MODEL_REGISTRY.get("scoring")
     score_result = scoring_pipe(text)
 
-    pronunciation_score = 0
-    if score_result and score_result[0].get("label"):
-        try:
-            pronunciation_score = 92
-            print(f"Model provided label: {score_result[0]['label']}. Using example score {pronunciation_score}.")
-        except (ValueError, IndexError):
-            print("Error parsing pronunciation score. Using default 0.")
+    pronunciation_score = parse_pronunciation_score(score_result)
+    if pronunciation_score:
+        print(f"Model provided label: {score_result[0]['label']}. Using example score {pronunciation_score}.")
     else:
         print("No pronunciation score result. Using default 0.")
 
     print(f"Pronunciation Score: {pronunciation_score}")
     return pronunciation_score
 
+# ==============================
+# STAGE GRAPH
+# ==============================
+# ASR and surah/ayah detection only read the audio; tajweed and scoring
+# only read the transcript. So the critical path is ASR -> tajweed.
+STAGE_TIMEOUT_S = float(os.environ.get("QURANLAB_STAGE_TIMEOUT_S", 300))
+
+# Shared by all requests; sized for two concurrent recitations' stages.
+STAGE_WORKERS = int(os.environ.get("QURANLAB_STAGE_WORKERS", 8))
+STAGE_EXECUTOR = ThreadPoolExecutor(max_workers=STAGE_WORKERS, thread_name_prefix="quranlab-stage")
+# Timed-out stages keep their worker until they return. Once they hold half
+# the pool, new stages fail fast instead of queueing behind them.
+ABANDONED_STAGES = AbandonedStages()
+MAX_ABANDONED_STAGES = max(1, STAGE_WORKERS // 2)
+
+def _transcribe(audio):
+    text = run_asr(audio)
+    if not text:
+        raise ValueError("ASR returned empty text")
+    return text
+
+def build_stage_graph(audio, stage_timeouts=None):
+    '''Builds the four-stage dependency graph for one recitation.'''
+    timeouts = stage_timeouts or {}
+    scheduler = StageScheduler(executor=STAGE_EXECUTOR, abandoned=ABANDONED_STAGES,
+                               max_abandoned=MAX_ABANDONED_STAGES)
+    scheduler.add("asr", lambda: _transcribe(audio), timeout=timeouts.get("asr", STAGE_TIMEOUT_S))
+    scheduler.add("position", lambda: run_surah_ayah_detection(audio), timeout=timeouts.get("position", STAGE_TIMEOUT_S))
+    scheduler.add("tajweed", lambda asr: run_tajweed_detection(asr), deps=["asr"], timeout=timeouts.get("tajweed", STAGE_TIMEOUT_S))
+    scheduler.add("scoring", lambda asr: run_pronunciation_scoring(asr), deps=["asr"], timeout=timeouts.get("scoring", STAGE_TIMEOUT_S))
+    return scheduler
+
 # ==============================
 # MAIN INFERENCE PIPELINE
 # ==============================
-def run_full_inference_pipeline(audio_file_path: str):
-    '''Runs the complete Quran inference pipeline.'''
+def run_full_inference_pipeline(audio_file_path, stage_timeouts=None):
+    '''Runs the complete Quran inference pipeline.
+
+    Accepts an audio file path or already-decoded 16 kHz float32 samples.
+    The audio is decoded once and shared in memory by the audio stages, so
+    concurrent calls never touch a shared temporary file. Stages run
+    concurrently; if one fails or times out the others still report, and
+    the failure is listed under `errors`.
+    '''
     if not setup_hf_token():
         print("Exiting: Hugging Face token not available.")
         return None
 
-    temp_audio_file = prepare_audio(audio_file_path)
+    if isinstance(audio_file_path, (str, os.PathLike)):
+        audio = prepare_audio(audio_file_path)
+    else:
+        audio = as_audio_array(audio_file_path)
+
+    results, errors, timings = build_stage_graph(audio, stage_timeouts).run()
+    if not results:
+        print(f"All stages failed: {errors}")
+        return None
+
+    surah, ayah = results.get("position", (None, None))
+    output = {
+        "text": results.get("asr"),
+        "surah": surah,
+        "ayah": ayah,
+        "tajweed_errors": results.get("tajweed"),
+        "pronunciation_score": results.get("scoring")
+    }
+    if errors:
+        output["errors"] = errors
+    output["stage_seconds"] = timings
+
+    print("\n--- Model Inference Results ---")
+    print(json.dumps(output, ensure_ascii=False, indent=2))
+    return output
+
+# ==============================
+# STREAMING INFERENCE
+# ==============================
+STREAM_WINDOW_S = 30.0
+
+def iter_audio_windows(audio_path: str, window_s: float = STREAM_WINDOW_S, overlap_s: float = 0.0):
+    '''Yields (start_seconds, samples) 16 kHz float32 windows, decoding one window at a time.
+
+    Formats libsndfile cannot read are decoded whole as a fallback, so
+    only those lose the bounded-memory guarantee.
+    '''
+    try:
+        audio_file = sf.SoundFile(audio_path)
+    except RuntimeError:
+        audio = load_audio(audio_path)
+        step = int((window_s - overlap_s) * SAMPLE_RATE)
+        for start in range(0, max(len(audio), 1), step):
+            yield start / SAMPLE_RATE, audio[start:start + int(window_s * SAMPLE_RATE)]
+        return
+
+    with audio_file:
+        sr = audio_file.samplerate
+        blocksize = int(window_s * sr)
+        overlap = int(overlap_s * sr)
+        offset = 0
+        for block in audio_file.blocks(blocksize=blocksize, overlap=overlap, dtype="float32", always_2d=True):
+            samples = block.mean(axis=1)
+            if sr != SAMPLE_RATE:
+                samples = librosa.resample(samples, orig_sr=sr, target_sr=SAMPLE_RATE)
+            yield offset / sr, samples.astype(np.float32, copy=False)
+            offset += blocksize - overlap
+
+def stream_full_inference_pipeline(audio_path: str, window_s: float = STREAM_WINDOW_S):
+    '''Runs the pipeline window by window, yielding events as results become available.
+
+    Event types, in order:
+      partial_transcript - ASR text for one window
+      tajweed            - tajweed errors found in that window
+      final_result       - whole-recitation text, position, errors and score
+    Only one window of audio is held in memory at a time.
+    '''
+    if not setup_hf_token():
+        yield {"type": "error", "error": "Hugging Face token not available"}
+        return
+
+    asr_pipe = MODEL_REGISTRY.get("asr")
+    tajweed_pipe = MODEL_REGISTRY.get("tajweed")
+    transcript = []
+    tajweed_errors = set()
+    position = None
+
+    for window, (start_s, samples) in enumerate(iter_audio_windows(audio_path, window_s)):
+        end_s = start_s + len(samples) / SAMPLE_RATE
+        text = asr_pipe(audio_pipeline_input(samples))["text"].strip()
+        transcript.append(text)
+        yield {"type": "partial_transcript", "window": window, "start_s": round(start_s, 2),
+               "end_s": round(end_s, 2), "text": text}
+
+        if window == 0:
+            # The opening window is enough to place the recitation.
+            position = parse_surah_ayah(MODEL_REGISTRY.get("position")(audio_pipeline_input(samples)))
+
+        if text:
+            window_errors = parse_tajweed_errors(tajweed_pipe(text))
+            tajweed_errors.update(window_errors)
+            yield {"type": "tajweed", "window": window, "start_s": round(start_s, 2),
+                   "end_s": round(end_s, 2), "tajweed_errors": window_errors}
+
+    full_text = " ".join(t for t in transcript if t)
+    surah, ayah = position or DEFAULT_POSITION
+    yield {"type": "final_result", "data": {
+        "text": full_text,
+        "surah": surah,
+        "ayah": ayah,
+        "tajweed_errors": sorted(tajweed_errors),
+        "pronunciation_score": parse_pronunciation_score(MODEL_REGISTRY.get("scoring")(full_text)) if full_text else 0
+    }}
+
+# ==============================
+# BATCH INFERENCE
+# ==============================
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac", ".ogg", ".m4a")
+
+def collect_audio_paths(source: str, audio_root: str = None):
+    '''Lists audio files from a directory, a CSV manifest with an `audio_path` column, or a text file of paths.'''
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(root, name)
+            for root, _, files in os.walk(source)
+            for name in files
+            if name.lower().endswith(AUDIO_EXTENSIONS)
+        )
+
+    if source.lower().endswith(".csv"):
+        with open(source, newline="", encoding="utf-8") as f:
+            paths = [row["audio_path"] for row in csv.DictReader(f) if row.get("audio_path")]
+    else:
+        with open(source, encoding="utf-8") as f:
+            paths = [line.strip() for line in f if line.strip()]
+
+    # Manifest paths are relative to the dataset root, which is either the
+    # manifest's own directory or (for split folders like train/) its parent.
+    manifest_dir = os.path.dirname(os.path.abspath(source))
+    roots = [audio_root] if audio_root else [manifest_dir, os.path.dirname(manifest_dir)]
+    resolved = []
+    for path in paths:
+        if not os.path.isabs(path):
+            candidates = [os.path.join(root, path) for root in roots]
+            path = next((c for c in candidates if os.path.exists(c)), candidates[0])
+        resolved.append(path)
+    return resolved
+
+def open_feature_cache(path: str = FEATURE_CACHE_PATH):
+    '''The audio feature cache at path if it holds ASR_MODEL features, else None.'''
+    if not os.path.exists(os.path.join(path, "index.json")):
+        return None
+    cache = AudioFeatureCache(path)
+    return cache if cache.index["model"] == ASR_MODEL else None
+
+def _transcribe_features(asr_pipe, features):
+    '''Whisper transcripts straight from cached log-mel features, skipping feature extraction.
+
+    Cached files are at most one 30 s window, so this matches the chunked pipeline.
+    '''
+    model = asr_pipe.model
+    batch = torch.from_numpy(np.stack(features).astype(np.float32)).to(model.device, model.dtype)
+    with torch.inference_mode():
+        ids = model.generate(input_features=batch)
+    return [{"text": text} for text in asr_pipe.tokenizer.batch_decode(ids, skip_special_tokens=True)]
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _run_batched(pipe, inputs, batch_size, stage):
+    '''Runs pipe over inputs in one batched call, returning (output, error) per input.
 
+    If the batched call fails, every input is retried on its own so a bad
+    input only fails itself, not the rest of its chunk.
+    '''
     try:
-        transcribed_text = run_asr(temp_audio_file)
-        if not transcribed_text:
-            print("ASR failed or returned empty text. Cannot proceed with subsequent steps.")
-            return None
+        outputs = list(pipe(inputs, batch_size=batch_size))
+        if len(outputs) != len(inputs):
+            raise RuntimeError(f"{stage} returned {len(outputs)} results for {len(inputs)} inputs")
+        return [(output, None) for output in outputs]
+    except Exception:
+        pass
 
-        surah, ayah = run_surah_ayah_detection(temp_audio_file)
-        tajweed_errors = run_tajweed_detection(transcribed_text)
-        pronunciation_score = run_pronunciation_scoring(transcribed_text)
+    results = []
+    for item in inputs:
+        try:
+            results.append((pipe(item), None))
+        except Exception as e:
+            results.append((None, f"{stage} failed: {e}"))
+    return results
+
+def run_batch_inference(audio_paths, batch_size: int = 8, decode_workers: int = 4, feature_cache=None):
+    '''Runs all four stages over many recitations, one batched forward pass per stage per chunk.
 
-        output = {
-            "text": transcribed_text,
-            "surah": surah,
-            "ayah": ayah,
-            "tajweed_errors": tajweed_errors,
-            "pronunciation_score": pronunciation_score
-        }
+    Yields one result dict per input path, in input order. Files that fail
+    to decode, or that any stage fails on, yield a record with an `error`
+    field instead; the rest of their chunk is still scored. Files found in
+    feature_cache (default: open_feature_cache()) are transcribed from their
+    cached features.
+    '''
+    if feature_cache is None:
+        feature_cache = open_feature_cache()
+    asr_pipe = MODEL_REGISTRY.get("asr")
+    position_pipe = MODEL_REGISTRY.get("position")
+    tajweed_pipe = MODEL_REGISTRY.get("tajweed")
+    scoring_pipe = MODEL_REGISTRY.get("scoring")
 
-        print("\n--- Model Inference Results ---")
-        print(json.dumps(output, ensure_ascii=False, indent=2))        return output
+    def decode(path):
+        try:
+            return load_audio(path), None
+        except Exception as e:
+            return None, f"decode failed: {e}"
 
-    finally:
-        if os.path.exists(temp_audio_file):
-            os.remove(temp_audio_file)
-            print(f"Cleaned up temporary audio file '{temp_audio_file}'.")
+    with ThreadPoolExecutor(max_workers=decode_workers) as decoder:
+        for paths in _chunks(list(audio_paths), batch_size):
+            decoded = list(decoder.map(decode, paths))
+            results = [{"audio_path": path} for path in paths]
+            for result, (_, error) in zip(results, decoded):
+                if error:
+                    result["error"] = error
+
+            ok = [i for i, (audio, _) in enumerate(decoded) if audio is not None]
+            if ok:
+                inputs = [audio_pipeline_input(decoded[i][0]) for i in ok]
+                transcripts = [None] * len(ok)
+                cached = {}
+                if feature_cache is not None:
+                    for n, i in enumerate(ok):
+                        features = feature_cache.lookup(paths[i])
+                        if features is not None:
+                            cached[n] = features
+                if cached:
+                    try:
+                        for n, output in zip(cached, _transcribe_features(asr_pipe, list(cached.values()))):
+                            transcripts[n] = (output, None)
+                    except Exception:
+                        pass  # those files go through the pipeline below instead
+                uncached = [n for n, t in enumerate(transcripts) if t is None]
+                if uncached:
+                    outputs = _run_batched(asr_pipe, [inputs[n] for n in uncached], batch_size, "asr")
+                    for n, output in zip(uncached, outputs):
+                        transcripts[n] = output
+                positions = _run_batched(position_pipe, inputs, batch_size, "position")
+                for i, (transcript, asr_error), (position_result, position_error) in zip(ok, transcripts, positions):
+                    if asr_error or position_error:
+                        results[i]["error"] = asr_error or position_error
+                        continue
+                    surah, ayah = parse_surah_ayah(position_result) or DEFAULT_POSITION
+                    results[i].update(text=transcript["text"].strip(), surah=surah, ayah=ayah)
+
+            texted = [i for i in ok if results[i].get("text")]
+            for i in ok:
+                if "error" not in results[i] and not results[i]["text"]:
+                    results[i]["error"] = "ASR returned empty text"
+            if texted:
+                texts = [results[i]["text"] for i in texted]
+                tajweed_results = _run_batched(tajweed_pipe, texts, batch_size, "tajweed")
+                score_results = _run_batched(scoring_pipe, texts, batch_size, "scoring")
+                for i, (tajweed_result, tajweed_error), (score_result, score_error) in zip(
+                        texted, tajweed_results, score_results):
+                    if tajweed_error or score_error:
+                        results[i]["error"] = tajweed_error or score_error
+                        continue
+                    results[i]["tajweed_errors"] = parse_tajweed_errors(tajweed_result)
+                    # Batched text-classification returns one dict per input, a single call a list
+                    results[i]["pronunciation_score"] = parse_pronunciation_score(
+                        score_result if isinstance(score_result, list) else [score_result])
+
+            yield from results
+
+def run_batch_inference_to_jsonl(source: str, output_path: str, batch_size: int = 8, audio_root: str = None):
+    '''Scores every recitation listed by `source` and writes one JSON line per file.'''
+    if not setup_hf_token():
+        print("Exiting: Hugging Face token not available.")
+        return None
+
+    audio_paths = collect_audio_paths(source, audio_root)
+    print(f"Scoring {len(audio_paths)} recitations from '{source}' with batch size {batch_size}...")
+
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    written = failed = 0
+    with open(output_path, "w", encoding="utf-8") as out:
+        for result in run_batch_inference(audio_paths, batch_size=batch_size):
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            written += 1
+            failed += "error" in result
+
+    elapsed = time.perf_counter() - started
+    cpu_minutes = (time.process_time() - cpu_started) / 60
+    summary = {
+        "recitations": written,
+        "failed": failed,
+        "wall_seconds": round(elapsed, 2),
+        "recitations_per_cpu_minute": round(written / cpu_minutes, 1) if cpu_minutes else None,
+        "output": output_path,
+    }
+    print(json.dumps(summary, indent=2))
+    return summary
 
 # ==============================
 # ENTRY POINT
 # ==============================
 if __name__ == '__main__':
-    if len(sys.argv) > 1:
-        input_audio_path = sys.argv[1]
+    parser = argparse.ArgumentParser(description="QuranLab recitation inference pipeline")
+    parser.add_argument("audio", nargs="?", help="Audio file to analyse")
+    parser.add_argument("--batch", metavar="SOURCE", help="Directory, CSV manifest (audio_path column) or path list to score in batch")
+    parser.add_argument("--output", default="quranlab_results.jsonl", help="JSONL output file for --batch")
+    parser.add_argument("--batch-size", type=int, default=8, help="Inputs per forward pass in --batch mode")
+    parser.add_argument("--audio-root", help="Directory that relative manifest paths are resolved against")
+    parser.add_argument("--stream", action="store_true", help="Print incremental JSON events while processing long recitations")
+    args = parser.parse_args()
+
+    if args.batch:
+        summary = run_batch_inference_to_jsonl(args.batch, args.output, batch_size=args.batch_size, audio_root=args.audio_root)
+        sys.exit(0 if summary else 1)
+
+    if args.stream and args.audio:
+        for event in stream_full_inference_pipeline(args.audio):
+            print(json.dumps(event, ensure_ascii=False), flush=True)
+        sys.exit(0)
+
+    if args.audio:
+        input_audio_path = args.audio
         print(f"Running pipeline with audio file from CLI: {input_audio_path}")
     else:
         input_audio_path = "QuranLab/ai/test.wav"
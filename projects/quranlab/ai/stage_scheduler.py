@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Stage Scheduler for the QuranLab inference pipeline
+Runs independent pipeline stages concurrently as a small dependency graph
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# How often run() re-checks for queued stages that have started, so their
+# deadlines can be armed.
+START_POLL_S = 0.05
+
+
+class AbandonedStages:
+    '''Timed-out stages whose threads are still running.
+
+    Share one instance between every scheduler that uses the same executor:
+    with ``max_abandoned`` set, schedulers refuse new stages instead of
+    queueing them behind workers that hung stages still hold.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running = {}
+
+    def add(self, future, name):
+        with self._lock:
+            self._running[future] = name
+        future.add_done_callback(self._discard)
+
+    def _discard(self, future):
+        with self._lock:
+            self._running.pop(future, None)
+
+    def names(self):
+        with self._lock:
+            return sorted(self._running.values())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._running)
+
+
+class StageScheduler:
+    '''Runs named stages on a thread pool as soon as their dependencies finish.
+
+    Each stage is called with the results of its dependencies as keyword
+    arguments. A stage that raises or exceeds its timeout is recorded in
+    ``errors`` and every stage downstream of it is skipped; all other stages
+    still run, so callers always get partial results.
+
+    Threads are used rather than processes because the models live in the
+    parent process's registry and torch releases the GIL during inference.
+    A stage's timeout counts from when it starts running, not from when it
+    was queued, so a busy pool never times stages out before they run. A
+    timed-out stage cannot be interrupted; its thread finishes in the
+    background, its result is discarded and it is tracked in ``abandoned``.
+    '''
+
+    def __init__(self, executor=None, max_workers=None, abandoned=None, max_abandoned=None):
+        self._executor = executor
+        self._max_workers = max_workers
+        self._abandoned = abandoned
+        self._max_abandoned = max_abandoned
+        self._stages = {}
+
+    def add(self, name, fn, deps=(), timeout=None):
+        '''Register ``fn`` as stage ``name`` depending on the stages in ``deps``.'''
+        for dep in deps:
+            if dep not in self._stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self._stages[name] = (fn, tuple(deps), timeout)
+        return self
+
+    def run(self):
+        '''Runs every stage and returns ``(results, errors, timings)`` dicts keyed by stage name.'''
+        executor = self._executor or ThreadPoolExecutor(max_workers=self._max_workers or len(self._stages))
+        results, errors, timings = {}, {}, {}
+        pending = dict(self._stages)
+        running = {}
+        starts = {}
+
+        def timed(name, fn, kwargs):
+            starts[name] = time.perf_counter()
+            return fn(**kwargs)
+
+        def pool_exhausted():
+            return (self._abandoned is not None and self._max_abandoned is not None
+                    and len(self._abandoned) >= self._max_abandoned)
+
+        def submit_ready():
+            for name, (fn, deps, timeout) in list(pending.items()):
+                failed = [dep for dep in deps if dep in errors]
+                if failed:
+                    errors[name] = f"skipped: dependency '{failed[0]}' failed"
+                    del pending[name]
+                elif all(dep in results for dep in deps):
+                    if pool_exhausted():
+                        errors[name] = f"skipped: {len(self._abandoned)} timed-out stages still hold workers"
+                    else:
+                        kwargs = {dep: results[dep] for dep in deps}
+                        running[executor.submit(timed, name, fn, kwargs)] = (name, timeout)
+                    del pending[name]
+
+        try:
+            submit_ready()
+            while running:
+                deadlines, queued = [], False
+                for name, timeout in running.values():
+                    if timeout and name in starts:
+                        deadlines.append(starts[name] + timeout)
+                    elif timeout:
+                        queued = True
+                wait_for = max(0.0, min(deadlines) - time.perf_counter()) if deadlines else None
+                if queued:
+                    wait_for = START_POLL_S if wait_for is None else min(wait_for, START_POLL_S)
+                done, _ = wait(running, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    name, _ = running.pop(future)
+                    finished = time.perf_counter()
+                    timings[name] = round(finished - starts.get(name, finished), 3)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        errors[name] = f"{type(e).__name__}: {e}"
+
+                now = time.perf_counter()
+                for future, (name, timeout) in list(running.items()):
+                    if timeout and name in starts and now >= starts[name] + timeout:
+                        running.pop(future)
+                        if self._abandoned is not None:
+                            self._abandoned.add(future, name)
+                        timings[name] = round(now - starts[name], 3)
+                        errors[name] = f"timed out after {timeout:.1f}s"
+
+                # Propagate failures even when nothing new became runnable.
+                while True:
+                    before = len(pending)
+                    submit_ready()
+                    if len(pending) == before:
+                        break
+        finally:
+            if self._executor is None:
+                executor.shutdown(wait=False)
+
+        return results, errors, timings
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+CLI startup profiler for ADANiD CLI
+Imports the CLI entry point in a fresh interpreter under -X importtime and reports the slowest imports
+
+Usage (from the repository root):
+    python -m scripts.profile_cli_startup
+    python -m scripts.profile_cli_startup --json --fail-on-heavy
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+# Modules that must never be imported just to start the CLI
+HEAVY_MODULES = ("torch", "transformers", "librosa", "datasets")
+
+def profile_imports(module="src.main"):
+    """Import module in a fresh interpreter under -X importtime and parse the report."""
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    imports = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports.append({
+            "module": name.strip(),
+            # Nested imports are indented by two spaces per level
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+
+    if proc.returncode != 0:
+        errors = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"Importing {module} failed:\n" + "\n".join(errors))
+
+    top_level = [i for i in imports if i["depth"] == 0]
+    heavy = sorted({i["module"].split(".")[0] for i in imports} & set(HEAVY_MODULES))
+    return {
+        "module": module,
+        "wall_ms": round(wall_ms, 1),
+        "import_ms": round(sum(i["cumulative_ms"] for i in top_level), 1),
+        "heavy_modules": heavy,
+        "slowest": sorted(imports, key=lambda i: i["cumulative_ms"], reverse=True),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Report CLI cold-start import time")
+    parser.add_argument("--module", default="src.main", help="Module the CLI entry point lives in")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to list")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON for tracking over time")
+    parser.add_argument("--fail-on-heavy", action="store_true", help="Exit 1 if torch/transformers/etc. load at startup")
+    args = parser.parse_args()
+
+    report = profile_imports(args.module)
+    report["slowest"] = report["slowest"][:args.top]
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"🌙 Cold start for {report['module']}: {report['wall_ms']} ms wall, {report['import_ms']} ms importing")
+        print(f"{'cumulative ms':>14}  {'self ms':>8}  module")
+        for entry in report["slowest"]:
+            print(f"{entry['cumulative_ms']:>14.1f}  {entry['self_ms']:>8.1f}  {entry['module']}")
+        if report["heavy_modules"]:
+            print(f"⚠️ Heavy modules imported at startup: {', '.join(report['heavy_modules'])}")
+        else:
+            print("✅ No heavy ML modules imported at startup")
+
+    if args.fail_on_heavy and report["heavy_modules"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
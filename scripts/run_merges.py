@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Merge runner for the mergekit configs in models/
+Merges tensor by tensor from memory-mapped safetensors under a peak-RSS budget
+
+Usage (from the repository root):
+    python -m scripts.run_merges                         # every models/mergekit*.yaml
+    python -m scripts.run_merges models/mergekit-universal.yaml --max-rss-mb 4096
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import resource
+import shutil
+import struct
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+from services.artifact_store import ARTIFACTS
+
+CONFIG_GLOB = "models/mergekit*.yaml"
+OUTPUT_ROOT = "models/merged"
+FINGERPRINT_NAME = ".merge_fingerprint.json"
+MAX_RSS_MB = int(os.environ.get("ADANID_MERGE_MAX_RSS_MB", 8192))
+# Files copied from the first model so the output loads with from_pretrained()
+SIDE_FILES = ("config.json", "tokenizer.json", "tokenizer_config.json", "special_tokens_map.json",
+              "vocab.txt", "merges.txt", "vocab.json", "preprocessor_config.json", "generation_config.json")
+# Architecture prefixes that differ between otherwise identical encoders (bert.encoder... vs electra.encoder...)
+ARCH_PREFIXES = ("bert.", "electra.", "roberta.", "model.")
+
+_DTYPES = {"F64": np.float64, "F32": np.float32, "F16": np.float16, "BF16": np.uint16,
+           "I64": np.int64, "I32": np.int32, "I16": np.int16, "I8": np.int8, "U8": np.uint8, "BOOL": np.bool_}
+_OUT_DTYPES = {"float16": ("F16", np.float16), "float32": ("F32", np.float32), "bfloat16": ("BF16", None)}
+_PAGE = mmap.PAGESIZE
+
+def _canonical(name: str) -> str:
+    for prefix in ARCH_PREFIXES:
+        if name.startswith(prefix):
+            return name[len(prefix):]
+    return name
+
+def _to_bf16(array: np.ndarray) -> np.ndarray:
+    """float32 -> bfloat16 bit patterns, rounding to nearest even"""
+    bits = array.astype(np.float32).view(np.uint32)
+    return ((bits + 0x7FFF + ((bits >> 16) & 1)) >> 16).astype(np.uint16)
+
+class SafetensorsShard:
+    """One mapped .safetensors file; tensor pages are dropped again with release()"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            header_len = struct.unpack("<Q", f.read(8))[0]
+            self.header = json.loads(f.read(header_len))
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.header.pop("__metadata__", None)
+        self.data_start = 8 + header_len
+
+    def tensor(self, name) -> np.ndarray:
+        """Zero-copy view into the mapping (BF16 is widened to a float32 copy)"""
+        info = self.header[name]
+        begin, end = info["data_offsets"]
+        dtype = np.dtype(_DTYPES[info["dtype"]])
+        array = np.frombuffer(self.buffer, dtype=dtype, count=(end - begin) // dtype.itemsize,
+                              offset=self.data_start + begin).reshape(info["shape"])
+        if info["dtype"] == "BF16":
+            return (array.astype(np.uint32) << 16).view(np.float32)
+        return array
+
+    def release(self, name):
+        """Give the tensor's pages back to the page cache so they stop counting toward RSS"""
+        begin, end = self.header[name]["data_offsets"]
+        start = (self.data_start + begin) // _PAGE * _PAGE
+        self.buffer.madvise(mmap.MADV_DONTNEED, start, self.data_start + end - start)
+
+class ModelWeights:
+    """Every tensor of a model across its shards, keyed by canonical name"""
+
+    def __init__(self, path: Path):
+        files = sorted(path.glob("*.safetensors"))
+        if not files:
+            raise FileNotFoundError(f"{path} has no .safetensors weights (convert pytorch_model.bin first)")
+        self.path = path
+        self.files = files
+        self.tensors = {}
+        for file in files:
+            shard = SafetensorsShard(file)
+            for name in shard.header:
+                self.tensors[_canonical(name)] = (shard, name)
+
+    def info(self, key):
+        shard, name = self.tensors[key]
+        return shard.header[name]
+
+    def headers_digest(self) -> str:
+        """Changes when any shard's tensors, sizes or contents-on-disk change"""
+        digest = hashlib.sha256()
+        for file in self.files:
+            stat = file.stat()
+            digest.update(f"{file.name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        manifest = self.path / "checksums.json"
+        if manifest.exists():
+            digest.update(manifest.read_bytes())
+        return digest.hexdigest()
+
+# ==============================
+# PLANNING
+# ==============================
+def resolve_model(name: str, offline: bool = False) -> Path:
+    """Local copy from the artifact store, else a weights-only snapshot from the Hub"""
+    path = ARTIFACTS.model_path(name)
+    if path is not None:
+        return Path(path)
+    if offline:
+        raise FileNotFoundError(f"No local copy of {name}; run scripts/setup_offline.sh or drop --offline")
+    from huggingface_hub import snapshot_download
+    return Path(snapshot_download(name, allow_patterns=["*.safetensors", "*.json", "*.txt", "*.model"]))
+
+def load_config(config_path) -> dict:
+    with open(config_path, "r") as f:
+        config = yaml.safe_load(f)
+    if config.get("merge_method", "linear") != "linear":
+        raise ValueError(f"{config_path}: only merge_method linear is supported")
+    if config.get("dtype", "float16") not in _OUT_DTYPES:
+        raise ValueError(f"{config_path}: unsupported dtype {config['dtype']}")
+    return config
+
+def tensor_weight(entry: dict, key: str) -> float:
+    """The longest parameter name contained in the tensor name wins; otherwise the model weight"""
+    matches = [p for p in entry.get("parameters") or [] if p["name"] in key]
+    if matches:
+        return float(max(matches, key=lambda p: len(p["name"]))["weight"])
+    return float(entry.get("weight", 1.0))
+
+def fingerprint(config_path, models) -> str:
+    digest = hashlib.sha256(Path(config_path).read_bytes())
+    for model in models:
+        digest.update(model.headers_digest().encode())
+    return digest.hexdigest()
+
+def estimate_peak_bytes(models) -> int:
+    """Largest tensor as float32 accumulator + one widened input at a time + mapped input pages"""
+    largest = 0
+    for key in models[0].tensors:
+        numel = int(np.prod(models[0].info(key)["shape"], dtype=np.int64))
+        largest = max(largest, numel)
+    return largest * 4 * (len(models) + 2) + 64 * 1024 * 1024  # + interpreter/numpy baseline
+
+def output_dir_for(config_path, output_root=OUTPUT_ROOT) -> Path:
+    stem = Path(config_path).stem
+    return Path(output_root) / (stem[len("mergekit-"):] if stem.startswith("mergekit-") else stem)
+
+# ==============================
+# MERGING (worker processes)
+# ==============================
+def merge_config(config_path, output_dir, offline=False):
+    """Write output_dir/model.safetensors one tensor at a time; returns a summary dict"""
+    config = load_config(config_path)
+    entries = config["models"]
+    models = [ModelWeights(resolve_model(e["model"], offline)) for e in entries]
+    normalize = (config.get("parameters") or {}).get("normalize", True)
+    out_code, out_dtype = _OUT_DTYPES[config.get("dtype", "float16")]
+
+    # The first model defines the architecture; others contribute where name and shape agree.
+    # Integer tensors (position ids, masks) are copied from the first model unchanged.
+    base = models[0]
+    keys = sorted(base.tensors)
+    header, layout, offset = {}, {}, 0
+    for key in keys:
+        info = base.info(key)
+        is_float = info["dtype"] in ("F64", "F32", "F16", "BF16")
+        code = out_code if is_float else info["dtype"]
+        itemsize = 2 if code == "BF16" else np.dtype(_DTYPES[code]).itemsize
+        size = int(np.prod(info["shape"], dtype=np.int64)) * itemsize
+        header[base.tensors[key][1]] = {"dtype": code, "shape": info["shape"], "data_offsets": [offset, offset + size]}
+        layout[key] = (info["shape"], is_float)
+        offset += size
+    header["__metadata__"] = {"format": "pt", "merge_config": Path(config_path).name}
+    header_bytes = json.dumps(header, separators=(",", ":")).encode()
+    header_bytes += b" " * (-len(header_bytes) % 8)
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    tmp = output_dir / ".model.safetensors.tmp"
+    merged = 0
+    with open(tmp, "wb") as out:
+        out.write(struct.pack("<Q", len(header_bytes)))
+        out.write(header_bytes)
+        for key in keys:
+            shape, is_float = layout[key]
+            if not is_float:
+                shard, name = base.tensors[key]
+                out.write(shard.tensor(name).tobytes())
+                shard.release(name)
+                continue
+            accumulator, total, contributors = np.zeros(shape, dtype=np.float32), 0.0, 0
+            scratch = np.empty(shape, dtype=np.float32)
+            for entry, model in zip(entries, models):
+                if key not in model.tensors or model.info(key)["shape"] != shape:
+                    continue
+                shard, name = model.tensors[key]
+                weight = tensor_weight(entry, key)
+                # Widen before scaling: weight * F16 tensor would round in float16
+                np.multiply(shard.tensor(name), weight, out=scratch, dtype=np.float32)
+                accumulator += scratch
+                shard.release(name)
+                total += weight
+                contributors += 1
+            if normalize and total:
+                accumulator /= total
+            merged += contributors > 1
+            out.write((_to_bf16(accumulator) if out_code == "BF16" else accumulator.astype(out_dtype)).tobytes())
+            del accumulator, scratch
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp, output_dir / "model.safetensors")
+
+    for name in SIDE_FILES:
+        if (base.path / name).exists():
+            shutil.copy2(base.path / name, output_dir / name)
+    return {"config": str(config_path), "output": str(output_dir), "tensors": len(keys), "merged_tensors": merged}
+
+def _reset_peak_rss():
+    """Restart the kernel's peak-RSS counter so a reused pool worker reports this job only (Linux >= 4.0)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _peak_rss_mb(since_reset: bool) -> int:
+    if since_reset:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) // 1024
+    # Lifetime peak of the worker process; an upper bound when workers are reused
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+
+def _run_job(config_path, output_dir, merge_fingerprint, offline):
+    since_reset = _reset_peak_rss()
+    summary = merge_config(config_path, output_dir, offline)
+    summary["peak_rss_mb"] = _peak_rss_mb(since_reset)
+    with open(Path(output_dir) / FINGERPRINT_NAME, "w") as f:
+        json.dump({"fingerprint": merge_fingerprint, "config": str(config_path)}, f)
+    return summary
+
+# ==============================
+# SCHEDULING
+# ==============================
+def plan_jobs(config_paths, output_root=OUTPUT_ROOT, offline=False, force=False):
+    """(config, output dir, fingerprint, estimated peak bytes) for every merge that is out of date,
+    the configs skipped as unchanged, and {config: error} for configs that could not be planned"""
+    jobs, skipped, failed = [], [], {}
+    for config_path in config_paths:
+        try:
+            config = load_config(config_path)
+            models = [ModelWeights(resolve_model(e["model"], offline)) for e in config["models"]]
+        except Exception as e:
+            failed[str(config_path)] = f"{type(e).__name__}: {e}"
+            continue
+        output_dir = output_dir_for(config_path, output_root)
+        current = fingerprint(config_path, models)
+        stamp = output_dir / FINGERPRINT_NAME
+        if not force and stamp.exists() and (output_dir / "model.safetensors").exists():
+            with open(stamp, "r") as f:
+                if json.load(f).get("fingerprint") == current:
+                    skipped.append(str(config_path))
+                    continue
+        jobs.append((str(config_path), str(output_dir), current, estimate_peak_bytes(models)))
+    return jobs, skipped, failed
+
+def run_merges(config_paths=None, output_root=OUTPUT_ROOT, max_rss_mb=MAX_RSS_MB, workers=None,
+               offline=False, force=False):
+    """Run out-of-date merges concurrently while their estimated peaks fit in max_rss_mb.
+
+    A failing merge does not stop the others; failures are reported together at the end.
+    """
+    config_paths = config_paths or sorted(str(p) for p in Path(".").glob(CONFIG_GLOB))
+    jobs, skipped, failed = plan_jobs(config_paths, output_root, offline, force)
+    for config_path in skipped:
+        print(f"⏭️ {config_path}: inputs unchanged, skipping")
+
+    budget = max_rss_mb * 1024 * 1024
+    for config_path, _, _, peak in jobs:
+        if peak > budget:
+            print(f"⚠️ {config_path}: estimated peak {peak >> 20} MB exceeds the {max_rss_mb} MB budget; it will run alone")
+
+    # Largest first, so big merges are not starved by a stream of small ones
+    queue = sorted(jobs, key=lambda job: -job[3])
+    running, results = {}, []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        while queue or running:
+            in_use = sum(job[3] for job in running.values())
+            for job in list(queue):
+                if len(running) < (workers or os.cpu_count()) and (not running or in_use + job[3] <= budget):
+                    running[pool.submit(_run_job, job[0], job[1], job[2], offline)] = job
+                    in_use += job[3]
+                    queue.remove(job)
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = running.pop(future)
+                try:
+                    summary = future.result()
+                except Exception as e:
+                    failed[job[0]] = f"{type(e).__name__}: {e}"
+                    print(f"❌ {job[0]}: {failed[job[0]]}")
+                    continue
+                results.append(summary)
+                print(f"✅ {job[0]} -> {summary['output']}: {summary['merged_tensors']}/{summary['tensors']} tensors merged, "
+                      f"peak RSS {summary['peak_rss_mb']} MB")
+    for config_path, error in failed.items():
+        print(f"❌ {config_path} failed: {error}")
+    return {"merged": results, "skipped": skipped, "failed": failed}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run mergekit configs tensor by tensor under a memory budget")
+    parser.add_argument("configs", nargs="*", help=f"Config files (default: {CONFIG_GLOB})")
+    parser.add_argument("--output-root", default=OUTPUT_ROOT)
+    parser.add_argument("--max-rss-mb", type=int, default=MAX_RSS_MB, help="Budget shared by concurrent merges")
+    parser.add_argument("--workers", type=int, help="Maximum concurrent merges (default: all CPUs)")
+    parser.add_argument("--offline", action="store_true", help="Only use models already in the artifact store")
+    parser.add_argument("--force", action="store_true", help="Re-run merges even when inputs are unchanged")
+    args = parser.parse_args()
+    report = run_merges(args.configs, args.output_root, args.max_rss_mb, args.workers, args.offline, args.force)
+    raise SystemExit(1 if report["failed"] else 0)
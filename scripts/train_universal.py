@@ -2,52 +2,190 @@
 from transformers import (
     AutoModelForSequenceClassification,
     AutoTokenizer,
+    DataCollatorWithPadding,
     Trainer,
     TrainingArguments
 )
-from datasets import load_dataset
+from datasets import concatenate_datasets, load_dataset, load_from_disk
+from datasets.fingerprint import Hasher
+import argparse
+import hashlib
+import inspect
+import json
 import os
 
+TOKENIZED_CACHE = "offline/offline_cache/tokenized"
+
+def find_csv_files(dataset_path):
+    """All CSV files under dataset_path, in a stable order"""
+    return sorted(
+        os.path.join(root, f)
+        for root, _, files in os.walk(dataset_path)
+        for f in files if f.endswith('.csv')
+    )
+
+def infer_label(csv_file, label2id, default="general-islamic"):
+    """Label for a file without a label column, from its path (text/hadith/..., quran_recitations.csv)"""
+    path = csv_file.lower()
+    for label in sorted(label2id, key=len, reverse=True):
+        if label in path:
+            return label2id[label]
+    return label2id.get(default, 0)
+
+def _label_mapper(csv_file, label2id):
+    """Map a CSV's label column to ids; unknown labels fail loudly instead of breaking collation later"""
+    def to_id(example):
+        value = example["label"]
+        if value in label2id:
+            return {"label_id": label2id[value]}
+        if isinstance(value, int) and value in label2id.values():
+            return {"label_id": value}
+        raise ValueError(f"{csv_file}: label {value!r} is not in the model's label2id ({', '.join(label2id)})")
+    return to_id
+
+def load_corpus(csv_files, label2id, streaming=False):
+    """Every CSV as one "train" split, each row carrying text and an integer label"""
+    parts = []
+    for csv_file in csv_files:
+        part = load_dataset("csv", data_files={"train": csv_file}, split="train", streaming=streaming)
+        # Streaming CSVs may not know their columns until the first row is read
+        columns = part.column_names or list(next(iter(part)).keys())
+        if "label" in columns:
+            # A fresh column gets an integer type instead of inheriting the CSV's string one
+            part = part.map(_label_mapper(csv_file, label2id), remove_columns=["label"]) \
+                .rename_column("label_id", "label")
+        else:
+            # Bound now: streaming map() runs lazily, after the loop has moved on
+            part = part.map(lambda ex, label=infer_label(csv_file, label2id): {"label": label})
+        parts.append(part.select_columns(["text", "label"]))
+    return concatenate_datasets(parts)
+
+def tokenized_cache_key(tokenizer, csv_files, max_length, label2id):
+    """Changes whenever the tokenizer, the truncation length, the label mapping or any input file changes"""
+    digest = hashlib.sha256(Hasher.hash(tokenizer).encode())
+    digest.update(str(max_length).encode())
+    digest.update(json.dumps(label2id, sort_keys=True).encode())
+    for csv_file in csv_files:
+        stat = os.stat(csv_file)
+        digest.update(f"{csv_file}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:16]
+
+def _length_grouping(enabled):
+    """TrainingArguments kwargs that batch rows of similar length together
+
+    transformers 5 replaced group_by_length with train_sampling_strategy.
+    """
+    params = inspect.signature(TrainingArguments).parameters
+    if "train_sampling_strategy" in params:
+        return {"train_sampling_strategy": "group_by_length" if enabled else "random"}
+    return {"group_by_length": enabled}
+
+def build_training_args(output_dir, streaming=False, evaluate=True, max_steps=-1, num_proc=1):
+    return TrainingArguments(
+        output_dir=output_dir,
+        per_device_train_batch_size=8,
+        num_train_epochs=3,
+        max_steps=max_steps,
+        save_strategy="epoch" if not streaming else "steps",
+        eval_strategy="epoch" if evaluate else "no",
+        length_column_name="length",
+        dataloader_num_workers=min(4, num_proc),
+        # Streaming datasets have no lengths to sort by
+        **_length_grouping(not streaming)
+    )
+
 def train_islamic_model(
     base_model="models/islamic-ai-foundation",
     dataset_path="datasets/quranlab-islamic-dataset/train",
-    output_dir="models/trained-islamic-ai"
+    output_dir="models/trained-islamic-ai",
+    streaming=False,
+    num_proc=None,
+    max_length=256,
+    eval_fraction=0.1,
+    max_steps=-1,
+    cache_dir=TOKENIZED_CACHE
 ):
     # Load model and tokenizer
     model = AutoModelForSequenceClassification.from_pretrained(base_model)
     tokenizer = AutoTokenizer.from_pretrained(base_model)
-    
+    num_proc = num_proc or os.cpu_count()
+
     # Load dataset
-    csv_files = [f for f in os.listdir(dataset_path) if f.endswith('.csv')]
-    dataset = load_dataset("csv", data_files={f"train_{i}": os.path.join(dataset_path, f) for i, f in enumerate(csv_files)})
-    
-    # Tokenize
+    csv_files = find_csv_files(dataset_path)
+    if not csv_files:
+        raise FileNotFoundError(f"No CSV files under {dataset_path}")
+
+    # Tokenize without padding; the collator pads each batch to its own longest row.
+    # "length" lets the Trainer group rows of similar length into the same batch.
     def tokenize_function(examples):
-        return tokenizer(examples["text"], truncation=True, padding=True)
-    
-    tokenized_dataset = dataset.map(tokenize_function, batched=True)
-    
+        encoded = tokenizer(examples["text"], truncation=True, max_length=max_length)
+        encoded["length"] = [len(ids) for ids in encoded["input_ids"]]
+        return encoded
+
+    if streaming:
+        # Larger-than-RAM corpora: rows are read and tokenized on the fly
+        train_dataset = load_corpus(csv_files, model.config.label2id, streaming=True) \
+            .map(tokenize_function, batched=True, remove_columns=["text"])
+        eval_dataset = None
+        if max_steps <= 0:
+            raise ValueError("Streaming datasets have no length; pass max_steps")
+    else:
+        cached = os.path.join(cache_dir, tokenized_cache_key(tokenizer, csv_files, max_length, model.config.label2id))
+        if os.path.exists(cached):
+            # Re-runs skip tokenization entirely
+            tokenized_dataset = load_from_disk(cached)
+            print(f"✅ Loaded tokenized dataset from {cached}")
+        else:
+            dataset = load_corpus(csv_files, model.config.label2id)
+            tokenized_dataset = dataset.map(
+                tokenize_function, batched=True, num_proc=min(num_proc, max(1, len(dataset) // 1000)),
+                remove_columns=["text"]
+            )
+            tokenized_dataset.save_to_disk(cached)
+
+        if eval_fraction and len(tokenized_dataset) >= 10:
+            split = tokenized_dataset.train_test_split(test_size=eval_fraction, seed=42)
+            train_dataset, eval_dataset = split["train"], split["test"]
+        else:
+            train_dataset, eval_dataset = tokenized_dataset, None
+
     # Training arguments
-    training_args = TrainingArguments(
-        output_dir=output_dir,
-        per_device_train_batch_size=8,
-        num_train_epochs=3,
-        save_strategy="epoch",
-        evaluation_strategy="epoch"
-    )
-    
+    training_args = build_training_args(output_dir, streaming, eval_dataset is not None, max_steps, num_proc)
+
     # Train
     trainer = Trainer(
         model=model,
         args=training_args,
-        train_dataset=tokenized_dataset["train"],
+        train_dataset=train_dataset,
+        eval_dataset=eval_dataset,
+        data_collator=DataCollatorWithPadding(tokenizer, pad_to_multiple_of=8),
     )
-    
+
     trainer.train()
     model.save_pretrained(output_dir)
     tokenizer.save_pretrained(output_dir)
     return output_dir
 
 if __name__ == "__main__":
-    trained_model = train_islamic_model()
+    parser = argparse.ArgumentParser(description="Fine-tune the Islamic AI classifier")
+    parser.add_argument("--base-model", default="models/islamic-ai-foundation")
+    parser.add_argument("--dataset-path", default="datasets/quranlab-islamic-dataset/train")
+    parser.add_argument("--output-dir", default="models/trained-islamic-ai")
+    parser.add_argument("--streaming", action="store_true", help="Stream corpora that do not fit in RAM (needs --max-steps)")
+    parser.add_argument("--num-proc", type=int, help="Tokenization worker processes (default: all CPUs)")
+    parser.add_argument("--max-length", type=int, default=256)
+    parser.add_argument("--max-steps", type=int, default=-1)
+    parser.add_argument("--cache-dir", default=TOKENIZED_CACHE, help="Where tokenized Arrow datasets are kept")
+    args = parser.parse_args()
+
+    trained_model = train_islamic_model(
+        base_model=args.base_model,
+        dataset_path=args.dataset_path,
+        output_dir=args.output_dir,
+        streaming=args.streaming,
+        num_proc=args.num_proc,
+        max_length=args.max_length,
+        max_steps=args.max_steps,
+        cache_dir=args.cache_dir
+    )
     print(f"✅ Model trained and saved to: {trained_model}")
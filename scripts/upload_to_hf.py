@@ -1,33 +1,186 @@
-# Upload to Hugging Face - Updated Version
+# Upload to Hugging Face - incremental, resumable publishing
+import argparse
+import hashlib
+import json
 import os
-import subprocess
-
-def upload_to_hf():
-    # Set HF token
-    os.environ["HF_TOKEN"] = "hf_mmmmhfjjjnkdfjjjggkvhj"
-    
-    # Login
-    subprocess.run(["huggingface-cli", "login", "--token", os.environ["HF_TOKEN"]])
-    
-    # Upload model
-    subprocess.run([
-        "huggingface-cli", "upload", 
-        "ADANiD/islamic-ai-foundation",
-        "models/islamic-ai-foundation",
-        "./",
-        "--repo-type", "model"
-    ])
-    
-    # Upload dataset
-    subprocess.run([
-        "huggingface-cli", "upload",
-        "ADANiD/Quranlab-islamic-dataset", 
-        "datasets/quranlab-islamic-dataset",
-        "./",
-        "--repo-type", "dataset"
-    ])
-    
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from huggingface_hub import CommitOperationAdd, CommitOperationDelete, HfApi
+from huggingface_hub.utils import RepositoryNotFoundError
+
+STATE_DIR = "offline/offline_cache/hf_publish"
+IGNORED = {".git", "__pycache__", ".cache", ".ipynb_checkpoints"}
+BATCH_FILES = 16
+RETRIES = 5
+
+PUBLISH_TARGETS = [
+    ("ADANiD/islamic-ai-foundation", "models/islamic-ai-foundation", "model"),
+    ("ADANiD/Quranlab-islamic-dataset", "datasets/quranlab-islamic-dataset", "dataset"),
+]
+
+def _hash_file(path, block_size=4 * 1024 * 1024):
+    """(sha256, git blob sha1) in one read: LFS files are compared by the first, regular files by the second"""
+    size = os.path.getsize(path)
+    sha256 = hashlib.sha256()
+    git_sha1 = hashlib.sha1(f"blob {size}\0".encode())
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            sha256.update(block)
+            git_sha1.update(block)
+    return sha256.hexdigest(), git_sha1.hexdigest()
+
+def _with_retries(action, what):
+    for attempt in range(1, RETRIES + 1):
+        try:
+            return action()
+        except OSError as e:  # requests' errors are OSErrors too
+            status = getattr(getattr(e, "response", None), "status_code", None) or 500
+            if attempt == RETRIES or status < 500 and status != 429:
+                raise
+            wait = 2 ** attempt
+            print(f"⚠️ {what} failed ({e}); retry {attempt}/{RETRIES - 1} in {wait}s")
+            time.sleep(wait)
+
+class PublishState:
+    """Per-repo record of local hashes and of what the remote already has.
+
+    files:    path -> size, mtime_ns, sha256, sha1 (hashes are reused while size/mtime match)
+    uploaded: sha256 of LFS objects already pushed but possibly not committed yet
+    """
+
+    def __init__(self, repo_id, repo_type, state_dir=STATE_DIR):
+        os.makedirs(state_dir, exist_ok=True)
+        self.path = os.path.join(state_dir, f"{repo_type}--{repo_id.replace('/', '--')}.json")
+        self.data = {"files": {}, "uploaded": []}
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                self.data = json.load(f)
+
+    def save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.data, f)
+        os.replace(tmp, self.path)
+
+def scan_folder(folder, state, workers):
+    """path in repo -> {size, mtime_ns, sha256, sha1}; only new or modified files are re-hashed"""
+    local, to_hash = {}, []
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = sorted(d for d in dirs if d not in IGNORED)
+        for name in sorted(files):
+            full = os.path.join(root, name)
+            rel = os.path.relpath(full, folder).replace(os.sep, "/")
+            st = os.stat(full)
+            cached = state.data["files"].get(rel)
+            if cached and cached["size"] == st.st_size and cached["mtime_ns"] == st.st_mtime_ns:
+                local[rel] = cached
+            else:
+                local[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+                to_hash.append(rel)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for rel, (sha256, sha1) in zip(to_hash, pool.map(lambda r: _hash_file(os.path.join(folder, r)), to_hash)):
+            local[rel].update(sha256=sha256, sha1=sha1)
+    return local
+
+def remote_files(api, repo_id, repo_type, revision):
+    """path -> ("lfs", sha256) or ("git", blob sha1) for every file already on the Hub; None if no repo"""
+    remote = {}
+    try:
+        for entry in api.list_repo_tree(repo_id, repo_type=repo_type, revision=revision, recursive=True):
+            if getattr(entry, "blob_id", None) is None:
+                continue  # folder
+            remote[entry.path] = ("lfs", entry.lfs.sha256) if entry.lfs else ("git", entry.blob_id)
+    except RepositoryNotFoundError:
+        return None
+    return remote
+
+def publish_folder(repo_id, folder, repo_type="model", endpoint=None, token=None, revision="main",
+                   workers=8, delete_missing=False, dry_run=False, state_dir=STATE_DIR):
+    """Push only the files whose content the remote does not have yet.
+
+    Large files go through preupload_lfs_files in batches of BATCH_FILES
+    (files in parallel; chunks in parallel too with HF_HUB_ENABLE_HF_TRANSFER=1),
+    and every finished batch is written to the state file before the next
+    starts. An interrupted run resumes from there: LFS objects the state file
+    lists as pushed are neither preuploaded again nor re-sent by the commit.
+    A single commit at the end makes the new revision visible.
+    """
+    api = HfApi(endpoint=endpoint or os.environ.get("HF_ENDPOINT"), token=token or os.environ.get("HF_TOKEN"))
+    state = PublishState(repo_id, repo_type, state_dir)
+    local = scan_folder(folder, state, workers)
+    state.data["files"] = local
+    state.save()
+
+    remote = _with_retries(lambda: remote_files(api, repo_id, repo_type, revision), f"listing {repo_id}")
+    if remote is None:
+        if not dry_run:
+            api.create_repo(repo_id, repo_type=repo_type, exist_ok=True)
+        remote = {}
+    changed = []
+    for rel, info in local.items():
+        kind, digest = remote.get(rel, (None, None))
+        if not (kind == "lfs" and digest == info["sha256"]) and not (kind == "git" and digest == info["sha1"]):
+            changed.append(rel)
+    deleted = sorted(set(remote) - set(local)) if delete_missing else []
+    changed_bytes = sum(local[rel]["size"] for rel in changed)
+    print(f"📦 {repo_id}: {len(changed)} changed ({changed_bytes} bytes), "
+          f"{len(local) - len(changed)} unchanged, {len(deleted)} to delete")
+    if dry_run or not (changed or deleted):
+        return {"changed": changed, "deleted": deleted, "bytes": changed_bytes, "commit": None}
+
+    operations = [CommitOperationAdd(path_in_repo=rel, path_or_fileobj=os.path.join(folder, rel)) for rel in changed]
+    uploaded = set(state.data["uploaded"])
+    pending = []
+    for op, rel in zip(operations, changed):
+        if local[rel]["sha256"] in uploaded:
+            # Pushed by an interrupted run: mark it as such so create_commit
+            # (which preuploads every addition it is given) skips it.
+            op._upload_mode, op._is_uploaded = "lfs", True
+        else:
+            pending.append(op)
+    for start in range(0, len(pending), BATCH_FILES):
+        batch = pending[start:start + BATCH_FILES]
+        _with_retries(lambda: api.preupload_lfs_files(repo_id, additions=batch, repo_type=repo_type,
+                                                      revision=revision, num_threads=workers),
+                      f"uploading batch {start // BATCH_FILES + 1}")
+        # Regular files travel inside the commit itself, so only LFS objects count as pushed
+        uploaded.update(local[op.path_in_repo]["sha256"] for op in batch if op._upload_mode == "lfs")
+        state.data["uploaded"] = sorted(uploaded)
+        state.save()
+
+    if deleted:
+        operations += [CommitOperationDelete(path_in_repo=rel) for rel in deleted]
+    commit = _with_retries(lambda: api.create_commit(
+        repo_id, operations=operations, repo_type=repo_type, revision=revision, num_threads=workers,
+        commit_message=f"Update {len(changed)} files" + (f", delete {len(deleted)}" if deleted else "")
+    ), f"committing to {repo_id}")
+    state.data["uploaded"] = []
+    state.save()
+    return {"changed": changed, "deleted": deleted, "bytes": changed_bytes, "commit": commit.oid}
+
+def upload_to_hf(endpoint=None, workers=8, dry_run=False):
+    # Token comes from HF_TOKEN or a prior `huggingface-cli login`
+    for repo_id, folder, repo_type in PUBLISH_TARGETS:
+        publish_folder(repo_id, folder, repo_type, endpoint=endpoint, workers=workers, dry_run=dry_run)
+
     print("✅ All models and datasets uploaded to Hugging Face!")
 
 if __name__ == "__main__":
-    upload_to_hf()
+    parser = argparse.ArgumentParser(description="Publish models and datasets to the Hugging Face Hub incrementally")
+    parser.add_argument("--repo-id", help="Publish one folder to this repo instead of the default targets")
+    parser.add_argument("--folder", help="Local folder for --repo-id")
+    parser.add_argument("--repo-type", default="model", choices=["model", "dataset", "space"])
+    parser.add_argument("--endpoint", help="Hub base URL (default: HF_ENDPOINT or huggingface.co)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--delete-missing", action="store_true", help="Delete remote files absent locally")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be uploaded")
+    args = parser.parse_args()
+
+    if args.repo_id:
+        if not args.folder:
+            parser.error("--repo-id needs --folder")
+        publish_folder(args.repo_id, args.folder, args.repo_type, endpoint=args.endpoint, workers=args.workers,
+                       delete_missing=args.delete_missing, dry_run=args.dry_run)
+    else:
+        upload_to_hf(endpoint=args.endpoint, workers=args.workers, dry_run=args.dry_run)
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Offline Artifact Store for ADAN-ID OpenCloud
+Resolves model and dataset names to the local paths in offline_config.json,
+verifies them against a checksum manifest and memory-maps safetensors weights
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+OFFLINE_CONFIG_PATH = "offline/offline_config.json"
+MANIFEST_NAME = "checksums.json"
+# Size/mtime stamps of the last full verification; lets later starts skip re-hashing
+VERIFIED_NAME = ".verified.json"
+# "full" re-hashes every file, "quick" trusts unchanged size/mtime, "off" skips checks
+VERIFY_MODE = os.environ.get("ADANID_VERIFY_ARTIFACTS", "quick")
+# Strict offline: never fall back to the Hub (missing artifacts raise instead)
+STRICT_OFFLINE = os.environ.get("ADANID_OFFLINE", "0") == "1"
+
+# safetensors dtype codes -> numpy dtype names; BF16 is read as raw 16-bit words
+_NUMPY_DTYPES = {
+    "F64": "float64", "F32": "float32", "F16": "float16", "BF16": "int16",
+    "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8", "U8": "uint8", "BOOL": "bool",
+}
+
+class ArtifactIntegrityError(Exception):
+    """Raised when a local artifact does not match its checksum manifest"""
+
+@contextmanager
+def _meta_parameters():
+    """Parameters created inside are moved to the meta device: no memory, no random init
+
+    Buffers stay real, since non-persistent ones (position ids and the like)
+    are computed in __init__ and never appear in the state dict.
+    """
+    import torch
+
+    register_parameter = torch.nn.Module.register_parameter
+
+    def register_meta_parameter(module, name, param):
+        register_parameter(module, name, param)
+        if param is not None:
+            param = module._parameters[name]
+            module._parameters[name] = type(param)(param.to("meta"), requires_grad=param.requires_grad)
+
+    torch.nn.Module.register_parameter = register_meta_parameter
+    try:
+        yield
+    finally:
+        torch.nn.Module.register_parameter = register_parameter
+
+def _key(name: str) -> str:
+    """'ADANiD/Islamic-AI-Foundation' and 'islamic_ai_foundation' share one key"""
+    return name.rstrip("/").split("/")[-1].lower().replace("-", "_")
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _files(root: Path):
+    return sorted(
+        p for p in root.rglob("*")
+        if p.is_file() and p.name not in (MANIFEST_NAME, VERIFIED_NAME) and ".cache" not in p.parts
+    )
+
+class ArtifactStore:
+    """Local models and datasets declared in offline_config.json.
+
+    Names resolve by config key, by directory name, or by Hub ID (the part
+    after the slash), so "ADANiD/islamic-ai-foundation" finds
+    offline/local_models/islamic-ai-foundation. Anything that does not exist
+    locally resolves to itself, leaving the Hub as the fallback, unless
+    strict offline mode (ADANID_OFFLINE=1) is on.
+    """
+
+    def __init__(self, config: dict = None, strict: bool = None):
+        config = config or {}
+        self.strict = STRICT_OFFLINE if strict is None else strict
+        offline_mode = config.get("offline_mode", {})
+        self.offline = offline_mode.get("enabled", False)
+        self.models_path = Path(offline_mode.get("local_models_path", "offline/local_models"))
+        self.datasets_path = Path(offline_mode.get("local_datasets_path", "offline/local_datasets"))
+        self.models = self._index(config.get("models", {}))
+        self.datasets = self._index(config.get("datasets", {}))
+        self._verified = set()
+
+    @classmethod
+    def from_offline_config(cls, config_path: str = OFFLINE_CONFIG_PATH):
+        if os.path.exists(config_path):
+            with open(config_path, "r") as f:
+                return cls(json.load(f))
+        return cls()
+
+    @staticmethod
+    def _index(entries: dict) -> dict:
+        index = {}
+        for name, path in entries.items():
+            index[_key(name)] = Path(path)
+            index.setdefault(_key(Path(path).name), Path(path))
+        return index
+
+    # ==============================
+    # RESOLUTION
+    # ==============================
+    def _local(self, name: str, index: dict, root: Path):
+        if os.path.isdir(name):
+            return Path(name)
+        path = index.get(_key(name))
+        if path is None:
+            path = root / name.rstrip("/").split("/")[-1]
+        return path if path.is_dir() else None
+
+    def model_path(self, name: str):
+        """Local directory for a model, or None when it was never downloaded"""
+        return self._local(name, self.models, self.models_path)
+
+    def dataset_path(self, name: str):
+        """Local directory for a dataset, or None when it was never downloaded"""
+        return self._local(name, self.datasets, self.datasets_path)
+
+    def resolve_model(self, name: str, verify: bool = True) -> str:
+        """Path to pass to from_pretrained(): the verified local copy, else the name itself"""
+        path = self.model_path(name)
+        if path is None:
+            return self._hub_fallback(name, self.models_path)
+        if verify:
+            self.verify(path)
+        return str(path)
+
+    def resolve_dataset(self, name: str, verify: bool = True) -> str:
+        path = self.dataset_path(name)
+        if path is None:
+            return self._hub_fallback(name, self.datasets_path)
+        if verify:
+            self.verify(path)
+        return str(path)
+
+    def _hub_fallback(self, name: str, root: Path) -> str:
+        if self.strict:
+            raise FileNotFoundError(f"No local copy of {name} under {root} and ADANID_OFFLINE=1")
+        return name
+
+    def enable_offline_env(self):
+        """In strict offline mode, stop transformers/huggingface_hub from touching the network.
+
+        The variables are process-wide and read when those libraries are
+        imported, so this belongs at process entry points, not in constructors.
+        """
+        if self.strict:
+            os.environ.setdefault("HF_HUB_OFFLINE", "1")
+            os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+            os.environ.setdefault("HF_DATASETS_OFFLINE", "1")
+
+    # ==============================
+    # CHECKSUMS
+    # ==============================
+    @staticmethod
+    def write_manifest(path) -> dict:
+        """Hash every file under path into path/checksums.json"""
+        root = Path(path)
+        files = {
+            str(p.relative_to(root)): {"sha256": _sha256(p), "size": p.stat().st_size}
+            for p in _files(root)
+        }
+        (root / MANIFEST_NAME).write_text(json.dumps(files, indent=2, sort_keys=True))
+        (root / VERIFIED_NAME).unlink(missing_ok=True)
+        return files
+
+    def verify(self, path, mode: str = None) -> bool:
+        """Check path against its manifest; raises ArtifactIntegrityError on mismatch.
+
+        Returns False when there is no manifest to check against. Each path is
+        verified once per process; in "quick" mode a full hash only runs when a
+        file's size or mtime changed since the last successful full check.
+        """
+        root = Path(path)
+        mode = mode or VERIFY_MODE
+        if mode == "off" or root in self._verified:
+            return True
+        manifest_file = root / MANIFEST_NAME
+        if not manifest_file.exists():
+            return False
+        manifest = json.loads(manifest_file.read_text())
+
+        stamps = {}
+        for rel, expected in manifest.items():
+            file = root / rel
+            if not file.exists():
+                raise ArtifactIntegrityError(f"{root}: missing {rel}")
+            stat = file.stat()
+            if stat.st_size != expected["size"]:
+                raise ArtifactIntegrityError(f"{root}: {rel} is {stat.st_size} bytes, expected {expected['size']}")
+            stamps[rel] = [stat.st_size, stat.st_mtime_ns]
+
+        verified_file = root / VERIFIED_NAME
+        if mode == "quick" and verified_file.exists() and json.loads(verified_file.read_text()) == stamps:
+            self._verified.add(root)
+            return True
+
+        for rel, expected in manifest.items():
+            if _sha256(root / rel) != expected["sha256"]:
+                raise ArtifactIntegrityError(f"{root}: checksum mismatch for {rel}")
+        try:
+            verified_file.write_text(json.dumps(stamps))
+        except OSError:
+            pass  # read-only model directory; the next start hashes again
+        self._verified.add(root)
+        return True
+
+    # ==============================
+    # MEMORY-MAPPED WEIGHTS
+    # ==============================
+    @staticmethod
+    def mmap_safetensors(path) -> dict:
+        """Map a .safetensors file and return {name: numpy array} views into it.
+
+        The mapping is copy-on-write: every process that maps the same file
+        shares its page-cache pages, and a page is only copied if a process
+        writes to it (inference never does).
+        """
+        import numpy as np
+
+        with open(path, "rb") as f:
+            header_len = struct.unpack("<Q", f.read(8))[0]
+            header = json.loads(f.read(header_len))
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+        data_start = 8 + header_len
+        arrays = {}
+        for name, info in header.items():
+            if name == "__metadata__":
+                continue
+            begin, end = info["data_offsets"]
+            dtype = np.dtype(_NUMPY_DTYPES[info["dtype"]])
+            array = np.frombuffer(
+                buffer, dtype=dtype, count=(end - begin) // dtype.itemsize, offset=data_start + begin
+            ).reshape(info["shape"])
+            # The header length is arbitrary, so a tensor may start off its dtype's
+            # alignment; such tensors get a private aligned copy instead of a view
+            arrays[name] = array if array.flags.aligned else array.copy()
+        return arrays
+
+    def mmap_state_dict(self, name: str) -> dict:
+        """PyTorch state dict whose tensors live in the mapped safetensors files"""
+        import torch
+
+        path = self.model_path(name)
+        if path is None:
+            raise FileNotFoundError(f"No local copy of {name} under {self.models_path}")
+        self.verify(path)
+        files = sorted(path.glob("*.safetensors"))
+        if not files:
+            raise FileNotFoundError(f"{path} has no .safetensors weights")
+
+        state_dict = {}
+        for file in files:
+            with open(file, "rb") as f:
+                header = json.loads(f.read(struct.unpack("<Q", f.read(8))[0]))
+            for key, array in self.mmap_safetensors(file).items():
+                tensor = torch.from_numpy(array)
+                if header[key]["dtype"] == "BF16":
+                    tensor = tensor.view(torch.bfloat16)
+                state_dict[key] = tensor
+        return state_dict
+
+    def load_model(self, name: str, auto_class):
+        """Instantiate auto_class from the local config and point its weights at the mapped files"""
+        path = self.model_path(name)
+        state_dict = self.mmap_state_dict(name)
+        from transformers import AutoConfig
+
+        # Parameters start on the meta device, so no full random-initialized copy is ever allocated
+        with _meta_parameters():
+            model = auto_class.from_config(AutoConfig.from_pretrained(path))
+        # assign=True keeps the mapped tensors instead of copying into fresh parameters
+        missing = model.load_state_dict(state_dict, strict=False, assign=True).missing_keys
+        model.tie_weights()
+        untied = set(missing) - set(getattr(model, "_tied_weights_keys", None) or [])
+        if untied:
+            raise ArtifactIntegrityError(f"{path}: weights missing for {', '.join(sorted(untied)[:5])}")
+        return model.eval()
+
+    def has_safetensors(self, name: str) -> bool:
+        path = self.model_path(name)
+        return path is not None and any(path.glob("*.safetensors"))
+
+    # ==============================
+    # STATUS
+    # ==============================
+    def status(self) -> dict:
+        def describe(index):
+            return {
+                path.name: {"path": str(path), "present": path.is_dir(), "manifest": (path / MANIFEST_NAME).exists()}
+                for path in sorted(set(index.values()))
+            }
+        return {
+            "offline_mode": self.offline,
+            "strict_offline": self.strict,
+            "models": describe(self.models),
+            "datasets": describe(self.datasets),
+        }
+
+ARTIFACTS = ArtifactStore.from_offline_config()
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage offline models and datasets")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="Show configured artifacts and whether they are present")
+    manifest = sub.add_parser("manifest", help="Write checksums.json for downloaded artifacts")
+    manifest.add_argument("paths", nargs="*", help="Artifact directories (default: all present)")
+    verify = sub.add_parser("verify", help="Re-hash artifacts against their manifests")
+    verify.add_argument("paths", nargs="*")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        print(json.dumps(ARTIFACTS.status(), indent=2))
+        return
+
+    paths = [Path(p) for p in args.paths] or sorted(
+        {p for p in list(ARTIFACTS.models.values()) + list(ARTIFACTS.datasets.values()) if p.is_dir()}
+    )
+    failed = False
+    for path in paths:
+        if args.command == "manifest":
+            print(f"✅ {path}: {len(ARTIFACTS.write_manifest(path))} files hashed")
+            continue
+        try:
+            ok = ARTIFACTS.verify(path, mode="full")
+            print(f"✅ {path}: verified" if ok else f"⚠️ {path}: no {MANIFEST_NAME}")
+        except ArtifactIntegrityError as e:
+            print(f"❌ {e}")
+            failed = True
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Offline Biometric Authentication for ADAN-ID OpenCloud
+Works without internet connection
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+OFFLINE_CONFIG_PATH = "offline/offline_config.json"
+DEFAULT_REGISTRY_PATH = "offline/did_registry.db"
+# Pre-SQLite layout: a JSON list of DIDs plus one JSON template file per user
+LEGACY_REGISTRY_PATH = Path("offline/did_registry.json")
+LEGACY_TEMPLATES_PATH = Path("offline/biometric_templates")
+
+def registry_path_from_config(config_path: str = OFFLINE_CONFIG_PATH) -> str:
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            auth = json.load(f).get("services", {}).get("auth", {})
+        return auth.get("local_did_storage", DEFAULT_REGISTRY_PATH)
+    return DEFAULT_REGISTRY_PATH
+
+class DIDRegistry:
+    """SQLite-backed registry of offline DIDs and their biometric templates.
+
+    The database runs in WAL mode: readers never block each other or the
+    writer, and an enrollment is one small transaction instead of a rewrite
+    of the whole registry. Lookups by user_id go through the primary-key
+    index. Each thread gets its own connection.
+    """
+
+    def __init__(self, path: str = DEFAULT_REGISTRY_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._compactor = None
+        self._stop_compactor = threading.Event()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS dids ("
+                " user_id TEXT PRIMARY KEY,"
+                " template TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            # auto_vacuum only takes effect on a new database; it lets compact() return freed pages
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def put(self, user_id: str, template) -> None:
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO dids (user_id, template, created_at, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET template=excluded.template, updated_at=excluded.updated_at",
+                (user_id, json.dumps(template), now, now)
+            )
+
+    def get(self, user_id: str):
+        row = self._connection().execute("SELECT template FROM dids WHERE user_id = ?", (user_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete(self, user_id: str) -> bool:
+        with self._connection() as conn:
+            return conn.execute("DELETE FROM dids WHERE user_id = ?", (user_id,)).rowcount > 0
+
+    def __contains__(self, user_id: str) -> bool:
+        return self._connection().execute("SELECT 1 FROM dids WHERE user_id = ?", (user_id,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM dids").fetchone()[0]
+
+    def user_ids(self):
+        for (user_id,) in self._connection().execute("SELECT user_id FROM dids ORDER BY user_id"):
+            yield user_id
+
+    def items(self):
+        """Iterate (user_id, template) pairs without loading the registry into memory"""
+        for user_id, template in self._connection().execute("SELECT user_id, template FROM dids"):
+            yield user_id, json.loads(template)
+
+    def compact(self) -> None:
+        """Fold the WAL back into the database file and release freed pages"""
+        conn = self._connection()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("PRAGMA incremental_vacuum")
+
+    def start_compactor(self, interval_seconds: float = 300) -> None:
+        """Run compact() every interval_seconds on a daemon thread"""
+        if self._compactor is not None:
+            return
+        self._stop_compactor.clear()
+
+        def run():
+            while not self._stop_compactor.wait(interval_seconds):
+                try:
+                    self.compact()
+                except sqlite3.OperationalError:
+                    pass  # database busy; try again next round
+
+        self._compactor = threading.Thread(target=run, name="did-registry-compactor", daemon=True)
+        self._compactor.start()
+
+    def stop_compactor(self) -> None:
+        if self._compactor is not None:
+            self._stop_compactor.set()
+            self._compactor.join()
+            self._compactor = None
+
+    def close(self) -> None:
+        """Stop the compactor and close this thread's connection"""
+        self.stop_compactor()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def import_legacy(self, registry_file: Path = LEGACY_REGISTRY_PATH,
+                      templates_dir: Path = LEGACY_TEMPLATES_PATH) -> int:
+        """Copy users from the old did_registry.json + biometric_templates/ layout"""
+        if not registry_file.exists():
+            return 0
+        with open(registry_file, 'r') as f:
+            user_ids = json.load(f).get("local_dids", [])
+        imported = 0
+        for user_id in user_ids:
+            template_file = templates_dir / f"{user_id}.json"
+            if template_file.exists() and user_id not in self:
+                with open(template_file, 'r') as f:
+                    self.put(user_id, json.load(f))
+                imported += 1
+        return imported
+
+def _embedding(biometric_data):
+    """The embedding vector in a template or probe: {"embedding": [...]} or a bare list"""
+    if isinstance(biometric_data, dict):
+        biometric_data = biometric_data.get("embedding")
+    if isinstance(biometric_data, (list, tuple)) and biometric_data:
+        return biometric_data
+    return None
+
+def _vector(embedding):
+    """embedding as a finite 1-D float32 array, or None when it is not one"""
+    import numpy as np
+    if embedding is None:
+        return None
+    try:
+        vector = np.asarray(embedding, dtype=np.float32)
+    except (TypeError, ValueError):
+        return None
+    if vector.ndim != 1 or not np.all(np.isfinite(vector)):
+        return None
+    return vector
+
+class OfflineAuth:
+    MATCH_THRESHOLD = 0.8
+    # Enrolled templates needed before identification switches to the IVF index
+    IVF_MIN_TEMPLATES = int(os.environ.get("ADANID_IVF_MIN_TEMPLATES", 50000))
+
+    def __init__(self, registry_path: str = None):
+        self.did_registry = DIDRegistry(registry_path or registry_path_from_config())
+        if len(self.did_registry) == 0:
+            self.did_registry.import_legacy()
+        self.did_registry.start_compactor(float(os.environ.get("ADANID_DID_COMPACT_SECONDS", 300)))
+        self._matcher = None
+        self._matcher_lock = threading.Lock()
+
+    @property
+    def matcher(self):
+        """All enrolled embeddings in one TemplateMatcher, built on first identification"""
+        if self._matcher is None:
+            with self._matcher_lock:
+                if self._matcher is None:
+                    self._matcher = self._build_matcher()
+        return self._matcher
+
+    def _build_matcher(self):
+        from services.biometric_matcher import TemplateMatcher
+        user_ids, embeddings = [], []
+        for user_id, template in self.did_registry.items():
+            embedding = _embedding(template)
+            if embedding is not None:
+                user_ids.append(user_id)
+                embeddings.append(embedding)
+        if not embeddings:
+            return None
+        matcher = TemplateMatcher(len(embeddings[0]), capacity=len(embeddings))
+        matcher.add_many(user_ids, embeddings)
+        if len(matcher) >= self.IVF_MIN_TEMPLATES:
+            matcher.build_ivf()
+        return matcher
+
+    def register_offline(self, user_id, biometric_data):
+        """Register user biometric data locally"""
+        embedding = _embedding(biometric_data)
+        if self._matcher is not None and embedding is not None:
+            # Index first: a template the matcher rejects never reaches the registry
+            try:
+                self._matcher.add(user_id, embedding)
+            except (TypeError, ValueError) as e:
+                return {"status": "error", "message": str(e)}
+        self.did_registry.put(user_id, biometric_data)
+        return {"status": "success", "message": "User registered offline"}
+
+    def close(self):
+        """Stop the registry's background compactor"""
+        self.did_registry.close()
+
+    def authenticate_offline(self, user_id, biometric_input, top_k=5):
+        """Authenticate user using local biometric templates
+
+        Without a user_id this is 1:N identification against every enrolled template.
+        """
+        if not user_id:
+            return self.identify_offline(biometric_input, top_k)
+
+        stored_template = self.did_registry.get(user_id)
+        if stored_template is None:
+            return {"status": "error", "message": "User not found"}
+
+        match_score = self._calculate_match_score(biometric_input, stored_template)
+        is_authenticated = match_score > self.MATCH_THRESHOLD
+
+        return {
+            "authenticated": is_authenticated,
+            "match_score": match_score,
+            "offline_mode": True
+        }
+
+    def identify_offline(self, biometric_input, top_k=5):
+        """Find the enrolled users whose templates best match biometric_input"""
+        probe = _vector(_embedding(biometric_input))
+        if probe is None:
+            return {"status": "error", "message": "Identification needs a flat embedding of finite numbers"}
+        matcher = self.matcher
+        if matcher is None:
+            return {"status": "error", "message": "No enrolled templates"}
+        if len(probe) != matcher.dim:
+            return {"status": "error", "message": f"Expected a {matcher.dim}-dimensional embedding, got {len(probe)}"}
+
+        candidates = matcher.search(probe, k=top_k)
+        best = candidates[0] if candidates and candidates[0]["score"] > self.MATCH_THRESHOLD else None
+        return {
+            "authenticated": best is not None,
+            "user_id": best["user_id"] if best else None,
+            "match_score": candidates[0]["score"] if candidates else 0.0,
+            "candidates": candidates,
+            "offline_mode": True
+        }
+
+    def _calculate_match_score(self, input_data, stored_template):
+        # Fail closed: without two comparable embeddings there is nothing to match,
+        # including legacy templates that were enrolled without one
+        probe, enrolled = _vector(_embedding(input_data)), _vector(_embedding(stored_template))
+        if probe is None or enrolled is None or len(probe) != len(enrolled):
+            return 0.0
+        import numpy as np
+        return round(float(probe @ enrolled / max(np.linalg.norm(probe) * np.linalg.norm(enrolled), 1e-12)), 4)
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline DID registry")
+    parser.add_argument("command", choices=["init", "stats", "compact"])
+    parser.add_argument("--registry", help="SQLite registry path (default: offline_config.json)")
+    args = parser.parse_args()
+
+    registry = DIDRegistry(args.registry or registry_path_from_config())
+    if args.command == "init":
+        print(f"✅ DID registry ready at {registry.path} ({registry.import_legacy()} legacy users imported)")
+    elif args.command == "compact":
+        registry.compact()
+        print(f"✅ Compacted {registry.path}")
+    else:
+        print(json.dumps({"path": str(registry.path), "users": len(registry)}))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Biometric Template Matcher for ADAN-ID OpenCloud
+1:N identification over enrolled embeddings with one batched similarity pass
+"""
+
+import threading
+
+import numpy as np
+
+class TemplateMatcher:
+    """Cosine-similarity matcher over a contiguous float32 template matrix.
+
+    Templates are L2-normalized on insert, so one matrix-vector product
+    scores a probe against every enrolled user. build_ivf() adds an optional
+    inverted-file index: templates are clustered with k-means and a search
+    only scores the n_probe clusters closest to the probe, which keeps 1M
+    templates well inside interactive latency on a CPU at a small recall cost.
+    """
+
+    def __init__(self, dim: int, capacity: int = 1024):
+        self.dim = dim
+        self._matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self._ids = []
+        self._row_of = {}
+        self._free = []
+        self._lock = threading.Lock()
+        self.centroids = None
+        self._lists = None
+        self.n_probe = 1
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _as_probe(self, embedding) -> np.ndarray:
+        probe = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        if probe.shape[0] != self.dim:
+            raise ValueError(f"Expected a {self.dim}-dimensional embedding, got {probe.shape[0]}")
+        return self._normalize(probe)
+
+    def add(self, user_id: str, embedding) -> None:
+        self.add_many([user_id], [embedding])
+
+    def add_many(self, user_ids, embeddings) -> None:
+        """Enroll (or replace) several templates with one normalization pass"""
+        vectors = self._normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(user_ids), self.dim))
+        with self._lock:
+            for user_id, vector in zip(user_ids, vectors):
+                row = self._row_of.get(user_id)
+                if row is not None:
+                    self._unlist(row)
+                elif self._free:
+                    row = self._free.pop()
+                    self._ids[row] = user_id
+                else:
+                    row = len(self._ids)
+                    self._ensure_capacity(row + 1)
+                    self._ids.append(user_id)
+                self._row_of[user_id] = row
+                self._matrix[row] = vector
+                if self._lists is not None:
+                    cluster = int(np.argmax(self.centroids @ vector))
+                    self._lists[cluster] = np.append(self._lists[cluster], row)
+
+    def remove(self, user_id: str) -> bool:
+        with self._lock:
+            row = self._row_of.pop(user_id, None)
+            if row is None:
+                return False
+            self._unlist(row)
+            self._matrix[row] = 0
+            self._ids[row] = None
+            self._free.append(row)
+            return True
+
+    def _unlist(self, row: int) -> None:
+        if self._lists is not None:
+            cluster = int(np.argmax(self.centroids @ self._matrix[row]))
+            self._lists[cluster] = self._lists[cluster][self._lists[cluster] != row]
+
+    def _ensure_capacity(self, rows: int) -> None:
+        if rows > self._matrix.shape[0]:
+            grown = np.zeros((max(rows, 2 * self._matrix.shape[0]), self.dim), dtype=np.float32)
+            grown[:len(self._ids)] = self._matrix[:len(self._ids)]
+            self._matrix = grown
+
+    def build_ivf(self, n_lists: int = None, n_probe: int = 8, iterations: int = 10, sample_size: int = 65536) -> None:
+        """Cluster the enrolled templates into n_lists inverted lists (default ~sqrt(N))"""
+        with self._lock:
+            rows = np.fromiter(self._row_of.values(), dtype=np.int64, count=len(self._row_of))
+            if len(rows) == 0:
+                return
+            n_lists = min(n_lists or max(1, int(np.sqrt(len(rows)))), len(rows))
+            rng = np.random.default_rng(0)
+            sample = self._matrix[rng.choice(rows, min(sample_size, len(rows)), replace=False)]
+            centroids = sample[rng.choice(len(sample), n_lists, replace=False)]
+            for _ in range(iterations):
+                assignment = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assignment, sample)
+                counts = np.bincount(assignment, minlength=n_lists)
+                # Empty clusters keep their previous centroid
+                centroids = np.where(counts[:, None] > 0, self._normalize(sums), centroids)
+
+            assignment = np.concatenate([
+                np.argmax(self._matrix[chunk] @ centroids.T, axis=1)
+                for chunk in np.array_split(rows, max(1, len(rows) // 65536))
+            ])
+            order = np.argsort(assignment, kind="stable")
+            bounds = np.searchsorted(assignment[order], np.arange(n_lists + 1))
+            self.centroids = centroids.astype(np.float32)
+            self._lists = [rows[order[bounds[i]:bounds[i + 1]]] for i in range(n_lists)]
+            self.n_probe = min(n_probe, n_lists)
+
+    def search(self, embedding, k: int = 5, threshold: float = None, exact: bool = False) -> list:
+        """Top-k enrolled users by cosine similarity, best first.
+
+        With an IVF index only the n_probe closest clusters are scored unless
+        exact=True. Matches scoring below threshold are dropped.
+        """
+        probe = self._as_probe(embedding)
+        with self._lock:
+            if self._lists is not None and not exact:
+                nearest = np.argpartition(-(self.centroids @ probe), self.n_probe - 1)[:self.n_probe]
+                rows = np.concatenate([self._lists[c] for c in nearest])
+                scores = self._matrix[rows] @ probe
+            else:
+                rows = np.arange(len(self._ids))
+                scores = self._matrix[:len(self._ids)] @ probe
+            ids = self._ids
+
+            k = min(k, len(rows))
+            if k == 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            matches = [
+                {"user_id": ids[rows[i]], "score": round(float(scores[i]), 4)}
+                for i in top if ids[rows[i]] is not None
+            ]
+        if threshold is not None:
+            matches = [m for m in matches if m["score"] >= threshold]
+        return matches
+
+    def score(self, user_id: str, embedding) -> float:
+        """1:1 cosine similarity against one enrolled template"""
+        probe = self._as_probe(embedding)
+        with self._lock:
+            row = self._row_of.get(user_id)
+            return None if row is None else float(self._matrix[row] @ probe)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Micro-batching request queue for ADAN-ID OpenCloud
+Collects concurrent API requests into dynamic batches for one model forward pass
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class MicroBatcher:
+    """Async queue that groups concurrent submissions into batches.
+
+    The first queued item opens a batch; the batch is dispatched as soon as it
+    holds max_batch_size items or max_wait_ms has passed since it opened,
+    whichever comes first. batch_fn receives a list of items and must return
+    a list of results in the same order; an exception, or a result list of the
+    wrong length, fails every request in the batch. It runs on a single worker thread, so
+    the model sees one batch at a time and the event loop is never blocked.
+
+    Latency bound: a request waits at most max_wait_ms to be batched, plus the
+    forward pass of its own batch, plus any batch already running. Under
+    saturation the p99 is therefore about max_wait_ms + 2 x (batch time at
+    max_batch_size).
+    """
+
+    def __init__(self, batch_fn, max_batch_size: int = 16, max_wait_ms: float = 10, name: str = "batcher"):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self._queue = None
+        self._worker = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self.batches = 0
+        self.items = 0
+        self.last_batch_seconds = 0.0
+
+    async def submit(self, item):
+        """Queue one item and wait for its result"""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "last_batch_seconds": round(self.last_batch_seconds, 4),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued": self._queue.qsize() if self._queue else 0,
+        }
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        self._executor.shutdown(wait=False)
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._queue = self._queue or asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            items = [item for item, _ in batch]
+            started = time.perf_counter()
+            try:
+                results = list(await loop.run_in_executor(self._executor, self.batch_fn, items))
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                self.last_batch_seconds = time.perf_counter() - started
+                self.batches += 1
+                self.items += len(batch)
+
+            if len(results) != len(batch):
+                error = RuntimeError(f"{self.name}: batch_fn returned {len(results)} results for {len(batch)} items")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
@@ -4,55 +4,150 @@ Offline Router for ADAN-ID OpenCloud
 Routes requests to offline services when internet is unavailable
 """
 
+import asyncio
 import os
 import json
+import threading
 from pathlib import Path
 
+from services.artifact_store import ArtifactStore
+
+def _offline_auth():
+    from services.auth_offline import OfflineAuth
+    return OfflineAuth()
+
+def _offline_storage():
+    from services.storage_offline import OfflineStorage
+    return OfflineStorage()
+
+def _offline_vault():
+    from services.vault_offline import OfflineVault
+    return OfflineVault()
+
 class OfflineRouter:
+    """Dispatches offline endpoints to long-lived service instances.
+
+    Each service is built on its first request and then reused for the life
+    of the process, so a request costs one dict lookup plus the handler
+    itself. reload() drops instances (and re-reads the config) after their
+    on-disk state was changed by another process; dropped instances with a
+    close() method are closed so their background threads stop.
+    """
+
     def __init__(self):
         self.offline_config = self._load_offline_config()
         self.offline_mode = self.offline_config.get("offline_mode", {}).get("enabled", False)
-    
+        self.artifacts = ArtifactStore(self.offline_config)
+
+        self._factories = {}
+        self._services = {}
+        self._lock = threading.Lock()
+        self._handlers = {}
+
+        self.register_service("auth", _offline_auth)
+        self.register_service("storage", _offline_storage)
+        self.register_service("vault", _offline_vault)
+
+        self.register("/auth/biometric/offline", "auth",
+                      lambda auth, data: auth.authenticate_offline(data.get("user_id"), data.get("biometric_input"),
+                                                                  data.get("top_k", 5)))
+        self.register("/storage/offline/upload", "storage",
+                      lambda storage, data: storage.upload_offline(data.get("filename"), data.get("content"),
+                                                                  data.get("content_base64")))
+        self.register("/storage/offline/download", "storage",
+                      lambda storage, data: storage.download_offline(data.get("filename")))
+        self.register("/storage/offline/delete", "storage",
+                      lambda storage, data: storage.delete_offline(data.get("filename")))
+        self.register("/storage/offline/usage", "storage",
+                      lambda storage, data: storage.usage())
+        self.register("/vault/abjad/offline", "vault",
+                      lambda vault, data: vault.calculate_abjad_offline(data.get("text")))
+        self.register("/vault/entropy/offline", "vault",
+                      lambda vault, data: vault.generate_entropy_offline())
+        self.register("/vault/keys/offline", "vault",
+                      lambda vault, data: vault.issue_keys_offline(data.get("count", 1), data.get("purpose", "generic")))
+        self.register("/vault/metrics/offline", "vault",
+                      lambda vault, data: vault.pool_metrics())
+        self.register("/artifacts/offline", None,
+                      lambda _, data: self.artifacts.status())
+
     def _load_offline_config(self):
         config_file = Path("offline/offline_config.json")
         if config_file.exists():
             with open(config_file, 'r') as f:
                 return json.load(f)
         return {"offline_mode": {"enabled": False}}
-    
+
+    def register_service(self, name, factory):
+        """Register a zero-argument factory; the instance is created on first use"""
+        self._factories[name] = factory
+
+    def register(self, endpoint, service, handler):
+        """Route endpoint to handler(service_instance, data); service may be None"""
+        self._handlers[endpoint] = (service, handler)
+
+    def service(self, name):
+        instance = self._services.get(name)
+        if instance is None:
+            with self._lock:
+                instance = self._services.get(name)
+                if instance is None:
+                    instance = self._services[name] = self._factories[name]()
+        return instance
+
+    def loaded_service(self, name):
+        """The service instance if it was already built, without building it"""
+        return self._services.get(name)
+
+    def reload(self, name=None):
+        """Drop one cached service (or all of them) so the next request rebuilds it"""
+        with self._lock:
+            if name is None:
+                dropped = list(self._services.values())
+                self._services.clear()
+                self.offline_config = self._load_offline_config()
+                self.offline_mode = self.offline_config.get("offline_mode", {}).get("enabled", False)
+                self.artifacts = ArtifactStore(self.offline_config)
+            else:
+                dropped = [s for s in [self._services.pop(name, None)] if s is not None]
+        # Outside the lock: closing joins background threads
+        for instance in dropped:
+            self._close(instance)
+
+    def close(self):
+        """Close every built service; the router stays usable and rebuilds them on demand"""
+        with self._lock:
+            dropped = list(self._services.values())
+            self._services.clear()
+        for instance in dropped:
+            self._close(instance)
+
+    @staticmethod
+    def _close(instance):
+        close = getattr(instance, "close", None)
+        if close is not None:
+            close()
+
     def route_request(self, endpoint, data=None):
         """Route request to appropriate offline service"""
         if not self.offline_mode:
             return {"error": "Offline mode not enabled"}
-        
-        if endpoint == "/auth/biometric/offline":
-            from services.auth_offline import OfflineAuth
-            auth = OfflineAuth()
-            return auth.authenticate_offline(data.get("user_id"), data.get("biometric_input"))
-        
-        elif endpoint == "/storage/offline/upload":
-            from services.storage_offline import OfflineStorage
-            storage = OfflineStorage()
-            return storage.upload_offline(data.get("filename"), data.get("content"))
-        
-        elif endpoint == "/storage/offline/download":
-            from services.storage_offline import OfflineStorage
-            storage = OfflineStorage()
-            return storage.download_offline(data.get("filename"))
-        
-        elif endpoint == "/vault/abjad/offline":
-            from services.vault_offline import OfflineVault
-            vault = OfflineVault()
-            return vault.calculate_abjad_offline(data.get("text"))
-        
-        elif endpoint == "/vault/entropy/offline":
-            from services.vault_offline import OfflineVault
-            vault = OfflineVault()
-            return vault.generate_entropy_offline()
-        
-        else:
+
+        route = self._handlers.get(endpoint)
+        if route is None:
             return {"error": "Offline endpoint not supported"}
 
+        service, handler = route
+        return handler(self.service(service) if service else None, data or {})
+
+    async def aroute_request(self, endpoint, data=None):
+        """route_request on a worker thread, for use from async code such as the FastAPI app"""
+        return await asyncio.to_thread(self.route_request, endpoint, data)
+
+    async def awarmup(self, names=None):
+        """Build services ahead of the first request without blocking the event loop"""
+        await asyncio.gather(*(asyncio.to_thread(self.service, name) for name in names or self._factories))
+
 # Usage example
 if __name__ == "__main__":
     router = OfflineRouter()
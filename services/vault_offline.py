@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Offline Security Vault for ADAN-ID OpenCloud
+Calculates Abjad values and issues Quranic-mixed entropy without internet
+"""
+
+import hashlib
+import os
+import secrets
+import threading
+import time
+from collections import deque
+
+from src.core.abjad_calculator import ABJAD
+from src.core.verse_index import VerseIndex
+
+# Fallback verse set when the verse index has not been built (same verses as security/abjad-entropy.js)
+ENTROPY_VERSES = [
+    'بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ',
+    'الْحَمْدُ لِلَّهِ رَبِّ الْعَالَمِينَ',
+    'الرَّحْمَٰنِ الرَّحِيمِ',
+    'مَالِكِ يَوْمِ الدِّينِ',
+    'إِيَّاكَ نَعْبُدُ وَإِيَّاكَ نَسْتَعِينُ',
+    'اهْدِنَا الصِّرَاطَ الْمُسْتَقِيمَ',
+    'صِرَاطَ الَّذِينَ أَنْعَمْتَ عَلَيْهِمْ',
+    'قُلْ هُوَ اللَّهُ أَحَدٌ',
+    'اللَّهُ الصَّمَدُ',
+    'لَمْ يَلِدْ وَلَمْ يُولَدْ',
+    'وَلَمْ يَكُن لَّهُ كُفُوًا أَحَدٌ',
+    'قُلْ أَعُوذُ بِرَبِّ الْفَلَقِ',
+    'مِن شَرِّ مَا خَلَقَ',
+    'وَمِن شَرِّ غَاسِقٍ إِذَا وَقَبَ',
+    'وَمِن شَرِّ النَّفَّاثَاتِ فِي الْعُقَدِ',
+    'وَمِن شَرِّ حَاسِدٍ إِذَا حَسَدَ',
+    'قُلْ أَعُوذُ بِرَبِّ النَّاسِ',
+    'مَلِكِ النَّاسِ',
+    'إِلَٰهِ النَّاسِ',
+    'مِن شَرِّ الْوَسْوَاسِ الْخَنَّاسِ',
+]
+
+POOL_SIZE = int(os.environ.get("ADANID_ENTROPY_POOL_SIZE", 4096))
+POOL_REFILL_BELOW = float(os.environ.get("ADANID_ENTROPY_REFILL_BELOW", 0.5))
+BLOCK_BYTES = 32
+VERSES_PER_BLOCK = 3
+MAX_KEYS_PER_CALL = 1024
+
+class EntropyPool:
+    """Bounded pool of pre-mixed 256-bit entropy blocks, topped up by a daemon thread.
+
+    Each block is os.urandom bytes mixed (BLAKE2b) with the precomputed
+    digests of VERSES_PER_BLOCK randomly chosen verses; the CSPRNG supplies
+    the unpredictability, the verse digests the Abjad binding. The refill
+    thread wakes when the pool drops below refill_below x size and fills it
+    back up in batches. If a burst drains the pool, take() mixes the missing
+    blocks inline instead of waiting, and the underflow is counted.
+    """
+
+    def __init__(self, verse_digests, verse_refs, size: int = POOL_SIZE, refill_below: float = POOL_REFILL_BELOW):
+        self.verse_digests = verse_digests
+        self.verse_refs = verse_refs
+        self.size = size
+        self.refill_at = int(size * refill_below)
+        self._blocks = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self.low_water_mark = size
+        self.blocks_served = 0
+        self.inline_blocks = 0
+        self.refills = 0
+        self.last_refill_seconds = 0.0
+        self._fill(size)
+        self._thread = threading.Thread(target=self._refill_loop, name="entropy-pool", daemon=True)
+        self._thread.start()
+
+    def _mix(self, count: int) -> list:
+        randomness = os.urandom(count * BLOCK_BYTES)
+        blocks = []
+        for i in range(count):
+            picks = [secrets.randbelow(len(self.verse_digests)) for _ in range(VERSES_PER_BLOCK)]
+            mixer = hashlib.blake2b(randomness[i * BLOCK_BYTES:(i + 1) * BLOCK_BYTES], digest_size=BLOCK_BYTES)
+            for pick in picks:
+                mixer.update(self.verse_digests[pick])
+            blocks.append((mixer.digest(), picks))
+        return blocks
+
+    def _fill(self, count: int):
+        started = time.perf_counter()
+        blocks = self._mix(count)
+        with self._lock:
+            self._blocks.extend(blocks[:self.size - len(self._blocks)])
+        self.refills += 1
+        self.last_refill_seconds = time.perf_counter() - started
+
+    def _refill_loop(self):
+        while not self._stopped.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            while not self._stopped.is_set() and len(self._blocks) < self.size:
+                self._fill(min(512, self.size - len(self._blocks)))
+
+    def take(self, count: int = 1) -> list:
+        """count (block, verse picks) pairs; never blocks on the refill thread"""
+        with self._lock:
+            served = [self._blocks.popleft() for _ in range(min(count, len(self._blocks)))]
+            remaining = len(self._blocks)
+            self.low_water_mark = min(self.low_water_mark, remaining)
+            self.blocks_served += count
+            self.inline_blocks += count - len(served)
+        if len(served) < count:
+            served += self._mix(count - len(served))
+        if remaining < self.refill_at:
+            self._wake.set()
+        return served
+
+    def reset_low_water_mark(self):
+        with self._lock:
+            self.low_water_mark = len(self._blocks)
+
+    def close(self):
+        self._stopped.set()
+        self._wake.set()
+        self._thread.join()
+
+    def metrics(self) -> dict:
+        return {
+            "size": self.size,
+            "available": len(self._blocks),
+            "refill_below": self.refill_at,
+            "low_water_mark": self.low_water_mark,
+            "blocks_served": self.blocks_served,
+            "inline_blocks": self.inline_blocks,
+            "refills": self.refills,
+            "last_refill_seconds": round(self.last_refill_seconds, 6),
+        }
+
+    def prometheus_text(self) -> str:
+        """metrics() in the Prometheus text exposition format"""
+        lines = []
+        for name, value in self.metrics().items():
+            kind = "counter" if name in ("blocks_served", "inline_blocks", "refills") else "gauge"
+            metric = f"adanid_entropy_pool_{name}" + ("_total" if kind == "counter" else "")
+            lines += [f"# TYPE {metric} {kind}", f"{metric} {value}"]
+        return "\n".join(lines) + "\n"
+
+class OfflineVault:
+    def __init__(self, pool_size: int = POOL_SIZE):
+        self.abjad_calc = ABJAD
+        self.verse_index = VerseIndex.open_default()
+        # Verse digests are computed once here, never per request
+        self.verse_refs, self.verse_digests = self._verse_digests()
+        self.entropy_pool = EntropyPool(self.verse_digests, self.verse_refs, size=pool_size)
+
+    def _verse_digests(self):
+        """(surah, ayah, abjad) references and SHA-256 digests of every entropy verse"""
+        if self.verse_index is not None:
+            verses = [self.verse_index.verse(row) for row in range(len(self.verse_index))]
+            refs = [(v["surah"], v["ayah"], v["abjad_value"]) for v in verses]
+            texts = [v["text"] for v in verses]
+        else:
+            values = self.abjad_calc.calculate_many(ENTROPY_VERSES).tolist()
+            refs = [(None, None, value) for value in values]
+            texts = ENTROPY_VERSES
+        digests = [
+            hashlib.sha256(f"{surah}:{ayah}|{abjad}|{text}".encode("utf-8")).digest()
+            for (surah, ayah, abjad), text in zip(refs, texts)
+        ]
+        return refs, digests
+
+    def calculate_abjad_offline(self, text):
+        """Calculate Abjad value offline"""
+        abjad_value = self.abjad_calc.calculate(text)
+        if self.verse_index is not None:
+            is_bismillah = self.verse_index.validate_bismillah(text)
+            verse_matches = [{"surah": m["surah"], "ayah": m["ayah"]} for m in self.verse_index.match_text(text)]
+        else:
+            is_bismillah = self.abjad_calc.validate_bismillah(text)
+            verse_matches = []
+
+        return {
+            "text": text,
+            "abjad_value": abjad_value,
+            "is_bismillah": is_bismillah,
+            "verse_matches": verse_matches,
+            "offline_mode": True,
+            "source": "local_calculation"
+        }
+
+    def generate_entropy_offline(self):
+        """Generate Quranic entropy offline"""
+        bismillah_value = 786
+        allah_value = 66
+        ahad_value = 13
+
+        entropy_seed = (bismillah_value * allah_value * ahad_value) % (2**32)
+        block, picks = self.entropy_pool.take(1)[0]
+
+        return {
+            "entropy": block.hex(),
+            "entropy_seed": entropy_seed,
+            "total_abjad_value": sum(self.verse_refs[p][2] for p in picks),
+            "bismillah": bismillah_value,
+            "allah": allah_value,
+            "ahad": ahad_value,
+            "offline_mode": True
+        }
+
+    def issue_keys_offline(self, count=1, purpose="generic"):
+        """Hand out count 256-bit keys from the pool in one call, domain-separated by purpose
+
+        count is capped at MAX_KEYS_PER_CALL; purpose is at most 16 UTF-8 bytes
+        so that distinct purposes never share a BLAKE2b personalization.
+        """
+        # JSON callers may send the count as a string
+        if isinstance(count, str) and count.strip().isdigit():
+            count = int(count)
+        if isinstance(count, bool) or not isinstance(count, int) or count < 1:
+            return {"error": "count must be a positive integer"}
+        count = min(count, MAX_KEYS_PER_CALL)
+        if not isinstance(purpose, str) or not purpose:
+            return {"error": "purpose must be a non-empty string"}
+        person = purpose.encode("utf-8")
+        if len(person) > 16:
+            return {"error": "purpose must be at most 16 bytes of UTF-8"}
+        keys = [
+            hashlib.blake2b(block, digest_size=32, person=person).hexdigest()
+            for block, _ in self.entropy_pool.take(count)
+        ]
+        return {"keys": keys, "purpose": purpose, "count": len(keys), "offline_mode": True}
+
+    def pool_metrics(self):
+        return self.entropy_pool.metrics()
+
+    def close(self):
+        """Stop the entropy pool's refill thread"""
+        self.entropy_pool.close()
+
+if __name__ == "__main__":
+    vault = OfflineVault()
+    print("✅ Offline security vault ready")
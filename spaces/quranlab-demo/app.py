@@ -2,16 +2,20 @@ import gradio as gr
 import os
 import sys
 sys.path.append("../projects/quranlab/ai")
-from quran_inference_pipeline import run_full_inference_pipeline
+from quran_inference_pipeline import run_full_inference_pipeline, warmup_models
+
+# Load every model once at startup so requests only pay inference time
+warmup_models()
 
 def analyze_recitation(audio_file):
     result = run_full_inference_pipeline(audio_file)
     if result:
+        # Stages that failed are reported as N/A; the rest still show
         return (
-            result["text"],
-            f"Surah {result['surah']}, Ayah {result['ayah']}",
-            ", ".join(result["tajweed_errors"]),
-            f"{result['pronunciation_score']}/100"
+            result["text"] or "Error",
+            f"Surah {result['surah']}, Ayah {result['ayah']}" if result["surah"] else "N/A",
+            ", ".join(result["tajweed_errors"]) if result["tajweed_errors"] is not None else "N/A",
+            f"{result['pronunciation_score']}/100" if result["pronunciation_score"] is not None else "N/A"
         )
     else:
         return ("Error", "N/A", "N/A", "N/A")
@@ -4,30 +4,67 @@ Quranic AI Engine for ADANiD CLI
 """
 
 import os
+import sys
 import json
-from typing import Dict, Any, Optional
-from transformers import pipeline
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Iterator
+from src.core.abjad_calculator import ABJAD
+from src.core.verse_index import VerseIndex
+from src.core.result_cache import ResultCache
+from src.core.inference_backend import DEFAULT_BACKEND, load_classifier
+
+# Directory holding the QuranLab recitation pipeline (quran_inference_pipeline.py)
+QURANLAB_AI_PATH = os.environ.get(
+    "QURANLAB_AI_PATH",
+    str(Path(__file__).resolve().parent.parent / "projects" / "quranlab" / "ai")
+)
+
+def _quiet_model_libraries():
+    """Keep transformers/Hub warnings and progress bars out of the CLI output
+    
+    stdout carries the JSON stream, so only errors are let through.
+    """
+    import transformers
+    from huggingface_hub.utils import disable_progress_bars
+    transformers.logging.set_verbosity_error()
+    disable_progress_bars()
 
 class QuranicAIEngine:
-    def __init__(self, model: str = "quranlab-ai"):
+    # CLI model names and the Hub classifiers behind them
+    MODEL_IDS = {
+        "quranlab-ai": "ADANiD/Quranlab-AI",
+        "islamic-ai-foundation": "ADANiD/islamic-ai-foundation"
+    }
+    
+    def __init__(self, model: str = "quranlab-ai", backend: Optional[str] = None):
         self.model_name = model
+        # pytorch (fp32), int8 (dynamic quantization) or onnx; see src.core.inference_backend
+        self.backend = backend or DEFAULT_BACKEND
         self.pipeline = None
-        self.load_model()
+        # Memory-mapped ayah index; None until built with `python -m src.core.verse_index build`
+        self.verse_index = VerseIndex.open_default()
+        self.cache = ResultCache.from_offline_config()
+        self.model_revision = None
+        # The model (and transformers/torch) load on first use, not here,
+        # so commands that never classify text start instantly.
+        self._model_loaded = False
+        self._load_lock = threading.Lock()
+        # Semantic search index and its encoder, opened on the first /search
+        self.semantic_index = None
+        self._encoder = None
+        self._search_lock = threading.Lock()
     
     def load_model(self):
         """Load the appropriate AI model"""
-        if self.model_name == "quranlab-ai":
-            # Load fine-tuned Quranlab-AI model
-            self.pipeline = pipeline(
-                "text-classification",
-                model="ADANiD/Quranlab-AI",
-                tokenizer="ADANiD/Quranlab-AI"
-            )
-        elif self.model_name == "islamic-ai-foundation":
-            self.pipeline = pipeline(
-                "text-classification", 
-                model="ADANiD/islamic-ai-foundation"
-            )
+        model_id = self.MODEL_IDS.get(self.model_name)
+        if model_id is not None:
+            self.pipeline = load_classifier(model_id, "text-classification", self.backend)
+        if self.pipeline is not None:
+            # Hub commit hash when available, so a new model revision never serves stale cache entries
+            config = self.pipeline.model.config
+            self.model_revision = getattr(config, "_commit_hash", None) or config.name_or_path
+        self._model_loaded = True
     
     def analyze(self, prompt: str, audio: Optional[str] = None, context: Optional[Dict] = None) -> Dict[str, Any]:
         """Analyze prompt with Quranic AI"""
@@ -38,46 +75,210 @@ class QuranicAIEngine:
             # Handle text input
             return self._analyze_text(prompt, context)
     
+    def _cache_model_key(self) -> str:
+        # Quantized backends can disagree with fp32, so they get their own entries
+        return f"{self.model_name}:{self.backend}"
+    
+    def _ensure_model(self):
+        if not self._model_loaded:
+            with self._load_lock:
+                if not self._model_loaded:
+                    self.load_model()
+    
+    def _peek_revision(self) -> Optional[str]:
+        """The revision load_model() would report, read from disk without loading the model
+        
+        None when it cannot be known yet (nothing downloaded); the model is then loaded first.
+        """
+        model_id = self.MODEL_IDS.get(self.model_name)
+        if model_id is None:
+            return None
+        from services.artifact_store import ARTIFACTS
+        local = ARTIFACTS.model_path(model_id)
+        if local is not None:
+            return str(local)
+        from huggingface_hub import try_to_load_from_cache
+        config = try_to_load_from_cache(model_id, "config.json")
+        # .../snapshots/<commit hash>/config.json
+        return Path(config).parent.name if isinstance(config, str) else None
+    
+    def _cache_revision(self) -> Optional[str]:
+        return self.model_revision if self._model_loaded else self._peek_revision()
+    
     def _analyze_text(self, prompt: str, context: Optional[Dict] = None) -> Dict[str, Any]:
         """Analyze text prompt"""
+        # A cache hit answers without loading the model (and transformers/torch) at all
+        revision = self._cache_revision()
+        if revision is not None:
+            cached = self.cache.get(ResultCache.make_key(prompt, self._cache_model_key(), revision))
+            if cached is not None:
+                return dict(cached)
+        
+        self._ensure_model()
         if self.pipeline is None:
             return {"error": "Model not loaded"}
         
+        cache_key = ResultCache.make_key(prompt, self._cache_model_key(), self.model_revision)
+        if revision != self.model_revision:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return dict(cached)
+        
         try:
             result = self.pipeline(prompt)
-            
-            # Calculate Jannah Points
-            jannah_points = self._calculate_jannah_points(result[0]["label"], result[0]["score"])
-            
-            return {
-                "text": f"Classification: {result[0]['label']} (Confidence: {result[0]['score']:.2f})",
-                "classification": result[0]["label"],
-                "confidence": result[0]["score"],
-                "jannah_points": jannah_points,
-                "abjad_value": self._calculate_abjad(prompt)
-            }
+            analysis = self._build_analysis(prompt, result[0])
         except Exception as e:
             return {"error": str(e)}
+        
+        self.cache.set(cache_key, analysis)
+        return dict(analysis)
     
-    def _analyze_audio(self, audio_file: str, prompt: str) -> Dict[str, Any]:
-        """Analyze audio file for Tajweed validation"""
-        # Placeholder for audio processing
+    def analyze_batch(self, prompts: List[str], context: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        """Analyze many text prompts with one batched classifier call
+        
+        Cached prompts are answered from the cache; only the rest reach the model.
+        """
+        revision = self._cache_revision()
+        analyses = [None] * len(prompts)
+        if revision is not None:
+            analyses = [self.cache.get(ResultCache.make_key(p, self._cache_model_key(), revision)) for p in prompts]
+            if all(a is not None for a in analyses):
+                return [dict(a) for a in analyses]
+        
+        self._ensure_model()
+        if self.pipeline is None:
+            return [{"error": "Model not loaded"} for _ in prompts]
+        
+        keys = [ResultCache.make_key(p, self._cache_model_key(), self.model_revision) for p in prompts]
+        if revision != self.model_revision:
+            analyses = [a if a is not None else self.cache.get(k) for a, k in zip(analyses, keys)]
+        todo = [i for i, a in enumerate(analyses) if a is None]
+        if todo:
+            try:
+                results = self.pipeline([prompts[i] for i in todo], batch_size=len(todo))
+            except Exception:
+                # One bad prompt must not fail the whole batch; retry each on its own
+                results = [self._classify_one(prompts[i]) for i in todo]
+            for i, result in zip(todo, results):
+                if isinstance(result, Exception):
+                    analyses[i] = {"error": str(result)}
+                    continue
+                # A single-label pipeline returns a dict per input, not a list
+                analyses[i] = self._build_analysis(prompts[i], result[0] if isinstance(result, list) else result)
+                self.cache.set(keys[i], analyses[i])
+        return [dict(a) for a in analyses]
+    
+    def _classify_one(self, prompt: str):
+        """Pipeline output for one prompt, or the exception it raised"""
+        try:
+            return self.pipeline(prompt)
+        except Exception as e:
+            return e
+    
+    def search(self, query: str, k: int = 5) -> Dict[str, Any]:
+        """Top-k passages from the semantic index for query"""
+        return self.search_batch([query], k)[0]
+    
+    def search_batch(self, queries: List[str], k=5) -> List[Dict[str, Any]]:
+        """Semantic search for several queries with one encoder pass; k is an int or one per query"""
+        ks = list(k) if isinstance(k, (list, tuple)) else [k] * len(queries)
+        if self.semantic_index is None:
+            with self._search_lock:
+                if self.semantic_index is None:
+                    from src.core.semantic_index import SemanticIndex, TextEncoder
+                    index = SemanticIndex.open_default()
+                    if index is None:
+                        return [{"error": "Semantic index not built; run `python -m src.core.semantic_index build`"}
+                                for _ in queries]
+                    self._encoder = TextEncoder(index.meta["model"])
+                    self.semantic_index = index
+        
+        self.semantic_index.refresh()
+        results = self.semantic_index.search(self._encoder.encode(queries), k=max(ks))
+        return [
+            {
+                "text": "\n".join(f"{m['score']:.3f}  [{m['source']}] {m['text'][:120]}" for m in matches[:n]) or "No matches",
+                "query": query,
+                "matches": matches[:n]
+            }
+            for query, matches, n in zip(queries, results, ks)
+        ]
+    
+    def _build_analysis(self, prompt: str, prediction: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn one classifier prediction into the analysis result"""
+        # Calculate Jannah Points
+        jannah_points = self._calculate_jannah_points(prediction["label"], prediction["score"])
+        
         return {
-            "text": f"Tajweed analysis for {audio_file}",
-            "tajweed_errors": [],
-            "recitation_score": 95,
-            "jannah_points": 95
+            "text": f"Classification: {prediction['label']} (Confidence: {prediction['score']:.2f})",
+            "classification": prediction["label"],
+            "confidence": prediction["score"],
+            "jannah_points": jannah_points,
+            "abjad_value": self._calculate_abjad(prompt),
+            **self._verse_lookup(prompt)
         }
     
+    def _analyze_audio(self, audio_file: str, prompt: str) -> Dict[str, Any]:
+        """Analyze audio file for Tajweed validation"""
+        result = {"error": "No recitation result"}
+        for event in self._stream_audio(audio_file):
+            if event["type"] == "final_result":
+                result = event["data"]
+            elif event["type"] == "error":
+                result = {"error": event["error"]}
+        return result
+    
+    def _stream_audio(self, audio_file: str) -> Iterator[Dict[str, Any]]:
+        """Stream windowed Tajweed analysis events for a recitation
+        
+        A missing or undecodable file ends the stream with an error event
+        instead of raising.
+        """
+        if not os.path.isfile(audio_file):
+            yield {"type": "error", "error": f"Audio file not found: {audio_file}"}
+            return
+        if QURANLAB_AI_PATH not in sys.path:
+            sys.path.append(QURANLAB_AI_PATH)
+        import quran_inference_pipeline
+        _quiet_model_libraries()
+        
+        events = quran_inference_pipeline.stream_full_inference_pipeline(audio_file)
+        while True:
+            try:
+                event = next(events, None)
+            except Exception as e:
+                yield {"type": "error", "error": f"Could not analyze {audio_file}: {e}"}
+                return
+            if event is None:
+                return
+            if event["type"] == "final_result":
+                data = event["data"]
+                event = {"type": "final_result", "data": {
+                    "text": data["text"],
+                    "surah": data["surah"],
+                    "ayah": data["ayah"],
+                    "tajweed_errors": data["tajweed_errors"],
+                    "recitation_score": data["pronunciation_score"],
+                    "jannah_points": data["pronunciation_score"]
+                }}
+            yield event
+    
     def _calculate_abjad(self, text: str) -> int:
         """Calculate Abjad value of text"""
-        abjad_map = {
-            'ا': 1, 'ب': 2, 'ج': 3, 'د': 4, 'ه': 5, 'و': 6, 'ز': 7,
-            'ح': 8, 'ط': 9, 'ي': 10, 'ك': 20, 'ل': 30, 'م': 40, 'ن': 50,
-            'س': 60, 'ع': 70, 'ف': 80, 'ص': 90, 'ق': 100, 'ر': 200, 'ش': 300,
-            'ت': 400, 'ث': 500, 'خ': 600, 'ذ': 700, 'ض': 800, 'ظ': 900, 'غ': 1000
+        return ABJAD.calculate(text)
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for the analysis result cache"""
+        return self.cache.stats()
+    
+    def _verse_lookup(self, text: str) -> Dict[str, Any]:
+        """Match text against the verse index for verse and Bismillah validation"""
+        if self.verse_index is None:
+            return {"bismillah_valid": ABJAD.validate_bismillah(text)}
+        return {
+            "verse_matches": [{"surah": m["surah"], "ayah": m["ayah"]} for m in self.verse_index.match_text(text)],
+            "bismillah_valid": self.verse_index.validate_bismillah(text)
         }
-        return sum(abjad_map.get(char, 0) for char in text)
     
     def _calculate_jannah_points(self, label: str, confidence: float) -> int:
         """Calculate Jannah Points based on classification"""
@@ -86,6 +287,13 @@ class QuranicAIEngine:
         return int(points * confidence)
 
     def stream_analyze(self, prompt: str, audio: Optional[str] = None, context: Optional[Dict] = None):
-        """Stream analysis results"""
+        """Stream analysis results
+        
+        Audio is processed in fixed windows, yielding partial_transcript and
+        tajweed events per window before the final_result.
+        """
+        if audio:
+            yield from self._stream_audio(audio)
+            return
         result = self.analyze(prompt, audio, context)
         yield {"type": "final_result", "data": result}
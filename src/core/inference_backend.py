@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🌙 Inference Backends for ADAN-ID OpenCloud
+CPU-friendly classifier backends: fp32 PyTorch, dynamic int8 PyTorch and ONNX Runtime
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+BACKENDS = ("pytorch", "int8", "onnx")
+DEFAULT_BACKEND = os.environ.get("ADANID_BACKEND", "pytorch")
+ONNX_EXPORT_PATH = os.environ.get("ADANID_ONNX_PATH", "offline/local_models/onnx")
+
+def _ort_model_class(name: str):
+    try:
+        import optimum.onnxruntime
+    except ImportError as e:
+        raise ImportError("The onnx backend needs optimum[onnxruntime]: pip install 'adanid-cli[onnx]'") from e
+    return getattr(optimum.onnxruntime, name)
+
+def _auto_model_class(task: str, onnx: bool = False):
+    if task == "token-classification":
+        if onnx:
+            return _ort_model_class("ORTModelForTokenClassification")
+        from transformers import AutoModelForTokenClassification
+        return AutoModelForTokenClassification
+    if onnx:
+        return _ort_model_class("ORTModelForSequenceClassification")
+    from transformers import AutoModelForSequenceClassification
+    return AutoModelForSequenceClassification
+
+def onnx_export_dir(model_id: str) -> Path:
+    return Path(ONNX_EXPORT_PATH) / model_id.replace("/", "--")
+
+def export_onnx(model_id: str, task: str = "text-classification", out_dir: str = None) -> Path:
+    """Export model_id to ONNX (with its tokenizer) so workers load it without re-exporting"""
+    from transformers import AutoTokenizer
+    out = Path(out_dir) if out_dir else onnx_export_dir(model_id)
+    model = _auto_model_class(task, onnx=True).from_pretrained(model_id, export=True)
+    model.save_pretrained(out)
+    AutoTokenizer.from_pretrained(model_id).save_pretrained(out)
+    return out
+
+def load_classifier(model_id: str, task: str = "text-classification", backend: str = None, **pipeline_kwargs):
+    """Build a transformers pipeline for model_id on the selected backend
+
+    pytorch - full-precision PyTorch (the default)
+    int8    - PyTorch with nn.Linear layers dynamically quantized to int8
+    onnx    - ONNX Runtime session; uses a prior export_onnx() output when present
+    """
+    from transformers import pipeline, AutoTokenizer
+    from services.artifact_store import ARTIFACTS
+
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'. Choose one of {', '.join(BACKENDS)}")
+
+    # Offline copies (offline/local_models) win over the Hub and are checksum-verified
+    hub_id, model_id = model_id, ARTIFACTS.resolve_model(model_id)
+
+    if backend == "pytorch":
+        if ARTIFACTS.has_safetensors(model_id):
+            # Weights stay in the shared page cache instead of a private copy per worker
+            model = ARTIFACTS.load_model(model_id, _auto_model_class(task))
+            return pipeline(task, model=model, tokenizer=AutoTokenizer.from_pretrained(model_id), **pipeline_kwargs)
+        return pipeline(task, model=model_id, tokenizer=model_id, **pipeline_kwargs)
+
+    if backend == "int8":
+        import torch
+        from torch.ao.quantization import quantize_dynamic
+        model = _auto_model_class(task).from_pretrained(model_id)
+        model = quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        tokenizer = AutoTokenizer.from_pretrained(model_id)
+        return pipeline(task, model=model, tokenizer=tokenizer, **pipeline_kwargs)
+
+    exported = onnx_export_dir(hub_id)
+    if (exported / "model.onnx").exists():
+        model = _auto_model_class(task, onnx=True).from_pretrained(exported)
+        tokenizer = AutoTokenizer.from_pretrained(exported)
+    else:
+        model = _auto_model_class(task, onnx=True).from_pretrained(model_id, export=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_id)
+    return pipeline(task, model=model, tokenizer=tokenizer, **pipeline_kwargs)
+
+def _labels(task: str, output) -> object:
+    """Comparable labels for one pipeline output"""
+    if task == "token-classification":
+        return [(e["index"], e["entity"]) for e in output]
+    return (output[0] if isinstance(output, list) else output)["label"]
+
+def validate_backend(model_id: str, texts: list, backend: str, task: str = "text-classification", batch_size: int = 16) -> dict:
+    """Compare a backend's labels and throughput against the fp32 PyTorch model"""
+    reference = load_classifier(model_id, task, "pytorch")
+    candidate = load_classifier(model_id, task, backend)
+
+    def timed(pipe):
+        pipe(texts[:batch_size], batch_size=batch_size)  # warm up
+        started = time.perf_counter()
+        outputs = pipe(texts, batch_size=batch_size)
+        return outputs, time.perf_counter() - started
+
+    ref_outputs, ref_seconds = timed(reference)
+    cand_outputs, cand_seconds = timed(candidate)
+
+    disagreements = [
+        {"text": text, "fp32": _labels(task, ref), backend: _labels(task, cand)}
+        for text, ref, cand in zip(texts, ref_outputs, cand_outputs)
+        if _labels(task, ref) != _labels(task, cand)
+    ]
+    return {
+        "model": model_id,
+        "task": task,
+        "backend": backend,
+        "samples": len(texts),
+        "label_agreement": round(1 - len(disagreements) / len(texts), 4) if texts else 1.0,
+        "fp32_texts_per_second": round(len(texts) / ref_seconds, 1),
+        "backend_texts_per_second": round(len(texts) / cand_seconds, 1),
+        "speedup": round(ref_seconds / cand_seconds, 2),
+        "disagreements": disagreements[:20],
+    }
+
+def load_texts(path: str, column: str = "text", limit: int = 512) -> list:
+    """Validation texts from a CSV column or a plain text file (one per line)"""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            texts = [row[column] for row in csv.DictReader(f) if row.get(column)]
+        else:
+            texts = [line.strip() for line in f if line.strip()]
+    return texts[:limit]
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and validate quantized/ONNX classifier backends")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="Export a model to ONNX")
+    export.add_argument("model_id")
+    export.add_argument("--task", default="text-classification", choices=["text-classification", "token-classification"])
+    export.add_argument("--out")
+    validate = sub.add_parser("validate", help="Check label agreement and speed against fp32")
+    validate.add_argument("model_id")
+    validate.add_argument("--task", default="text-classification", choices=["text-classification", "token-classification"])
+    validate.add_argument("--backend", default="int8", choices=[b for b in BACKENDS if b != "pytorch"])
+    validate.add_argument("--texts", default="datasets/quranlab-islamic-dataset/train/quran_recitations.csv")
+    validate.add_argument("--column", default="text")
+    validate.add_argument("--min-agreement", type=float, default=0.99)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        print(f"✅ Exported {args.model_id} to {export_onnx(args.model_id, args.task, args.out)}")
+        return
+
+    report = validate_backend(args.model_id, load_texts(args.texts, args.column), args.backend, args.task)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if report["label_agreement"] < args.min_agreement:
+        print(f"❌ Label agreement {report['label_agreement']} is below {args.min_agreement}")
+        sys.exit(1)
+    print(f"✅ {args.backend} backend agrees with fp32 on {report['label_agreement']:.2%} of samples")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🌙 Result Cache for ADAN-ID OpenCloud
+Content-addressed LRU/TTL cache for model results, with an optional on-disk tier
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+
+OFFLINE_CONFIG_PATH = "offline/offline_config.json"
+
+
+def normalize_prompt(text: str) -> str:
+    """NFC-normalized, single-spaced text so trivially different prompts share an entry"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class ResultCache:
+    """Two-tier cache: an in-process LRU dict and an optional JSON-file directory.
+
+    Entries expire ttl_seconds after they were stored (0 disables expiry).
+    Disk entries are sharded by the first two hex digits of their key and
+    written atomically, so several processes can share one cache directory.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600, disk_path: str = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = Path(disk_path) if disk_path else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_offline_config(cls, config_path: str = OFFLINE_CONFIG_PATH, **kwargs):
+        """Build a cache whose disk tier is offline_config.json's cache_path, when caching is enabled"""
+        disk_path = None
+        if os.path.exists(config_path):
+            with open(config_path, "r") as f:
+                offline_mode = json.load(f).get("offline_mode", {})
+            if offline_mode.get("cache_enabled"):
+                disk_path = offline_mode.get("cache_path")
+        return cls(
+            max_entries=int(os.environ.get("ADANID_CACHE_SIZE", kwargs.pop("max_entries", 1024))),
+            ttl_seconds=float(os.environ.get("ADANID_CACHE_TTL", kwargs.pop("ttl_seconds", 3600))),
+            disk_path=disk_path,
+            **kwargs
+        )
+
+    @staticmethod
+    def make_key(text: str, model: str, revision: str) -> str:
+        payload = "\0".join((normalize_prompt(text), model, revision or ""))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if not self._expired(stored_at, now):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        entry = self._read_disk(key, now)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._store(key, entry)
+            return entry[1]
+
+    def set(self, key: str, value) -> None:
+        entry = (time.time(), value)
+        with self._lock:
+            self._store(key, entry)
+        self._write_disk(key, entry)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - stored_at > self.ttl_seconds
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_file(self, key: str) -> Path:
+        return self.disk_path / key[:2] / f"{key}.json"
+
+    def _read_disk(self, key, now):
+        if self.disk_path is None:
+            return None
+        try:
+            with open(self._disk_file(key), "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self._expired(record["stored_at"], now):
+            return None
+        return record["stored_at"], record["value"]
+
+    def _write_disk(self, key, entry):
+        if self.disk_path is None:
+            return
+        path = self._disk_file(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"stored_at": entry[0], "value": entry[1]}, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError:
+            # The disk tier is best effort; the in-memory entry is already stored.
+            pass
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🌙 Semantic Index for ADAN-ID OpenCloud
+Memory-mapped float16 embedding index with an IVF layer for Quran/Hadith/Fiqh search
+"""
+
+import argparse
+import csv
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+INDEX_VERSION = 1
+DEFAULT_SEMANTIC_INDEX_PATH = os.environ.get("ADANID_SEMANTIC_INDEX", "offline/offline_cache/semantic_index")
+ENCODER_MODEL = "ADANiD/islamic-ai-foundation"
+# Below this many vectors a flat scan is already fast; above it search goes through IVF lists
+IVF_MIN_VECTORS = 4096
+TEXT_COLUMNS = ("text", "content", "arabic_text", "hadith_text", "Arabic_Text", "english_text", "question")
+
+
+class TextEncoder:
+    """Mean-pooled, L2-normalized sentence embeddings from the islamic-ai-foundation encoder"""
+
+    def __init__(self, model_id: str = ENCODER_MODEL, batch_size: int = 32, max_length: int = 256):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+        from services.artifact_store import ARTIFACTS
+
+        path = ARTIFACTS.resolve_model(model_id)
+        self.model_id = model_id
+        self.torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(path)
+        self.model = AutoModel.from_pretrained(path).eval()
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.dim = self.model.config.hidden_size
+
+    def encode(self, texts) -> np.ndarray:
+        texts = list(texts)
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        # Length-sorted batches pad far less than batches in corpus order
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        with self.torch.inference_mode():
+            for start in range(0, len(order), self.batch_size):
+                rows = order[start:start + self.batch_size]
+                batch = self.tokenizer([texts[i] for i in rows], padding=True, truncation=True,
+                                       max_length=self.max_length, return_tensors="pt")
+                hidden = self.model(**batch).last_hidden_state
+                mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(1) / mask.sum(1).clamp(min=1)
+                out[rows] = self.torch.nn.functional.normalize(pooled, dim=-1).numpy()
+        return out
+
+
+def _kmeans(sample: np.ndarray, n_lists: int, iterations: int = 10) -> np.ndarray:
+    """Spherical k-means on normalized float32 rows"""
+    rng = np.random.default_rng(0)
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        # Empty clusters keep their previous centroid
+        centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+    return centroids.astype(np.float32)
+
+
+class _IndexState:
+    """Everything a search reads, loaded together so a reload swaps it in with one assignment"""
+
+    def __init__(self, path: Path, writable: bool):
+        meta_file = path / "meta.json"
+        with open(meta_file, "r") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported semantic index version {self.meta.get('version')} at {path}")
+        self.meta_mtime = meta_file.stat().st_mtime_ns
+        self.dim = self.meta["dim"]
+        self.count = self.meta["count"]
+        self.map_vectors(path, writable)
+
+        self.docs = [None] * self.count
+        self.row_of = {}
+        with open(path / "docs.jsonl", "r", encoding="utf-8") as f:
+            for line in f:
+                doc = json.loads(line)
+                if doc["row"] < self.count:
+                    self.docs[doc["row"]] = doc
+                    self.row_of[doc["id"]] = doc["row"]
+
+        self.centroids, self.lists, self.assignment = None, None, None
+        if (path / "centroids.npy").exists():
+            self.centroids = np.load(path / "centroids.npy")
+            self.assignment = np.load(path / "lists.npy")[:self.count]
+            self.build_lists()
+
+    def build_lists(self):
+        order = np.argsort(self.assignment, kind="stable").astype(np.int64)
+        bounds = np.searchsorted(self.assignment[order], np.arange(len(self.centroids) + 1))
+        self.lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+
+    def map_vectors(self, path: Path, writable: bool):
+        self.capacity = (path / "vectors.f16").stat().st_size // (2 * self.dim)
+        if self.capacity == 0:
+            # np.memmap cannot map an empty file
+            self.vectors = np.zeros((0, self.dim), dtype=np.float16)
+            return
+        self.vectors = np.memmap(path / "vectors.f16", dtype=np.float16,
+                                 mode="r+" if writable else "r", shape=(self.capacity, self.dim))
+
+
+class SemanticIndex:
+    """Directory holding an append/upsert-able embedding index.
+
+    vectors.f16   raw float16 matrix (capacity x dim), opened with np.memmap
+    docs.jsonl    one line per write: row, id, source, text (last line per row wins)
+    centroids.npy IVF centroids, written by train()
+    lists.npy     IVF list of every row
+    meta.json     version, dim, count, encoder model
+
+    Upserts overwrite the row of an existing id or append a new row, and new
+    rows join the nearest existing IVF list, so no rebuild is needed. Run
+    train() again after the corpus has grown a lot to rebalance the lists.
+
+    Searches read one _IndexState snapshot; refresh() loads a new one off to
+    the side and swaps it in under a lock, so a concurrent search never mixes
+    vectors of one version with docs or lists of another.
+    """
+
+    def __init__(self, path: str = DEFAULT_SEMANTIC_INDEX_PATH, writable: bool = False):
+        self.path = Path(path)
+        self.writable = writable
+        self._lock = threading.Lock()
+        self._state = _IndexState(self.path, writable)
+
+    @classmethod
+    def open_default(cls):
+        """Open the index at DEFAULT_SEMANTIC_INDEX_PATH, or return None if it has not been built"""
+        if not (Path(DEFAULT_SEMANTIC_INDEX_PATH) / "meta.json").exists():
+            return None
+        return cls(DEFAULT_SEMANTIC_INDEX_PATH)
+
+    @classmethod
+    def create(cls, path: str, dim: int, model: str = ENCODER_MODEL) -> "SemanticIndex":
+        out = Path(path)
+        out.mkdir(parents=True, exist_ok=True)
+        for name in ("vectors.f16", "docs.jsonl", "centroids.npy", "lists.npy"):
+            (out / name).unlink(missing_ok=True)
+        (out / "vectors.f16").touch()
+        (out / "docs.jsonl").touch()
+        cls._write_meta(out, {"version": INDEX_VERSION, "dim": dim, "count": 0, "model": model})
+        return cls(out, writable=True)
+
+    @staticmethod
+    def _write_meta(path: Path, meta: dict):
+        tmp = path / "meta.json.tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, path / "meta.json")
+
+    def refresh(self):
+        """Re-open if another process wrote to the index since it was loaded"""
+        with self._lock:
+            if (self.path / "meta.json").stat().st_mtime_ns != self._state.meta_mtime:
+                self._state = _IndexState(self.path, self.writable)
+
+    @property
+    def meta(self):
+        return self._state.meta
+
+    @property
+    def dim(self):
+        return self._state.dim
+
+    @property
+    def centroids(self):
+        return self._state.centroids
+
+    def __len__(self):
+        return self._state.count
+
+    # ==============================
+    # WRITES
+    # ==============================
+    def _ensure_capacity(self, state: _IndexState, rows: int):
+        if rows <= state.capacity:
+            return
+        if isinstance(state.vectors, np.memmap):
+            state.vectors.flush()
+        new_capacity = max(rows, 2 * state.capacity, 1024)
+        with open(self.path / "vectors.f16", "r+b") as f:
+            f.truncate(new_capacity * state.dim * 2)
+        state.map_vectors(self.path, self.writable)
+
+    def upsert(self, records: list, vectors: np.ndarray) -> dict:
+        """Insert or replace records ({"id", "text", "source"}) with their embeddings"""
+        if not self.writable:
+            raise PermissionError(f"{self.path} was opened read-only")
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            state = self._state
+            rows, added = [], 0
+            for record in records:
+                row = state.row_of.get(record["id"])
+                if row is None:
+                    row = state.count + added
+                    added += 1
+                    state.row_of[record["id"]] = row
+                rows.append(row)
+            self._ensure_capacity(state, state.count + added)
+            rows = np.array(rows, dtype=np.int64)
+            state.vectors[rows] = vectors.astype(np.float16)
+            state.vectors.flush()
+
+            state.docs.extend([None] * added)
+            with open(self.path / "docs.jsonl", "a", encoding="utf-8") as f:
+                for row, record in zip(rows.tolist(), records):
+                    doc = {"row": row, "id": record["id"], "source": record.get("source"), "text": record["text"]}
+                    state.docs[row] = doc
+                    f.write(json.dumps(doc, ensure_ascii=False) + "\n")
+            state.count += added
+
+            if state.centroids is not None:
+                # New rows join their nearest existing list; no re-clustering
+                if len(state.assignment) < state.count:
+                    grown = np.zeros(state.count, dtype=state.assignment.dtype)
+                    grown[:len(state.assignment)] = state.assignment
+                    state.assignment = grown
+                state.assignment[rows] = np.argmax(vectors @ state.centroids.T, axis=1)
+                np.save(self.path / "lists.npy", state.assignment)
+                state.build_lists()
+
+            state.meta["count"] = state.count
+            self._write_meta(self.path, state.meta)
+            state.meta_mtime = (self.path / "meta.json").stat().st_mtime_ns
+        return {"upserted": len(records), "added": added, "count": state.count}
+
+    def train(self, n_lists: int = None, iterations: int = 10, sample_size: int = 65536):
+        """(Re)build the IVF lists: k-means on a sample, then assign every row"""
+        with self._lock:
+            state = self._state
+            if state.count < IVF_MIN_VECTORS:
+                return None
+            n_lists = n_lists or int(4 * np.sqrt(state.count))
+            rng = np.random.default_rng(0)
+            sample_rows = np.sort(rng.choice(state.count, min(sample_size, state.count), replace=False))
+            centroids = _kmeans(state.vectors[sample_rows].astype(np.float32), n_lists, iterations)
+            assignment = np.concatenate([
+                np.argmax(state.vectors[start:start + 65536].astype(np.float32) @ centroids.T, axis=1)
+                for start in range(0, state.count, 65536)
+            ])
+            np.save(self.path / "centroids.npy", centroids)
+            np.save(self.path / "lists.npy", assignment)
+            # Drop superseded lines left behind by upserts of existing ids
+            tmp = self.path / "docs.jsonl.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for doc in state.docs:
+                    f.write(json.dumps(doc, ensure_ascii=False) + "\n")
+            os.replace(tmp, self.path / "docs.jsonl")
+            self._write_meta(self.path, state.meta)
+            self._state = _IndexState(self.path, self.writable)
+        return n_lists
+
+    # ==============================
+    # SEARCH
+    # ==============================
+    def search(self, query_vectors: np.ndarray, k: int = 10, n_probe: int = 16) -> list:
+        """Top-k documents for each query embedding, best first"""
+        state = self._state
+        queries = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        results = []
+        for query in queries:
+            if state.lists is not None:
+                nearest = np.argpartition(-(state.centroids @ query), min(n_probe, len(state.lists)) - 1)[:n_probe]
+                rows = np.concatenate([state.lists[c] for c in nearest])
+                rows.sort()  # sequential access into the memmap
+            else:
+                rows = np.arange(state.count)
+            if len(rows) == 0:
+                results.append([])
+                continue
+            scores = state.vectors[rows].astype(np.float32) @ query
+            top = min(k, len(rows))
+            best = np.argpartition(-scores, top - 1)[:top]
+            best = best[np.argsort(-scores[best])]
+            results.append([
+                {"id": state.docs[rows[i]]["id"], "score": round(float(scores[i]), 4),
+                 "source": state.docs[rows[i]]["source"], "text": state.docs[rows[i]]["text"]}
+                for i in best
+            ])
+        return results
+
+
+# ==============================
+# CORPORA
+# ==============================
+def iter_records(path: str, text_column: str = None, id_column: str = None, source: str = None):
+    """Yield {"id", "text", "source"} from a CSV, JSONL or plain-text corpus file"""
+    source = source or Path(path).stem
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            rows = csv.DictReader(f)
+        elif path.endswith((".jsonl", ".json")):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = ({"text": line.strip()} for line in f if line.strip())
+        for n, row in enumerate(rows):
+            column = text_column or next((c for c in TEXT_COLUMNS if row.get(c)), None)
+            if column is None or not row.get(column):
+                continue
+            yield {"id": str(row[id_column]) if id_column else f"{source}:{n}",
+                   "text": str(row[column]), "source": source}
+
+
+def iter_supabase_documents(page_size: int = 1000):
+    """Yield records from the Supabase `documents` table (SUPABASE_URL / SUPABASE_KEY)"""
+    from supabase import create_client
+
+    client = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+    start = 0
+    while True:
+        rows = client.table("documents").select("id,title,content,source_type") \
+            .range(start, start + page_size - 1).execute().data
+        for row in rows:
+            if row.get("content"):
+                yield {"id": str(row["id"]), "text": row["content"],
+                       "source": row.get("source_type") or "documents"}
+        if len(rows) < page_size:
+            return
+        start += page_size
+
+
+def index_records(index: SemanticIndex, encoder: TextEncoder, records, batch_size: int = 1024) -> int:
+    """Embed and upsert records in batches so memory stays bounded for large corpora"""
+    total, batch = 0, []
+    for record in records:
+        batch.append(record)
+        if len(batch) == batch_size:
+            index.upsert(batch, encoder.encode(r["text"] for r in batch))
+            total += len(batch)
+            batch = []
+    if batch:
+        index.upsert(batch, encoder.encode(r["text"] for r in batch))
+        total += len(batch)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the semantic search index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("build", "Create a fresh index from corpus files"),
+                            ("upsert", "Add or replace documents in an existing index")):
+        cmd = sub.add_parser(name, help=help_text)
+        cmd.add_argument("corpora", nargs="*", help="CSV/JSONL/TXT corpus files")
+        cmd.add_argument("--supabase", action="store_true", help="Also index the Supabase documents table")
+        cmd.add_argument("--text-column")
+        cmd.add_argument("--id-column")
+        cmd.add_argument("--out", default=DEFAULT_SEMANTIC_INDEX_PATH)
+        cmd.add_argument("--model", default=ENCODER_MODEL)
+    train = sub.add_parser("train", help="Rebuild the IVF lists")
+    train.add_argument("--out", default=DEFAULT_SEMANTIC_INDEX_PATH)
+    train.add_argument("--lists", type=int)
+    query = sub.add_parser("query", help="Search the index")
+    query.add_argument("text")
+    query.add_argument("-k", type=int, default=5)
+    query.add_argument("--out", default=DEFAULT_SEMANTIC_INDEX_PATH)
+    args = parser.parse_args()
+
+    if args.command == "train":
+        n_lists = SemanticIndex(args.out, writable=True).train(args.lists)
+        print(f"✅ Trained {n_lists} IVF lists" if n_lists else f"Index has fewer than {IVF_MIN_VECTORS} vectors; flat search")
+        return
+
+    if args.command == "query":
+        index = SemanticIndex(args.out)
+        encoder = TextEncoder(index.meta["model"])
+        for match in index.search(encoder.encode([args.text]), k=args.k)[0]:
+            print(json.dumps(match, ensure_ascii=False))
+        return
+
+    encoder = TextEncoder(args.model)
+    if args.command == "build" or not (Path(args.out) / "meta.json").exists():
+        index = SemanticIndex.create(args.out, encoder.dim, args.model)
+    else:
+        index = SemanticIndex(args.out, writable=True)
+    total = 0
+    for corpus in args.corpora:
+        total += index_records(index, encoder, iter_records(corpus, args.text_column, args.id_column))
+    if args.supabase:
+        total += index_records(index, encoder, iter_supabase_documents())
+    if args.command == "build" or index.centroids is None:
+        index.train()
+    print(f"✅ Indexed {total} documents ({len(index)} total) at {args.out}")
+
+
+if __name__ == "__main__":
+    main()
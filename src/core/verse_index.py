@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🌙 Verse Index for ADAN-ID OpenCloud
+Precomputed, memory-mapped ayah index for reverse Abjad lookup and verse matching
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from src.core.abjad_calculator import ABJAD
+
+INDEX_VERSION = 1
+DEFAULT_INDEX_PATH = os.environ.get("ADANID_VERSE_INDEX", "offline/offline_cache/verse_index")
+BISMILLAH_POSITION = (1, 1)
+
+
+def normalize_text(text: str) -> str:
+    """Diacritic-free, single-spaced form used for exact verse matching"""
+    return " ".join(ABJAD.remove_diacritics(text).split())
+
+
+def text_hash(normalized: str) -> int:
+    return int.from_bytes(hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class VerseIndex:
+    """Read-only ayah index stored as a directory of .npy arrays.
+
+    Every array is opened with mmap_mode='r', so worker processes share the
+    page cache instead of each parsing the CSV. Value queries binary-search a
+    sorted Abjad array (O(log n)); text queries binary-search sorted 64-bit
+    hashes of the normalized text and confirm against the stored text.
+    """
+
+    ARRAYS = ("surah", "ayah", "abjad", "abjad_order", "abjad_sorted",
+              "hash_order", "hash_sorted", "text_offsets", "text_blob")
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = Path(path)
+        with open(self.path / "meta.json", "r") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported verse index version {self.meta.get('version')} at {self.path}")
+        for name in self.ARRAYS:
+            setattr(self, name, np.load(self.path / f"{name}.npy", mmap_mode="r"))
+        self._has_bismillah = bool(np.any((self.surah == BISMILLAH_POSITION[0]) & (self.ayah == BISMILLAH_POSITION[1])))
+
+    @classmethod
+    def open_default(cls):
+        """Open the index at DEFAULT_INDEX_PATH, or return None if it has not been built"""
+        if not (Path(DEFAULT_INDEX_PATH) / "meta.json").exists():
+            return None
+        return cls(DEFAULT_INDEX_PATH)
+
+    @staticmethod
+    def build(csv_path: str, out_dir: str = DEFAULT_INDEX_PATH, use_csv_values: bool = False) -> "VerseIndex":
+        """Build the index from a quran_abjad.csv-style file (surah, ayah, arabic_text, abjad_sum)
+
+        Abjad values are recomputed with the shared calculator so lookups agree
+        with the CLI; pass use_csv_values=True to trust the abjad_sum column.
+        """
+        with open(csv_path, "r", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+
+        texts = [normalize_text(row["arabic_text"]) for row in rows]
+        surah = np.array([int(row["surah"]) for row in rows], dtype=np.uint16)
+        ayah = np.array([int(row["ayah"]) for row in rows], dtype=np.uint16)
+        if use_csv_values:
+            abjad = np.array([int(row["abjad_sum"]) for row in rows], dtype=np.int64)
+        else:
+            abjad = ABJAD.calculate_many(texts)
+        hashes = np.array([text_hash(t) for t in texts], dtype=np.uint64)
+
+        encoded = [t.encode("utf-8") for t in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+
+        abjad_order = np.argsort(abjad, kind="stable").astype(np.int32)
+        hash_order = np.argsort(hashes, kind="stable").astype(np.int32)
+        arrays = {
+            "surah": surah,
+            "ayah": ayah,
+            "abjad": abjad,
+            "abjad_order": abjad_order,
+            "abjad_sorted": abjad[abjad_order],
+            "hash_order": hash_order,
+            "hash_sorted": hashes[hash_order],
+            "text_offsets": offsets,
+            "text_blob": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        }
+
+        # Write into a temporary directory and swap it in, so readers never
+        # see a half-written index. Leftovers of an interrupted build would
+        # make the renames fail, so they are cleared first.
+        out = Path(out_dir)
+        tmp = out.with_name(out.name + ".tmp")
+        old = out.with_name(out.name + ".old")
+        shutil.rmtree(tmp, ignore_errors=True)
+        shutil.rmtree(old, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        for name, array in arrays.items():
+            np.save(tmp / f"{name}.npy", array)
+        with open(tmp / "meta.json", "w") as f:
+            json.dump({"version": INDEX_VERSION, "count": len(rows), "source": str(csv_path),
+                       "values": "csv" if use_csv_values else "computed"}, f, indent=2)
+        if out.exists():
+            os.replace(out, old)
+            os.replace(tmp, out)
+            shutil.rmtree(old)
+        else:
+            os.replace(tmp, out)
+        return VerseIndex(out)
+
+    def __len__(self):
+        return int(self.meta["count"])
+
+    def verse(self, row: int) -> dict:
+        start, end = self.text_offsets[row], self.text_offsets[row + 1]
+        return {
+            "surah": int(self.surah[row]),
+            "ayah": int(self.ayah[row]),
+            "abjad_value": int(self.abjad[row]),
+            "text": bytes(self.text_blob[start:end]).decode("utf-8"),
+        }
+
+    def by_value(self, value: int) -> list:
+        """Ayahs whose Abjad value equals value"""
+        return self.in_range(value, value)
+
+    def in_range(self, low: int, high: int) -> list:
+        """Ayahs whose Abjad value lies in [low, high]"""
+        start = np.searchsorted(self.abjad_sorted, low, side="left")
+        end = np.searchsorted(self.abjad_sorted, high, side="right")
+        return [self.verse(int(row)) for row in self.abjad_order[start:end]]
+
+    def match_text(self, text: str) -> list:
+        """Ayahs whose normalized text equals the normalized input"""
+        normalized = normalize_text(text)
+        key = np.uint64(text_hash(normalized))
+        start = np.searchsorted(self.hash_sorted, key, side="left")
+        end = np.searchsorted(self.hash_sorted, key, side="right")
+        matches = [self.verse(int(row)) for row in self.hash_order[start:end]]
+        return [m for m in matches if m["text"] == normalized]
+
+    def validate_bismillah(self, text: str) -> bool:
+        """True if text is exactly the Bismillah ayah (1:1), falling back to the 786 check"""
+        if not self._has_bismillah:
+            return ABJAD.validate_bismillah(text)
+        return any((m["surah"], m["ayah"]) == BISMILLAH_POSITION for m in self.match_text(text))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the ADANiD verse index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Build the index from a quran_abjad.csv file")
+    build.add_argument("csv_path")
+    build.add_argument("--out", default=DEFAULT_INDEX_PATH)
+    build.add_argument("--use-csv-values", action="store_true", help="Trust the abjad_sum column instead of recomputing")
+    query = sub.add_parser("query", help="Look up ayahs by value, range or text")
+    query.add_argument("--index", default=DEFAULT_INDEX_PATH)
+    query.add_argument("--value", type=int)
+    query.add_argument("--range", type=int, nargs=2, metavar=("LOW", "HIGH"))
+    query.add_argument("--text")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        index = VerseIndex.build(args.csv_path, args.out, args.use_csv_values)
+        print(f"✅ Indexed {len(index)} ayahs into {index.path}")
+        return
+
+    index = VerseIndex(args.index)
+    if args.value is not None:
+        result = index.by_value(args.value)
+    elif args.range:
+        result = index.in_range(*args.range)
+    elif args.text:
+        result = index.match_text(args.text)
+    else:
+        parser.error("one of --value, --range or --text is required")
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,20 +6,43 @@ Integrated with Quranic Cloud Architecture and Biometric Authentication
 """
 
 from transformers import pipeline
-from src.core.abjad_calculator import AbjadCalculator
+from src.core.abjad_calculator import ABJAD
+from services.artifact_store import ARTIFACTS
 
 class VoiceProcessor:
     def __init__(self):
         self.transcriber = pipeline(
             "automatic-speech-recognition",
-            model="ADANiD/islamic-ai-foundation"
+            model=ARTIFACTS.resolve_model("ADANiD/islamic-ai-foundation")
         )
-        self.abjad_calc = AbjadCalculator()
+        self.abjad_calc = ABJAD
     
     def process_quranic_audio(self, audio_path: str) -> dict:
         """Process Quranic recitation audio"""
         result = self.transcriber(audio_path)
-        text = result['text']
+        return self._build_result(result['text'])
+    
+    def process_batch(self, audio_paths: list) -> list:
+        """Process several recitations with one batched transcriber call
+
+        If the batch fails (one undecodable file is enough), each file is retried
+        alone so only the bad ones come back as {"error": ...}.
+        """
+        try:
+            results = self.transcriber(list(audio_paths), batch_size=len(audio_paths))
+            return [self._build_result(result['text']) for result in results]
+        except Exception as e:
+            if len(audio_paths) == 1:
+                return [{'error': f"{type(e).__name__}: {e}"}]
+        return [self._process_one(audio_path) for audio_path in audio_paths]
+
+    def _process_one(self, audio_path: str) -> dict:
+        try:
+            return self.process_quranic_audio(audio_path)
+        except Exception as e:
+            return {'error': f"{type(e).__name__}: {e}"}
+    
+    def _build_result(self, text: str) -> dict:
         abjad_value = self.abjad_calc.calculate(text)
         
         return {
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+ADANiD Daemon - keeps Quranic AI engines warm behind a Unix domain socket
+"""
+
+import json
+import os
+import socket
+import socketserver
+import threading
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Dict, Any, Iterator, Optional
+
+DEFAULT_SOCKET_PATH = os.environ.get(
+    "ADANID_DAEMON_SOCKET",
+    str(Path.home() / ".adanid" / "daemon.sock")
+)
+
+# Connecting (and ping) must be quick: a daemon that does not answer in time
+# is treated as absent and the CLI runs the engine in-process instead.
+CONNECT_TIMEOUT_S = float(os.environ.get("ADANID_DAEMON_CONNECT_TIMEOUT", 1.0))
+# Longest wait for one response line (a result or one streamed event)
+READ_TIMEOUT_S = float(os.environ.get("ADANID_DAEMON_READ_TIMEOUT", 300))
+
+class DaemonUnavailable(Exception):
+    """Raised when no daemon is listening or the connection drops"""
+
+# ==============================
+# SERVER
+# ==============================
+class EnginePool:
+    """One warm QuranicAIEngine per (model, backend), created on first request"""
+
+    def __init__(self, default_backend: Optional[str] = None):
+        self.default_backend = default_backend
+        self._engines = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, model: str, backend: Optional[str] = None):
+        key = (model, backend or self.default_backend)
+        with self._lock:
+            if key not in self._engines:
+                from src.ai_engine import QuranicAIEngine
+                self._engines[key] = QuranicAIEngine(model=model, backend=key[1])
+                self._locks[key] = threading.Lock()
+            return self._engines[key], self._locks[key]
+
+    def warm(self, model: str, backend: Optional[str] = None):
+        engine, lock = self.get(model, backend)
+        with lock:
+            if engine.pipeline is None:
+                engine.load_model()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {f"{model}:{engine.backend}": engine.cache_stats() for (model, _), engine in self._engines.items()}
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    """Newline-delimited JSON: one request line in, one or more response lines out"""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                self._dispatch(request)
+            except (BrokenPipeError, ConnectionResetError):
+                return
+            except Exception as e:
+                self._send({"error": f"{type(e).__name__}: {e}"})
+
+    def _send(self, message: Dict[str, Any]):
+        self.wfile.write((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+    def _dispatch(self, request: Dict[str, Any]):
+        method = request.get("method")
+        if method == "ping":
+            self._send({"result": "pong", "pid": os.getpid()})
+        elif method == "stats":
+            self._send({"result": self.server.engines.stats()})
+        elif method == "shutdown":
+            self._send({"result": "shutting down"})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        elif method == "search":
+            engine, _ = self.server.engines.get(request.get("model", "quranlab-ai"), request.get("backend"))
+            self._send({"result": engine.search(request["query"], request.get("k", 5))})
+        elif method in ("analyze", "stream_analyze"):
+            engine, lock = self.server.engines.get(request.get("model", "quranlab-ai"), request.get("backend"))
+            args = (request["prompt"],)
+            kwargs = {"audio": request.get("audio"), "context": request.get("context")}
+            # Text classification shares one model per engine; audio runs on
+            # the recitation pipeline's own models and is not serialized here.
+            guard = lock if not kwargs["audio"] else nullcontext()
+            if method == "analyze":
+                with guard:
+                    result = engine.analyze(*args, **kwargs)
+                self._send({"result": result})
+            else:
+                with guard:
+                    for event in engine.stream_analyze(*args, **kwargs):
+                        self._send({"event": event})
+                self._send({"done": True})
+        else:
+            self._send({"error": f"Unknown method: {method}"})
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, backend: Optional[str] = None):
+        self.engines = EnginePool(backend)
+        super().__init__(socket_path, DaemonHandler)
+
+def serve(socket_path: str = DEFAULT_SOCKET_PATH, warm_models=("quranlab-ai",), backend: Optional[str] = None):
+    """Run the daemon in the foreground until shutdown"""
+    from services.artifact_store import ARTIFACTS
+    ARTIFACTS.enable_offline_env()  # no-op unless ADANID_OFFLINE=1
+    path = Path(socket_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        if DaemonClient(socket_path).ping():
+            raise RuntimeError(f"A daemon is already listening on {socket_path}")
+        path.unlink()  # stale socket left by a crashed daemon
+
+    # Create the socket owner-only from the start; a chmod after bind() would
+    # leave a window in which other local users could connect. The umask is
+    # process-wide, so it is restored right after binding.
+    previous_umask = os.umask(0o077)
+    try:
+        server = DaemonServer(socket_path, backend)
+    finally:
+        os.umask(previous_umask)
+    try:
+        for model in warm_models:
+            server.engines.warm(model)
+        print(f"🌙 ADANiD daemon ready on {socket_path} (pid {os.getpid()})", flush=True)
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if path.exists():
+            path.unlink()
+
+# ==============================
+# CLIENT
+# ==============================
+class DaemonClient:
+    """Thin client for the daemon; every call opens its own short-lived connection
+
+    A connect or read timeout raises DaemonUnavailable like a refused
+    connection does, so callers fall back to the in-process engine.
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, connect_timeout: float = CONNECT_TIMEOUT_S,
+                 read_timeout: float = READ_TIMEOUT_S):
+        self.socket_path = socket_path
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+    @classmethod
+    def connect(cls, socket_path: str = DEFAULT_SOCKET_PATH) -> Optional["DaemonClient"]:
+        """Return a client if a daemon is listening, else None"""
+        if not os.path.exists(socket_path):
+            return None
+        client = cls(socket_path)
+        return client if client.ping() else None
+
+    def ping(self) -> bool:
+        try:
+            return next(self._request({"method": "ping"}, self.connect_timeout)).get("result") == "pong"
+        except DaemonUnavailable:
+            return False
+
+    def analyze(self, model: str, prompt: str, audio: Optional[str] = None, context: Optional[Dict] = None,
+                backend: Optional[str] = None) -> Dict[str, Any]:
+        response = next(self._request(self._call("analyze", model, prompt, audio, context, backend)))
+        if "error" in response:
+            return {"error": response["error"]}
+        return response["result"]
+
+    def stream_analyze(self, model: str, prompt: str, audio: Optional[str] = None, context: Optional[Dict] = None,
+                       backend: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        for response in self._request(self._call("stream_analyze", model, prompt, audio, context, backend)):
+            if response.get("done"):
+                return
+            if "error" in response:
+                yield {"type": "error", "error": response["error"]}
+                return
+            yield response["event"]
+
+    def search(self, model: str, query: str, k: int = 5) -> Dict[str, Any]:
+        response = next(self._request({"method": "search", "model": model, "query": query, "k": k}))
+        if "error" in response:
+            return {"error": response["error"]}
+        return response["result"]
+
+    def shutdown(self):
+        return next(self._request({"method": "shutdown"})).get("result")
+
+    @staticmethod
+    def _call(method, model, prompt, audio, context, backend):
+        # The daemon has its own working directory, so send absolute audio paths
+        return {"method": method, "model": model, "backend": backend, "prompt": prompt,
+                "audio": os.path.abspath(audio) if audio else None, "context": context}
+
+    def _request(self, message: Dict[str, Any], read_timeout: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.connect_timeout)
+            sock.connect(self.socket_path)
+            sock.settimeout(read_timeout or self.read_timeout)
+        except OSError as e:  # includes socket.timeout
+            sock.close()
+            raise DaemonUnavailable(str(e)) from e
+
+        with sock, sock.makefile("rwb") as stream:
+            try:
+                stream.write((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+                stream.flush()
+                for line in stream:
+                    yield json.loads(line)
+            except OSError as e:
+                raise DaemonUnavailable(str(e)) from e
+        raise DaemonUnavailable("Daemon closed the connection")
@@ -5,35 +5,141 @@ ADANiD CLI - Quranic AI Terminal Agent
 
 import click
 import os
+import re
 import json
 from pathlib import Path
-from adanid_cli.ai_engine import QuranicAIEngine
-from adanid_cli.utils import load_context, save_checkpoint
+from src.utils import load_context, save_checkpoint
+from src.daemon import DaemonClient, DaemonUnavailable, DEFAULT_SOCKET_PATH
+
+# Heavy modules (the AI engine, transformers, torch) are imported only when a
+# model-backed command runs; help and Abjad commands never load them.
+ABJAD_COMMAND = re.compile(
+    r'^\s*(?:/abjad\b|calculate\s+(?:the\s+)?abjad\b(?:\s+value)?(?:\s+of)?)\s*(.*)$',
+    re.IGNORECASE | re.DOTALL
+)
+
+def abjad_command(text):
+    """Answer /abjad-style prompts from the Abjad table alone, or return None"""
+    match = ABJAD_COMMAND.match(text)
+    if not match:
+        return None
+    from src.core.abjad_calculator import ABJAD
+    arabic = match.group(1).strip()
+    value = ABJAD.calculate(arabic)
+    return {
+        "text": f"Abjad value: {value}",
+        "abjad_value": value,
+        "bismillah_valid": ABJAD.validate_bismillah(arabic)
+    }
+
+SEARCH_COMMAND = re.compile(r'^\s*/search\s+(.+)$', re.IGNORECASE | re.DOTALL)
+
+def search_command(engine, text):
+    """Answer /search prompts from the semantic index, or return None"""
+    match = SEARCH_COMMAND.match(text)
+    if not match:
+        return None
+    return engine.search(match.group(1).strip())
+
+class LazyEngine:
+    """Forwards to a running daemon, else builds the QuranicAIEngine on first use"""
+    
+    def __init__(self, model, backend=None, socket_path=DEFAULT_SOCKET_PATH):
+        self.model = model
+        self.backend = backend
+        self._engine = None
+        self._client = DaemonClient.connect(socket_path) if socket_path else None
+    
+    def analyze(self, prompt, audio=None, context=None):
+        if self._client is not None:
+            try:
+                return self._client.analyze(self.model, prompt, audio=audio, context=context, backend=self.backend)
+            except DaemonUnavailable:
+                self._client = None
+        return self._local().analyze(prompt, audio=audio, context=context)
+    
+    def search(self, query, k=5):
+        if self._client is not None:
+            try:
+                return self._client.search(self.model, query, k)
+            except DaemonUnavailable:
+                self._client = None
+        return self._local().search(query, k)
+    
+    def stream_analyze(self, prompt, audio=None, context=None):
+        if self._client is not None:
+            started = False
+            try:
+                for event in self._client.stream_analyze(self.model, prompt, audio=audio, context=context, backend=self.backend):
+                    started = True
+                    yield event
+                return
+            except DaemonUnavailable:
+                self._client = None
+                if started:
+                    raise
+        yield from self._local().stream_analyze(prompt, audio=audio, context=context)
+    
+    def _local(self):
+        if self._engine is None:
+            from src.ai_engine import QuranicAIEngine
+            self._engine = QuranicAIEngine(model=self.model, backend=self.backend)
+        return self._engine
 
 @click.command()
 @click.option('-p', '--prompt', help='Prompt for AI analysis')
 @click.option('--audio', help='Audio file for Tajweed analysis')
 @click.option('--output-format', default='text', type=click.Choice(['text', 'json', 'stream-json']))
 @click.option('--model', default='quranlab-ai', help='AI model to use')
+@click.option('--backend', type=click.Choice(['pytorch', 'int8', 'onnx']), help='Inference backend (default: $ADANID_BACKEND or pytorch)')
 @click.option('--include-directories', help='Directories to include in context')
-def main(prompt, audio, output_format, model, include_directories):
+@click.option('--daemon', 'run_daemon', is_flag=True, help='Run a background daemon that keeps engines warm')
+@click.option('--stop-daemon', is_flag=True, help='Stop the running daemon')
+@click.option('--no-daemon', is_flag=True, help='Always run in-process, even if a daemon is running')
+@click.option('--socket', 'socket_path', default=DEFAULT_SOCKET_PATH, show_default=True, help='Daemon Unix socket path')
+def main(prompt, audio, output_format, model, backend, include_directories, run_daemon, stop_daemon, no_daemon, socket_path):
     """ADANiD CLI - Quranic AI Terminal Agent"""
     
-    # Initialize AI engine
-    engine = QuranicAIEngine(model=model)
+    from services.artifact_store import ARTIFACTS
+    ARTIFACTS.enable_offline_env()  # no-op unless ADANID_OFFLINE=1
+
+    if run_daemon:
+        from src.daemon import serve
+        serve(socket_path, warm_models=(model,), backend=backend)
+        return
+    if stop_daemon:
+        client = DaemonClient.connect(socket_path)
+        click.echo(client.shutdown() if client else "No daemon running")
+        return
+    
+    # Initialize AI engine: the daemon when one is running, else in-process on first use
+    engine = LazyEngine(model, backend, socket_path=None if no_daemon else socket_path)
     
     # Load context if available
     context = load_context()
     
     if prompt:
         # Non-interactive mode
+        result = None if audio else abjad_command(prompt) or search_command(engine, prompt)
+        if result is not None:
+            if output_format == 'text':
+                click.echo(result['text'])
+            elif output_format == 'json':
+                click.echo(json.dumps(result, indent=2, ensure_ascii=False))
+            else:
+                click.echo(json.dumps({"type": "final_result", "data": result}, ensure_ascii=False))
+            return
+        
+        if output_format == 'stream-json':
+            # Echo each event as it arrives; click.echo flushes per line
+            for chunk in engine.stream_analyze(prompt, audio=audio, context=context):
+                click.echo(json.dumps(chunk, ensure_ascii=False))
+            return
+        
         result = engine.analyze(prompt, audio=audio, context=context)
         
         if output_format == 'json':
             click.echo(json.dumps(result, indent=2, ensure_ascii=False))
-        elif output_format == 'stream-json':
-            for chunk in engine.stream_analyze(prompt, audio=audio, context=context):
-                click.echo(json.dumps(chunk, ensure_ascii=False))
         else:
             click.echo(result.get('text', str(result)))
     
@@ -51,7 +157,8 @@ def main(prompt, audio, output_format, model, include_directories):
                     show_help()
                     continue
                 
-                result = engine.analyze(user_input, context=context)
+                result = (abjad_command(user_input) or search_command(engine, user_input)
+                          or engine.analyze(user_input, context=context))
                 click.echo(f"\n{result.get('text', str(result))}")
                 
                 # Save checkpoint
@@ -69,6 +176,7 @@ Commands:
   exit        - Quit the CLI
   help        - Show this help message
   /abjad      - Calculate Abjad value
+  /search     - Semantic search over Quran, Hadith and Fiqh texts
   /tajweed    - Validate Tajweed rules  
   /fiqh       - Get Fiqh ruling
   /hadith     - Authenticate Hadith
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Context and checkpoint helpers for ADANiD CLI
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+CONTEXT_FILE = "ADANID.md"
+CHECKPOINT_FILE = Path.home() / ".adanid" / "checkpoints.jsonl"
+
+def load_context(directory: str = ".") -> Optional[Dict[str, Any]]:
+    """Project context from ADANID.md in directory, or None when there is none"""
+    path = Path(directory) / CONTEXT_FILE
+    if not path.is_file():
+        return None
+    return {"source": str(path), "text": path.read_text(encoding="utf-8")}
+
+def save_checkpoint(prompt: str, result: Dict[str, Any], path: Path = CHECKPOINT_FILE):
+    """Append one prompt/result exchange so a session can be resumed"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"time": time.time(), "prompt": prompt, "result": result}, ensure_ascii=False) + "\n")
@@ -0,0 +1,33 @@
+import pytest
+
+from src.core.abjad_calculator import ABJAD
+
+SINGLE = [
+    "",
+    "bismillah",
+    "12345 !?",
+    "بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ",
+    "قُلْ هُوَ اللَّهُ أَحَدٌ",
+    "Allah الله 😊",
+    "ة ى ئ ؤ إ آ",
+]
+
+
+@pytest.mark.parametrize("text", SINGLE)
+def test_single_text_matches_calculate(text):
+    assert ABJAD.calculate_many([text]).tolist() == [ABJAD.calculate(text)]
+
+
+@pytest.mark.parametrize("batch", [
+    [],
+    ["", ""],
+    ["hello", "", "world"],
+    SINGLE,
+    ["", "الله", "", "", "أحد", "no arabic"],
+])
+def test_batch_matches_calculate(batch):
+    assert ABJAD.calculate_many(batch).tolist() == [ABJAD.calculate(text) for text in batch]
+
+
+def test_missing_values_score_zero():
+    assert ABJAD.calculate_many([None, "الله", float("nan")]).tolist() == [0, ABJAD.calculate("الله"), 0]
@@ -0,0 +1,48 @@
+import pytest
+
+from src.ai_engine import QuranicAIEngine
+from src.core.result_cache import ResultCache
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return QuranicAIEngine()
+
+
+def test_missing_audio_returns_error_dict(engine, tmp_path):
+    result = engine.analyze("check", audio=str(tmp_path / "missing.wav"))
+
+    assert set(result) == {"error"}
+    assert "missing.wav" in result["error"]
+
+
+def test_missing_audio_streams_error_event(engine, tmp_path):
+    events = list(engine.stream_analyze("check", audio=str(tmp_path / "missing.wav")))
+
+    assert [e["type"] for e in events] == ["error"]
+
+
+def test_failed_batch_is_retried_item_by_item(engine):
+    def pipeline(inputs, **kwargs):
+        if isinstance(inputs, list):
+            raise RuntimeError("batch failed")
+        if inputs == "bad":
+            raise ValueError("bad input")
+        return [{"label": "quran", "score": 0.9}]
+    engine.pipeline, engine._model_loaded = pipeline, True
+
+    good, bad = engine.analyze_batch(["bismillah", "bad"])
+
+    assert good["classification"] == "quran"
+    assert bad == {"error": "bad input"}
+
+
+def test_cache_hit_does_not_load_model(engine, monkeypatch):
+    monkeypatch.setattr(engine, "_peek_revision", lambda: "rev1")
+    monkeypatch.setattr(engine, "load_model", lambda: pytest.fail("model loaded on a cache hit"))
+    key = ResultCache.make_key("bismillah", engine._cache_model_key(), "rev1")
+    engine.cache.set(key, {"classification": "quran"})
+
+    assert engine.analyze("  bismillah ")["classification"] == "quran"
+    assert engine.analyze_batch(["bismillah"])[0]["classification"] == "quran"
@@ -0,0 +1,102 @@
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient
+
+import app as api
+
+class FakeVoiceProcessor:
+    """Stands in for the Whisper pipeline: "bad" audio fails, anything else is transcribed"""
+
+    def process_batch(self, paths):
+        results = []
+        for path in paths:
+            with open(path, "rb") as f:
+                audio = f.read()
+            results.append({"error": "DecodeError: bad audio"} if audio == b"bad" else
+                           {"transcribed_text": audio.decode(), "abjad_value": 0})
+        return results
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(api.app) as client:
+        yield client
+
+@pytest.fixture(autouse=True)
+def voice_processor(monkeypatch):
+    monkeypatch.setattr(api, "get_voice_processor", lambda: FakeVoiceProcessor())
+
+def test_recitation_accepts_uploaded_audio(client):
+    response = client.post("/recitation", content=b"bismillah", headers={"Content-Type": "audio/wav"})
+    assert response.status_code == 200
+    assert response.json()["transcribed_text"] == "bismillah"
+
+def test_bad_audio_fails_alone(client):
+    assert client.post("/recitation", content=b"bad", headers={"Content-Type": "audio/wav"}).status_code == 422
+
+def test_empty_and_oversized_uploads_are_rejected(client, monkeypatch):
+    assert client.post("/recitation", content=b"", headers={"Content-Type": "audio/wav"}).status_code == 400
+    monkeypatch.setattr(api, "MAX_UPLOAD_BYTES", 4)
+    assert client.post("/recitation", content=b"too long", headers={"Content-Type": "audio/wav"}).status_code == 413
+
+def test_server_paths_are_disabled_without_audio_root(client, monkeypatch):
+    monkeypatch.setattr(api, "AUDIO_ROOT", None)
+    assert client.post("/recitation", json={"audio_path": "/etc/passwd"}).status_code == 403
+
+def test_server_paths_stay_inside_audio_root(client, monkeypatch, tmp_path):
+    (tmp_path / "fatiha.wav").write_bytes(b"alhamdulillah")
+    monkeypatch.setattr(api, "AUDIO_ROOT", str(tmp_path))
+    assert client.post("/recitation", json={"audio_path": "fatiha.wav"}).json()["transcribed_text"] == "alhamdulillah"
+    assert client.post("/recitation", json={"audio_path": "../../etc/passwd"}).status_code == 403
+    assert client.post("/recitation", json={"audio_path": "missing.wav"}).status_code == 404
+
+AUDIO = bytes(range(256)) * 40  # 10240 bytes, not valid UTF-8
+
+@pytest.fixture
+def storage(monkeypatch, tmp_path):
+    pytest.importorskip("cryptography")
+    from services.offline_router import OfflineRouter
+    from services.storage_offline import OfflineStorage
+
+    router = OfflineRouter()
+    router.offline_mode = True
+    storage = OfflineStorage(str(tmp_path / "storage"), chunk_size=4096)
+    router.register_service("storage", lambda: storage)
+    monkeypatch.setattr(api, "get_offline_router", lambda: router)
+    storage.upload_offline("fatiha.wav", AUDIO)
+    return storage
+
+def test_streamed_upload_round_trips(client, storage):
+    pieces = (AUDIO[i:i + 1000] for i in range(0, len(AUDIO), 1000))
+    response = client.put("/offline/storage/recitations/ikhlas.wav", content=pieces)
+    assert response.status_code == 200 and response.json()["size"] == len(AUDIO)
+    assert client.get("/offline/storage/recitations/ikhlas.wav").content == AUDIO
+
+@pytest.mark.parametrize("header, start, end", [
+    ("bytes=0-99", 0, 100),
+    ("bytes=4000-4200", 4000, 4201),   # crosses a chunk boundary
+    ("bytes=10000-", 10000, 10240),
+    ("bytes=-40", 10200, 10240),
+    ("bytes=10000-99999", 10000, 10240),
+])
+def test_range_requests(client, storage, header, start, end):
+    response = client.get("/offline/storage/fatiha.wav", headers={"Range": header})
+    assert response.status_code == 206
+    assert response.content == AUDIO[start:end]
+    assert response.headers["Content-Range"] == f"bytes {start}-{end - 1}/{len(AUDIO)}"
+
+@pytest.mark.parametrize("header", ["bytes=abc-def", "bytes=-", "bytes=20000-", "bytes=50-10", "bytes=-0", "bytes=1-2-3"])
+def test_bad_ranges_get_416(client, storage, header):
+    response = client.get("/offline/storage/fatiha.wav", headers={"Range": header})
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == f"bytes */{len(AUDIO)}"
+
+def test_multi_range_and_no_range_serve_everything(client, storage):
+    for headers in ({}, {"Range": "bytes=0-1,5-6"}):
+        response = client.get("/offline/storage/fatiha.wav", headers=headers)
+        assert response.status_code == 200 and response.content == AUDIO
+
+def test_missing_object_is_404(client, storage):
+    assert client.get("/offline/storage/nothing.wav").status_code == 404
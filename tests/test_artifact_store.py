@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+from services.artifact_store import ArtifactStore
+
+OFFLINE_VARS = ("HF_HUB_OFFLINE", "TRANSFORMERS_OFFLINE", "HF_DATASETS_OFFLINE")
+
+@pytest.fixture
+def store_config(tmp_path):
+    models = tmp_path / "local_models"
+    (models / "quranlab-ai").mkdir(parents=True)
+    (models / "quranlab-ai" / "config.json").write_text("{}")
+    return {
+        "offline_mode": {"enabled": True, "local_models_path": str(models),
+                         "local_datasets_path": str(tmp_path / "local_datasets")},
+        "models": {"quranlab_ai": str(models / "quranlab-ai")},
+    }
+
+@pytest.fixture
+def clean_env(monkeypatch):
+    for var in OFFLINE_VARS:
+        monkeypatch.delenv(var, raising=False)
+
+def test_local_copy_wins_over_hub(store_config):
+    store = ArtifactStore(store_config, strict=False)
+    assert store.resolve_model("ADANiD/Quranlab-AI", verify=False) == store_config["models"]["quranlab_ai"]
+
+def test_missing_model_falls_back_to_hub_id(store_config):
+    store = ArtifactStore(store_config, strict=False)
+    assert store.resolve_model("ADANiD/islamic-ai-foundation") == "ADANiD/islamic-ai-foundation"
+
+def test_enabled_config_alone_does_not_disable_the_hub(store_config, clean_env):
+    ArtifactStore(store_config, strict=False).enable_offline_env()
+    assert not any(var in os.environ for var in OFFLINE_VARS)
+
+def test_strict_offline_sets_env_and_refuses_hub_fallback(store_config, clean_env, monkeypatch):
+    store = ArtifactStore(store_config, strict=True)
+    store.enable_offline_env()
+    assert all(os.environ.get(var) == "1" for var in OFFLINE_VARS)
+    with pytest.raises(FileNotFoundError):
+        store.resolve_model("ADANiD/islamic-ai-foundation")
+    for var in OFFLINE_VARS:
+        monkeypatch.delenv(var)
+
+def test_manifest_round_trip_detects_tampering(store_config):
+    from services.artifact_store import ArtifactIntegrityError
+    store = ArtifactStore(store_config, strict=False)
+    path = store_config["models"]["quranlab_ai"]
+    store.write_manifest(path)
+    assert store.verify(path, mode="full")
+    with open(os.path.join(path, "config.json"), "w") as f:
+        f.write('{"tampered": true}')
+    with pytest.raises(ArtifactIntegrityError):
+        ArtifactStore(store_config, strict=False).verify(path, mode="full")
+
+def _write_safetensors(path, tensors, header_pad=0):
+    import json
+    import struct
+    header, data = {}, b""
+    for name, (dtype, shape, raw) in tensors.items():
+        header[name] = {"dtype": dtype, "shape": shape, "data_offsets": [len(data), len(data) + len(raw)]}
+        data += raw
+    encoded = json.dumps(header).encode() + b" " * header_pad
+    path.write_bytes(struct.pack("<Q", len(encoded)) + encoded + data)
+
+@pytest.mark.parametrize("header_pad", range(4))
+def test_misaligned_safetensors_fall_back_to_copies(tmp_path, header_pad):
+    np = pytest.importorskip("numpy")
+    weights = np.arange(6, dtype=np.float32)
+    path = tmp_path / "model.safetensors"
+    _write_safetensors(path, {"flag": ("U8", [1], b"\x01"), "w": ("F32", [2, 3], weights.tobytes())}, header_pad)
+
+    arrays = ArtifactStore.mmap_safetensors(path)
+
+    assert arrays["w"].flags.aligned
+    assert arrays["w"].tolist() == weights.reshape(2, 3).tolist()
+    assert arrays["flag"].tolist() == [1]
+
+def test_meta_parameters_allocate_no_weights():
+    torch = pytest.importorskip("torch")
+    from services.artifact_store import _meta_parameters
+
+    with _meta_parameters():
+        layer = torch.nn.Linear(4096, 4096)
+    assert layer.weight.is_meta and layer.bias.is_meta
+    assert not torch.nn.Linear(2, 2).weight.is_meta
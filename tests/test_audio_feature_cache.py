@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+
+from tools.audio_feature_cache import SHARD_SIZE, AudioFeatureCache
+
+
+def test_freed_rows_are_reused_before_new_ones(tmp_path):
+    cache = AudioFeatureCache(str(tmp_path))
+    first = cache._allocate(3, (2, 4), "float16")
+    cache.index["free"].append(list(first[1]))
+
+    again = cache._allocate(2, (2, 4), "float16")
+
+    assert first == [(0, 0), (0, 1), (0, 2)]
+    assert again == [(0, 1), (0, 3)]
+    assert cache.index["shards"] == 1 and cache.index["next_row"] == 4
+
+
+def test_new_shard_opens_only_when_the_last_is_full(tmp_path):
+    cache = AudioFeatureCache(str(tmp_path))
+
+    slots = cache._allocate(SHARD_SIZE + 1, (1, 1), "float16")
+
+    assert slots[-1] == (1, 0)
+    assert (tmp_path / "features-00001.npy").exists()
+
+
+def test_old_indexes_gain_a_free_list(tmp_path):
+    (tmp_path / "index.json").write_text('{"version": 1, "model": null, "dtype": null, "shape": null,'
+                                         ' "shards": 0, "next_row": 1024, "entries": {}}')
+
+    assert AudioFeatureCache(str(tmp_path)).index["free"] == []
+
+
+def _cache_with_entry(tmp_path, source):
+    cache = AudioFeatureCache(str(tmp_path / "cache"))
+    cache.path.mkdir()
+    [(shard, row)] = cache._allocate(1, (2, 3), "float16")
+    features = np.load(cache.path / f"features-{shard:05d}.npy", mmap_mode="r+")
+    features[row] = 7
+    features.flush()
+    stat = os.stat(source)
+    cache.index["entries"]["train/a.wav"] = {"shard": shard, "row": row, "duration": 1.0,
+                                             "source": os.path.abspath(source),
+                                             "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    cache._save_index()
+    return AudioFeatureCache(str(cache.path))
+
+
+def test_lookup_by_source_file(tmp_path):
+    source = tmp_path / "a.wav"
+    source.write_bytes(b"RIFF")
+    cache = _cache_with_entry(tmp_path, source)
+
+    assert cache.lookup(str(source)).tolist() == [[7, 7, 7], [7, 7, 7]]
+    assert cache.lookup(str(tmp_path / "other.wav")) is None
+
+
+def test_lookup_misses_a_changed_file(tmp_path):
+    source = tmp_path / "a.wav"
+    source.write_bytes(b"RIFF")
+    cache = _cache_with_entry(tmp_path, source)
+    source.write_bytes(b"RIFF-edited")
+
+    assert cache.lookup(str(source)) is None
@@ -0,0 +1,50 @@
+import pytest
+
+from services.auth_offline import OfflineAuth
+
+@pytest.fixture
+def auth(tmp_path):
+    auth = OfflineAuth(str(tmp_path / "did_registry.db"))
+    auth.register_offline("alice", {"embedding": [1.0, 0.0, 0.0, 0.0]})
+    auth.register_offline("bob", {"embedding": [0.0, 1.0, 0.0, 0.0]})
+    return auth
+
+def test_matching_probe_authenticates(auth):
+    result = auth.authenticate_offline("alice", [1.0, 0.0, 0.0, 0.0])
+    assert result["authenticated"] and result["match_score"] == 1.0
+
+def test_wrong_probe_is_rejected(auth):
+    assert not auth.authenticate_offline("alice", [0.0, 1.0, 0.0, 0.0])["authenticated"]
+
+@pytest.mark.parametrize("probe", [None, [], [1.0, 0.0], [[1.0, 0.0], [0.0, 0.0]], ["a", "b", "c", "d"],
+                                   {"embedding": None}, [float("nan"), 0.0, 0.0, 0.0]])
+def test_missing_or_malformed_probe_fails_closed(auth, probe):
+    result = auth.authenticate_offline("alice", probe)
+    assert result["authenticated"] is False
+    assert result["match_score"] == 0.0
+
+@pytest.mark.parametrize("probe", [None, [1.0, 0.0, 0.0, 0.0]])
+def test_legacy_template_without_embedding_is_rejected(auth, probe):
+    auth.register_offline("carol", {"fingerprint": "legacy"})
+    result = auth.authenticate_offline("carol", probe)
+    assert result["authenticated"] is False
+    assert result["match_score"] == 0.0
+
+def test_identification_finds_best_user(auth):
+    result = auth.identify_offline([0.1, 0.9, 0.0, 0.0])
+    assert result["authenticated"] and result["user_id"] == "bob"
+
+def test_identification_rejects_dimension_mismatch(auth):
+    result = auth.identify_offline([1.0, 0.0])
+    assert result["status"] == "error"
+    assert "4-dimensional" in result["message"]
+
+@pytest.mark.parametrize("probe", [[[1.0, 0.0], [0.0, 0.0]], ["a", "b", "c", "d"], [float("inf"), 0.0, 0.0, 0.0]])
+def test_identification_rejects_malformed_probe(auth, probe):
+    assert auth.identify_offline(probe)["status"] == "error"
+
+def test_enrollment_rejected_by_matcher_is_not_stored(auth):
+    auth.identify_offline([1.0, 0.0, 0.0, 0.0])  # builds the matcher
+    result = auth.register_offline("dave", {"embedding": [1.0, 0.0]})
+    assert result["status"] == "error"
+    assert "dave" not in auth.did_registry
@@ -0,0 +1,19 @@
+import json
+
+from click.testing import CliRunner
+
+from src import main as cli
+
+
+def test_abjad_prompt_runs_without_engine():
+    result = CliRunner().invoke(cli.main, ["-p", "/abjad بسم", "--no-daemon", "--output-format", "json"])
+
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.output)["abjad_value"] == 102
+
+
+def test_engine_shares_the_cli_import_root():
+    import src.ai_engine
+    from src.core.abjad_calculator import ABJAD
+
+    assert src.ai_engine.ABJAD is ABJAD
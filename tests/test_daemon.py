@@ -0,0 +1,91 @@
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+from src import daemon
+from src.daemon import DaemonClient, DaemonUnavailable
+from src.main import LazyEngine
+
+
+@pytest.fixture
+def hung_daemon(tmp_path):
+    """A socket that accepts connections and then never answers"""
+    path = str(tmp_path / "hung.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen()
+    accepted = []
+    stop = threading.Event()
+
+    def accept():
+        server.settimeout(0.05)
+        while not stop.is_set():
+            try:
+                accepted.append(server.accept()[0])
+            except socket.timeout:
+                pass
+
+    thread = threading.Thread(target=accept, daemon=True)
+    thread.start()
+    yield path
+    stop.set()
+    thread.join()
+    for conn in accepted:
+        conn.close()
+    server.close()
+
+
+def test_ping_times_out_instead_of_hanging(hung_daemon):
+    started = time.monotonic()
+
+    assert DaemonClient(hung_daemon, connect_timeout=0.2).ping() is False
+    assert time.monotonic() - started < 2
+
+
+def test_read_timeout_raises_daemon_unavailable(hung_daemon):
+    client = DaemonClient(hung_daemon, connect_timeout=0.2, read_timeout=0.2)
+
+    with pytest.raises(DaemonUnavailable):
+        client.analyze("quranlab-ai", "prompt")
+
+
+def test_lazy_engine_falls_back_to_in_process_engine(hung_daemon, monkeypatch):
+    engine = LazyEngine("quranlab-ai", socket_path=None)
+    engine._client = DaemonClient(hung_daemon, connect_timeout=0.2, read_timeout=0.2)
+
+    class LocalEngine:
+        def analyze(self, prompt, audio=None, context=None):
+            return {"text": f"local: {prompt}"}
+
+    monkeypatch.setattr(engine, "_local", LocalEngine)
+
+    assert engine.analyze("prompt") == {"text": "local: prompt"}
+    assert engine._client is None
+
+
+def test_socket_is_owner_only_from_the_moment_it_is_bound(tmp_path, monkeypatch):
+    path = str(tmp_path / "daemon.sock")
+    modes = []
+    original_bind = daemon.DaemonServer.server_bind
+
+    def server_bind(self):
+        original_bind(self)
+        modes.append(os.stat(path).st_mode & 0o777)
+
+    monkeypatch.setattr(daemon.DaemonServer, "server_bind", server_bind)
+    umask = os.umask(0o022)
+    os.umask(umask)
+    thread = threading.Thread(target=daemon.serve, args=(path,), kwargs={"warm_models": ()}, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while DaemonClient.connect(path) is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    DaemonClient(path).shutdown()
+    thread.join(5)
+
+    assert len(modes) == 1 and modes[0] & 0o077 == 0  # no group or other access
+    assert os.umask(umask) == umask
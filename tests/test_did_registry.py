@@ -0,0 +1,76 @@
+import json
+import sqlite3
+import threading
+from contextlib import closing
+
+import pytest
+
+from services.auth_offline import DIDRegistry
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = DIDRegistry(str(tmp_path / "registry" / "did_registry.db"))
+    yield registry
+    registry.close()
+
+def _query(registry, sql):
+    with closing(sqlite3.connect(registry.path)) as conn:
+        return conn.execute(sql).fetchall()
+
+def test_schema_is_created_in_wal_mode(registry):
+    columns = [row[1] for row in _query(registry, "PRAGMA table_info(dids)")]
+    assert columns == ["user_id", "template", "created_at", "updated_at"]
+    assert _query(registry, "PRAGMA journal_mode") == [("wal",)]
+
+def test_put_upserts_and_keeps_created_at(registry):
+    registry.put("alice", {"embedding": [1.0]})
+    [(created,)] = _query(registry, "SELECT created_at FROM dids WHERE user_id = 'alice'")
+    registry.put("alice", {"embedding": [2.0]})
+
+    assert registry.get("alice") == {"embedding": [2.0]}
+    assert len(registry) == 1
+    [(created_at, updated_at)] = _query(registry, "SELECT created_at, updated_at FROM dids WHERE user_id = 'alice'")
+    assert created_at == created and updated_at >= created
+
+def test_get_contains_delete(registry):
+    registry.put("bob", [0.5, 0.5])
+    assert "bob" in registry and "carol" not in registry
+    assert registry.get("carol") is None
+    assert registry.delete("bob") and not registry.delete("bob")
+    assert len(registry) == 0
+
+def test_concurrent_writers_on_separate_connections(registry):
+    def enroll(worker):
+        for i in range(25):
+            registry.put(f"user-{worker}-{i}", {"embedding": [worker, i]})
+
+    threads = [threading.Thread(target=enroll, args=(w,)) for w in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(registry) == 100
+    assert dict(registry.items())["user-3-24"] == {"embedding": [3, 24]}
+
+def test_reopening_an_existing_database_keeps_users(tmp_path):
+    path = str(tmp_path / "did_registry.db")
+    first = DIDRegistry(path)
+    first.put("alice", {"embedding": [1.0, 0.0]})
+    first.close()
+
+    reopened = DIDRegistry(path)
+    assert list(reopened.user_ids()) == ["alice"]
+    assert reopened.get("alice") == {"embedding": [1.0, 0.0]}
+    reopened.compact()
+    reopened.close()
+
+def test_import_legacy_layout(registry, tmp_path):
+    registry_file, templates = tmp_path / "did_registry.json", tmp_path / "biometric_templates"
+    templates.mkdir()
+    registry_file.write_text(json.dumps({"local_dids": ["alice", "ghost"]}))
+    (templates / "alice.json").write_text(json.dumps({"embedding": [1.0]}))
+
+    assert registry.import_legacy(registry_file, templates) == 1
+    assert registry.import_legacy(registry_file, templates) == 0
+    assert registry.get("alice") == {"embedding": [1.0]}
@@ -0,0 +1,11 @@
+import sys
+
+import pytest
+
+from src.core.inference_backend import _auto_model_class
+
+@pytest.mark.parametrize("task", ["text-classification", "token-classification"])
+def test_missing_onnx_runtime_names_the_extra(monkeypatch, task):
+    monkeypatch.setitem(sys.modules, "optimum.onnxruntime", None)
+    with pytest.raises(ImportError, match=r"adanid-cli\[onnx\]"):
+        _auto_model_class(task, onnx=True)
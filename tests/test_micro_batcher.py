@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from services.micro_batcher import MicroBatcher
+
+def run(coro):
+    return asyncio.run(coro)
+
+async def submit_all(batcher, items):
+    try:
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(item) for item in items), return_exceptions=True), timeout=5)
+    finally:
+        await batcher.close()
+
+def test_concurrent_items_share_a_batch():
+    sizes = []
+    def double(items):
+        sizes.append(len(items))
+        return [item * 2 for item in items]
+    batcher = MicroBatcher(double, max_batch_size=8, max_wait_ms=50)
+    assert run(submit_all(batcher, range(5))) == [0, 2, 4, 6, 8]
+    assert sizes == [5]
+
+def test_batch_exception_reaches_every_caller():
+    def fail(items):
+        raise ValueError("model exploded")
+    results = run(submit_all(MicroBatcher(fail, max_wait_ms=20), range(3)))
+    assert all(isinstance(r, ValueError) for r in results)
+
+@pytest.mark.parametrize("batch_fn", [lambda items: items[:-1], lambda items: None])
+def test_malformed_result_list_fails_instead_of_hanging(batch_fn):
+    results = run(submit_all(MicroBatcher(batch_fn, max_wait_ms=20), range(3)))
+    assert all(isinstance(r, (RuntimeError, TypeError)) for r in results)
+
+def test_worker_survives_a_failed_batch():
+    calls = []
+    def flaky(items):
+        calls.append(items)
+        if len(calls) == 1:
+            raise ValueError("first batch fails")
+        return items
+    async def scenario():
+        batcher = MicroBatcher(flaky, max_wait_ms=5)
+        with pytest.raises(ValueError):
+            await batcher.submit("a")
+        try:
+            return await asyncio.wait_for(batcher.submit("b"), timeout=5)
+        finally:
+            await batcher.close()
+    assert run(scenario()) == "b"
@@ -0,0 +1,51 @@
+import threading
+
+from services.auth_offline import OfflineAuth
+from services.offline_router import OfflineRouter
+
+
+class FakeService:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def _threads(name):
+    return [t for t in threading.enumerate() if t.name == name]
+
+
+def test_reload_closes_dropped_services():
+    router = OfflineRouter()
+    router.register_service("fake", FakeService)
+    first = router.service("fake")
+
+    router.reload("fake")
+
+    assert first.closed
+    assert router.service("fake") is not first
+
+
+def test_reload_all_closes_every_service_and_keeps_ones_without_close():
+    router = OfflineRouter()
+    router.register_service("fake", FakeService)
+    router.register_service("plain", object)
+    fake, _ = router.service("fake"), router.service("plain")
+
+    router.reload()
+
+    assert fake.closed
+    assert router.loaded_service("fake") is None and router.loaded_service("plain") is None
+
+
+def test_closing_auth_stops_the_compactor(tmp_path):
+    before = len(_threads("did-registry-compactor"))
+    router = OfflineRouter()
+    router.register_service("auth", lambda: OfflineAuth(str(tmp_path / "dids.db")))
+    router.service("auth")
+    assert len(_threads("did-registry-compactor")) == before + 1
+
+    router.close()
+
+    assert len(_threads("did-registry-compactor")) == before
@@ -0,0 +1,71 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+for dependency in ("torch", "transformers", "librosa", "soundfile"):
+    pytest.importorskip(dependency)
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "projects" / "quranlab" / "ai"))
+import quran_inference_pipeline as qip
+
+
+def _asr(inputs, batch_size=None):
+    if isinstance(inputs, list):
+        if any(len(x["raw"]) == 1 for x in inputs):
+            raise RuntimeError("bad batch")
+        return [{"text": "bismillah"} for _ in inputs]
+    if len(inputs["raw"]) == 1:
+        raise RuntimeError("bad audio")
+    return {"text": "bismillah"}
+
+
+def _position(inputs, batch_size=None):
+    result = [{"label": "surah_1_ayah_1", "score": 0.9}]
+    return [result for _ in inputs] if isinstance(inputs, list) else result
+
+
+def _tajweed(texts, batch_size=None):
+    return [[] for _ in texts] if isinstance(texts, list) else []
+
+
+def _scoring(texts, batch_size=None):
+    return [{"label": "good", "score": 0.9} for _ in texts] if isinstance(texts, list) else [{"label": "good"}]
+
+
+@pytest.fixture
+def stages(monkeypatch):
+    pipes = {"asr": _asr, "position": _position, "tajweed": _tajweed, "scoring": _scoring}
+    monkeypatch.setattr(qip.MODEL_REGISTRY, "get", pipes.__getitem__)
+    monkeypatch.setattr(qip, "load_audio", lambda path: np.zeros(1 if "bad" in path else 1600, dtype=np.float32))
+
+
+def test_stage_failure_only_fails_the_affected_item(stages):
+    results = list(qip.run_batch_inference(["a.wav", "bad.wav", "c.wav"], batch_size=3))
+
+    assert [r["audio_path"] for r in results] == ["a.wav", "bad.wav", "c.wav"]
+    assert results[1]["error"] == "asr failed: bad audio"
+    for result in (results[0], results[2]):
+        assert "error" not in result
+        assert (result["surah"], result["ayah"]) == (1, 1)
+        assert result["pronunciation_score"] == qip.EXAMPLE_PRONUNCIATION_SCORE
+
+
+def test_cached_features_skip_pipeline_asr(stages, monkeypatch):
+    class Cache:
+        def lookup(self, path):
+            return np.zeros((80, 3000), dtype=np.float16) if path == "cached.wav" else None
+
+    transcribed = []
+
+    def transcribe(asr_pipe, features):
+        transcribed.append(len(features))
+        return [{"text": "from cache"} for _ in features]
+
+    monkeypatch.setattr(qip, "_transcribe_features", transcribe)
+
+    results = list(qip.run_batch_inference(["cached.wav", "a.wav"], batch_size=2, feature_cache=Cache()))
+
+    assert transcribed == [1]
+    assert [r["text"] for r in results] == ["from cache", "bismillah"]
@@ -0,0 +1,81 @@
+import pytest
+
+from src.core import result_cache
+from src.core.result_cache import ResultCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(result_cache.time, "time", clock.time)
+    return clock
+
+
+def test_hit_after_set():
+    cache = ResultCache()
+    cache.set("k", {"label": "quran"})
+
+    assert cache.get("k") == {"label": "quran"}
+    assert cache.get("missing") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_entries_expire_after_ttl(clock, tmp_path):
+    cache = ResultCache(ttl_seconds=60, disk_path=str(tmp_path))
+    cache.set("k", 1)
+
+    clock.now += 59
+    assert cache.get("k") == 1
+    clock.now += 2
+    assert cache.get("k") is None
+
+
+def test_zero_ttl_never_expires(clock):
+    cache = ResultCache(ttl_seconds=0)
+    cache.set("k", 1)
+    clock.now += 10 ** 9
+    assert cache.get("k") == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_disk_tier_survives_a_new_process(tmp_path):
+    ResultCache(disk_path=str(tmp_path)).set("ab12", {"label": "hadith", "text": "إِنَّمَا"})
+
+    fresh = ResultCache(disk_path=str(tmp_path))
+    assert fresh.get("ab12") == {"label": "hadith", "text": "إِنَّمَا"}
+    assert fresh.stats()["disk_hits"] == 1
+    assert (tmp_path / "ab" / "ab12.json").exists()
+
+
+@pytest.mark.parametrize("variant", ["  bismillah  ", "bismillah\n", "bismillah"])
+def test_key_ignores_surrounding_and_repeated_whitespace(variant):
+    assert ResultCache.make_key(variant, "m", "r") == ResultCache.make_key("bismillah", "m", "r")
+
+
+def test_key_normalizes_unicode_composition():
+    composed, decomposed = "é", "é"
+    assert ResultCache.make_key(composed, "m", "r") == ResultCache.make_key(decomposed, "m", "r")
+
+
+def test_key_separates_models_and_revisions():
+    keys = {ResultCache.make_key("a", "m1", "r1"), ResultCache.make_key("a", "m2", "r1"),
+            ResultCache.make_key("a", "m1", "r2")}
+    assert len(keys) == 3
@@ -0,0 +1,89 @@
+import json
+import struct
+
+import numpy as np
+import pytest
+
+pytest.importorskip("yaml")
+
+from scripts.run_merges import SafetensorsShard, run_merges
+
+_CODES = {np.dtype(np.float16): "F16", np.dtype(np.float32): "F32", np.dtype(np.int64): "I64"}
+
+def write_safetensors(path, tensors):
+    header, blobs, offset = {}, [], 0
+    for name, array in tensors.items():
+        data = array.tobytes()
+        header[name] = {"dtype": _CODES[array.dtype], "shape": list(array.shape),
+                        "data_offsets": [offset, offset + len(data)]}
+        blobs.append(data)
+        offset += len(data)
+    encoded = json.dumps(header).encode()
+    encoded += b" " * (-len(encoded) % 8)
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", len(encoded)) + encoded + b"".join(blobs))
+
+def make_model(root, name, tensors):
+    path = root / name
+    path.mkdir()
+    write_safetensors(path / "model.safetensors", tensors)
+    (path / "config.json").write_text("{}")
+    return path
+
+def write_config(path, models, dtype="float32", normalize=True):
+    lines = ["models:"]
+    for model, weight, parameters in models:
+        lines += [f"  - model: {model}", f"    weight: {weight}"]
+        if parameters:
+            lines.append("    parameters:")
+            lines += [f"      - name: {name}\n        weight: {value}" for name, value in parameters]
+    lines += ["merge_method: linear", f"dtype: {dtype}", "parameters:", f"  normalize: {str(normalize).lower()}"]
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+def merged_tensors(output):
+    shard = SafetensorsShard(output / "model.safetensors")
+    return {name: np.array(shard.tensor(name)) for name in shard.header}
+
+def test_float16_inputs_accumulate_in_float32(tmp_path):
+    values = np.full((64,), 3.0, dtype=np.float16)
+    a = make_model(tmp_path, "a", {"bert.encoder.w": values})
+    b = make_model(tmp_path, "b", {"electra.encoder.w": values})
+    config = write_config(tmp_path / "mergekit-dtype.yaml", [(a, 0.1, []), (b, 0.2, [])], normalize=False)
+
+    report = run_merges([str(config)], str(tmp_path / "out"), offline=True, workers=1)
+    merged = merged_tensors(tmp_path / "out" / "dtype")["bert.encoder.w"]
+    assert not report["failed"]
+    expected = np.float32(3.0) * np.float32(0.1) + np.float32(3.0) * np.float32(0.2)
+    np.testing.assert_allclose(merged, expected, rtol=1e-6)
+
+def test_parameter_weights_override_and_integers_pass_through(tmp_path):
+    a = make_model(tmp_path, "a", {"bert.classifier.w": np.full((4,), 10.0, np.float32),
+                                   "bert.position_ids": np.arange(5)})
+    b = make_model(tmp_path, "b", {"bert.classifier.w": np.full((4,), 20.0, np.float32),
+                                   "bert.position_ids": np.arange(5) * 7})
+    config = write_config(tmp_path / "mergekit-weights.yaml", [(a, 0.75, [("classifier", 0.5)]), (b, 0.25, [])])
+
+    run_merges([str(config)], str(tmp_path / "out"), offline=True, workers=1)
+    merged = merged_tensors(tmp_path / "out" / "weights")
+    np.testing.assert_allclose(merged["bert.classifier.w"], (0.5 * 10 + 0.25 * 20) / 0.75, rtol=1e-6)
+    np.testing.assert_array_equal(merged["bert.position_ids"], np.arange(5))
+
+def test_unchanged_inputs_are_skipped(tmp_path):
+    a = make_model(tmp_path, "a", {"w": np.ones((2,), np.float32)})
+    config = write_config(tmp_path / "mergekit-skip.yaml", [(a, 1.0, [])])
+    assert run_merges([str(config)], str(tmp_path / "out"), offline=True, workers=1)["merged"]
+    assert run_merges([str(config)], str(tmp_path / "out"), offline=True, workers=1)["skipped"] == [str(config)]
+
+def test_failing_merge_does_not_stop_the_others(tmp_path):
+    good = make_model(tmp_path, "good", {"w": np.ones((2,), np.float32)})
+    broken = make_model(tmp_path, "broken", {"w": np.ones((1024,), np.float32)})
+    with open(broken / "model.safetensors", "r+b") as f:
+        f.truncate(64)  # header intact, tensor data missing
+    configs = [write_config(tmp_path / "mergekit-broken.yaml", [(broken, 1.0, [])]),
+               write_config(tmp_path / "mergekit-missing.yaml", [(tmp_path / "nowhere", 1.0, [])]),
+               write_config(tmp_path / "mergekit-good.yaml", [(good, 1.0, [])])]
+
+    report = run_merges([str(c) for c in configs], str(tmp_path / "out"), offline=True, workers=2)
+    assert [summary["config"] for summary in report["merged"]] == [str(configs[2])]
+    assert set(report["failed"]) == {str(configs[0]), str(configs[1])}
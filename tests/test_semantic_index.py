@@ -0,0 +1,33 @@
+import numpy as np
+
+from src.core.semantic_index import SemanticIndex
+
+
+def _records(*ids):
+    return [{"id": i, "text": f"text {i}", "source": "test"} for i in ids]
+
+
+def test_refresh_swaps_in_a_whole_new_snapshot(tmp_path):
+    writer = SemanticIndex.create(str(tmp_path), dim=2)
+    writer.upsert(_records("a"), np.array([[1.0, 0.0]]))
+    reader = SemanticIndex(str(tmp_path))
+    before = reader._state
+
+    writer.upsert(_records("b"), np.array([[0.0, 1.0]]))
+    reader.refresh()
+
+    assert reader._state is not before
+    assert before.count == 1 and len(before.docs) == 1  # old snapshot left untouched
+    assert len(reader) == 2
+    assert reader.search(np.array([0.0, 1.0]), k=1)[0][0]["id"] == "b"
+
+
+def test_refresh_without_changes_keeps_the_snapshot(tmp_path):
+    writer = SemanticIndex.create(str(tmp_path), dim=2)
+    writer.upsert(_records("a"), np.array([[1.0, 0.0]]))
+    reader = SemanticIndex(str(tmp_path))
+    before = reader._state
+
+    reader.refresh()
+
+    assert reader._state is before
@@ -0,0 +1,45 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "projects" / "quranlab" / "ai"))
+from stage_scheduler import AbandonedStages, StageScheduler
+
+
+def test_timeout_counts_from_stage_start_not_queue_time():
+    release = threading.Event()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        blocker = executor.submit(release.wait)
+        threading.Timer(0.3, release.set).start()
+        scheduler = StageScheduler(executor=executor).add("quick", lambda: "done", timeout=0.2)
+
+        results, errors, _ = scheduler.run()
+
+    assert blocker.result() is True
+    assert results == {"quick": "done"} and errors == {}
+
+
+def test_timed_out_stages_are_tracked_and_capped():
+    release = threading.Event()
+    abandoned = AbandonedStages()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        hung = StageScheduler(executor=executor, abandoned=abandoned, max_abandoned=1)
+        hung.add("asr", release.wait, timeout=0.05)
+        _, errors, _ = hung.run()
+        assert errors["asr"] == "timed out after 0.1s"
+        assert abandoned.names() == ["asr"]
+
+        refused = StageScheduler(executor=executor, abandoned=abandoned, max_abandoned=1)
+        refused.add("asr", lambda: "text").add("tajweed", lambda asr: asr, deps=["asr"])
+        results, errors, _ = refused.run()
+        assert results == {}
+        assert errors["asr"] == "skipped: 1 timed-out stages still hold workers"
+        assert errors["tajweed"] == "skipped: dependency 'asr' failed"
+
+        release.set()
+        deadline = time.monotonic() + 2
+        while len(abandoned) and time.monotonic() < deadline:
+            time.sleep(0.01)
+    assert len(abandoned) == 0
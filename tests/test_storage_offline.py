@@ -0,0 +1,76 @@
+import base64
+import os
+import threading
+
+import pytest
+
+pytest.importorskip("cryptography")
+
+from services.storage_offline import ChunkIntegrityError, OfflineStorage, _atomic_write
+
+@pytest.fixture
+def storage(tmp_path):
+    return OfflineStorage(str(tmp_path), chunk_size=1024)
+
+def test_identical_objects_share_chunks(storage):
+    data = os.urandom(4096)
+    assert storage.upload_offline("a.wav", data)["new_chunks"] == 4
+    assert storage.upload_offline("b.wav", data)["new_chunks"] == 0
+    assert storage.usage()["dedup_ratio"] == 2.0
+
+def test_chunks_are_encrypted_at_rest(storage, tmp_path):
+    storage.upload_offline("plain.txt", "bismillah " * 200)
+    for chunk_file in (tmp_path / "chunks").glob("*/*"):
+        assert b"bismillah" not in chunk_file.read_bytes()
+
+def test_read_range_across_chunks(storage):
+    data = bytes(range(256)) * 10
+    storage.upload_offline("r.wav", data)
+    assert storage.read_range("r.wav", 1000, 100) == data[1000:1100]
+    assert storage.read_range("r.wav", 2500, 500) == data[2500:]
+
+def test_writer_accepts_pieces_of_any_size(storage):
+    data = bytes(range(256)) * 9
+    writer = storage.open_writer("w.wav")
+    for i in range(0, len(data), 333):
+        writer.write(data[i:i + 333])
+    assert writer.close()["size"] == len(data)
+    assert b"".join(storage.download_stream("w.wav")) == data
+
+def test_binary_download_is_base64(storage):
+    audio = b"RIFF\xff\xfe\x00\x80"
+    storage.upload_offline("clip.wav", content_base64=base64.b64encode(audio).decode())
+    result = storage.download_offline("clip.wav")
+    assert "content" not in result
+    assert base64.b64decode(result["content_base64"]) == audio
+    assert storage.download_offline("missing.wav") == {"error": "File not found"}
+
+def test_text_download_stays_text(storage):
+    storage.upload_offline("note.txt", "بسم الله")
+    assert storage.download_offline("note.txt") == {"content": "بسم الله"}
+
+def test_garbage_collection_frees_unreferenced_chunks(storage):
+    storage.upload_offline("x.bin", b"x" * 2048)
+    storage.delete_offline("x.bin")
+    assert storage.collect_garbage()["removed_chunks"] == 1  # both chunks had identical content
+
+def test_tampered_chunk_is_rejected(storage, tmp_path):
+    storage.upload_offline("t.wav", os.urandom(2048))
+    chunk_file = sorted((tmp_path / "chunks").glob("*/*"))[0]
+    data = bytearray(chunk_file.read_bytes())
+    data[10] ^= 1
+    chunk_file.write_bytes(bytes(data))
+    with pytest.raises(ChunkIntegrityError):
+        storage.read_range("t.wav", 0, 2048)
+    assert "error" in storage.download_offline("t.wav")
+
+def test_concurrent_atomic_writes_do_not_collide(tmp_path):
+    target = tmp_path / "shared"
+    payloads = [bytes([i]) * 65536 for i in range(8)]
+    threads = [threading.Thread(target=_atomic_write, args=(target, p)) for p in payloads]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert target.read_bytes() in payloads
+    assert [p.name for p in tmp_path.iterdir()] == ["shared"]
@@ -0,0 +1,52 @@
+import pytest
+
+pytest.importorskip("datasets")
+pytest.importorskip("transformers")
+
+from scripts.train_universal import build_training_args, load_corpus, tokenized_cache_key
+
+LABEL2ID = {"quran": 0, "hadith": 1, "general-islamic": 2}
+
+@pytest.fixture
+def csv_files(tmp_path):
+    (tmp_path / "quran").mkdir()
+    (tmp_path / "hadith").mkdir()
+    quran, hadith = tmp_path / "quran" / "verses.csv", tmp_path / "hadith" / "sahih.csv"
+    quran.write_text("text\nbismillah\nalhamdulillah\n")
+    hadith.write_text("text\ninnama al-a'mal\n")
+    return [str(quran), str(hadith)]
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_inferred_labels_follow_each_file(csv_files, streaming):
+    rows = list(load_corpus(csv_files, LABEL2ID, streaming=streaming))
+    assert [row["label"] for row in rows] == [0, 0, 1]
+
+def test_label_column_is_mapped_to_ids(tmp_path):
+    labeled = tmp_path / "labeled.csv"
+    labeled.write_text("text,label\na,hadith\nb,quran\n")
+    assert [row["label"] for row in load_corpus([str(labeled)], LABEL2ID)] == [1, 0]
+
+def test_unknown_label_names_file_and_value(tmp_path):
+    labeled = tmp_path / "labeled.csv"
+    labeled.write_text("text,label\na,tafsir\n")
+    with pytest.raises(ValueError, match="tafsir"):
+        list(load_corpus([str(labeled)], LABEL2ID, streaming=True))
+
+def test_cache_key_changes_with_label_mapping(csv_files):
+    class Tokenizer:
+        vocab = {"a": 0}
+    tokenizer = Tokenizer()
+    relabeled = {"quran": 1, "hadith": 0, "general-islamic": 2}
+    assert tokenized_cache_key(tokenizer, csv_files, 256, LABEL2ID) != \
+        tokenized_cache_key(tokenizer, csv_files, 256, relabeled)
+
+def test_training_args_group_by_length_and_evaluate(tmp_path):
+    args = build_training_args(str(tmp_path), evaluate=True)
+    assert args.eval_strategy == "epoch"
+    assert args.length_column_name == "length"
+    assert getattr(args, "train_sampling_strategy", None) == "group_by_length" or args.group_by_length
+
+def test_streaming_training_args_skip_grouping_and_evaluation(tmp_path):
+    args = build_training_args(str(tmp_path), streaming=True, evaluate=False, max_steps=10)
+    assert args.eval_strategy == "no" and args.max_steps == 10
+    assert getattr(args, "train_sampling_strategy", None) == "random" or not getattr(args, "group_by_length", False)
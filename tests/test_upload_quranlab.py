@@ -0,0 +1,49 @@
+import os
+
+from tools import upload_quranlab
+from tools.upload_quranlab import upload_quranlab_data
+
+DATASET = os.path.join("projects", "quranlab", "dataset")
+
+
+def _source(tmp_path):
+    src = tmp_path / "src"
+    (src / "audio" / "reciter").mkdir(parents=True)
+    (src / "metadata.csv").write_text("audio_path\naudio/reciter/a.wav\n")
+    (src / "audio" / "reciter" / "a.wav").write_bytes(b"RIFF")
+    return src
+
+
+def test_default_sync_never_shares_inodes_with_the_source(tmp_path):
+    src = _source(tmp_path)
+    repo = tmp_path / "repo"
+
+    report = upload_quranlab_data(str(src), str(repo))
+
+    assert "hardlink" not in report["methods"]
+    copied = repo / DATASET / "audio" / "reciter" / "a.wav"
+    assert copied.read_bytes() == b"RIFF"
+    assert not os.path.samefile(copied, src / "audio" / "reciter" / "a.wav")
+
+
+def test_hardlinks_are_opt_in(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_quranlab, "fcntl", None)  # as on a filesystem without reflinks
+    src = _source(tmp_path)
+    repo = tmp_path / "repo"
+
+    report = upload_quranlab_data(str(src), str(repo), hardlink=True)
+
+    assert report["methods"] == {"hardlink": 2}
+
+
+def test_deleting_the_last_file_prunes_its_directories(tmp_path):
+    src = _source(tmp_path)
+    repo = tmp_path / "repo"
+    upload_quranlab_data(str(src), str(repo))
+
+    os.remove(src / "audio" / "reciter" / "a.wav")
+    report = upload_quranlab_data(str(src), str(repo))
+
+    assert report["deleted"] == [os.path.join("audio", "reciter", "a.wav")]
+    assert not (repo / DATASET / "audio").exists()
+    assert (repo / DATASET / "metadata.csv").exists()
@@ -0,0 +1,134 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("huggingface_hub")
+import huggingface_hub.constants
+
+from scripts.upload_to_hf import PublishState, publish_folder
+
+REPO_ID = "ADANiD/test-model"
+
+
+class FakeHub(BaseHTTPRequestHandler):
+    """Just enough of the Hub API for preupload_lfs_files and create_commit (legacy LFS path)"""
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_GET(self):
+        hub = self.server.hub
+        if "/tree/" in self.path:
+            return self._json([{"type": "file", "path": path, "size": size, "oid": "0" * 40,
+                                "lfs": {"oid": oid, "size": size, "pointerSize": 130}}
+                               for path, (oid, size) in hub["tree"].items()])
+        self._json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        hub = self.server.hub
+        body = self._body()
+        if "/preupload/" in self.path:
+            files = json.loads(body)["files"]
+            hub["preuploaded"] += [f["path"] for f in files]
+            return self._json({"files": [{"path": f["path"], "uploadMode": "lfs", "shouldIgnore": False}
+                                         for f in files]})
+        if self.path.endswith("/info/lfs/objects/batch"):
+            objects = json.loads(body)["objects"]
+            return self._json({"transfer": "basic", "objects": [
+                {"oid": o["oid"], "size": o["size"]} if o["oid"] in hub["objects"] else
+                {"oid": o["oid"], "size": o["size"],
+                 "actions": {"upload": {"href": f"http://{self.headers['Host']}/upload/{o['oid']}"}}}
+                for o in objects
+            ]})
+        if "/commit/" in self.path:
+            if hub["fail_commits"]:
+                hub["fail_commits"] -= 1
+                return self._json({"error": "commit rejected"}, 400)
+            lines = [json.loads(line) for line in body.splitlines()]
+            files = {l["value"]["path"]: (l["value"]["oid"], l["value"]["size"]) for l in lines if l["key"] == "lfsFile"}
+            missing = [path for path, (oid, _) in files.items() if oid not in hub["objects"]]
+            if missing:
+                return self._json({"error": f"missing LFS objects for {missing}"}, 422)
+            hub["tree"].update(files)
+            hub["commits"] += 1
+            return self._json({"commitUrl": f"{hub['url']}/{REPO_ID}/commit/{hub['commits']}",
+                               "commitOid": f"{hub['commits']:040x}"})
+        self._json({"error": "not found"}, 404)
+
+    def do_PUT(self):
+        hub = self.server.hub
+        if self.path.startswith("/upload/"):
+            hub["objects"][self.path.rsplit("/", 1)[1]] = self._body()
+            hub["uploads"] += 1
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._json({"error": "not found"}, 404)
+
+
+@pytest.fixture
+def hub(monkeypatch):
+    monkeypatch.setattr(huggingface_hub.constants, "HF_HUB_DISABLE_XET", True)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeHub)
+    url = f"http://127.0.0.1:{server.server_port}"
+    server.hub = {"url": url, "tree": {}, "objects": {}, "preuploaded": [], "uploads": 0,
+                  "commits": 0, "fail_commits": 0}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.hub
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def folder(tmp_path):
+    folder = tmp_path / "model"
+    folder.mkdir()
+    for name in ("a.bin", "b.bin"):
+        (folder / name).write_bytes(os.urandom(2048))
+    return folder
+
+
+def _publish(hub, folder, tmp_path):
+    return publish_folder(REPO_ID, str(folder), endpoint=hub["url"], token="hf_test", workers=2,
+                          state_dir=str(tmp_path / "state"))
+
+
+def test_resume_after_failed_commit_skips_pushed_objects(hub, folder, tmp_path):
+    hub["fail_commits"] = 1
+    with pytest.raises(OSError):
+        _publish(hub, folder, tmp_path)
+    assert hub["uploads"] == 2
+    assert len(PublishState(REPO_ID, "model", str(tmp_path / "state")).data["uploaded"]) == 2
+
+    hub["preuploaded"].clear()
+    result = _publish(hub, folder, tmp_path)
+
+    assert hub["preuploaded"] == [] and hub["uploads"] == 2
+    assert sorted(result["changed"]) == ["a.bin", "b.bin"]
+    assert sorted(hub["tree"]) == ["a.bin", "b.bin"]
+    assert PublishState(REPO_ID, "model", str(tmp_path / "state")).data["uploaded"] == []
+
+
+def test_unchanged_folder_makes_no_commit(hub, folder, tmp_path):
+    _publish(hub, folder, tmp_path)
+
+    result = _publish(hub, folder, tmp_path)
+
+    assert result["changed"] == [] and result["commit"] is None
+    assert hub["commits"] == 1
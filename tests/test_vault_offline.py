@@ -0,0 +1,58 @@
+import hashlib
+import time
+
+import pytest
+
+from services.vault_offline import MAX_KEYS_PER_CALL, EntropyPool, OfflineVault
+
+DIGESTS = [hashlib.sha256(str(i).encode()).digest() for i in range(5)]
+REFS = [(None, None, i) for i in range(5)]
+
+@pytest.fixture
+def pool():
+    pool = EntropyPool(DIGESTS, REFS, size=8, refill_below=0.5)
+    yield pool
+    pool.close()
+
+@pytest.fixture
+def vault(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    vault = OfflineVault(pool_size=16)
+    yield vault
+    vault.close()
+
+def _wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_pool_refills_after_dropping_below_threshold(pool):
+    pool.take(5)
+    assert _wait_until(lambda: pool.metrics()["available"] == 8)
+    assert pool.metrics()["low_water_mark"] == 3
+    assert pool.refills >= 2
+
+def test_exhausted_pool_mixes_inline_without_blocking(pool):
+    started = time.monotonic()
+    blocks = pool.take(20)
+    assert time.monotonic() - started < 1.0
+    assert len(blocks) == 20
+    assert pool.metrics()["inline_blocks"] == 12
+
+def test_issued_keys_are_distinct(vault):
+    keys = vault.issue_keys_offline(64, "session")["keys"]
+    assert len(set(keys)) == 64
+    assert all(len(key) == 64 for key in keys)
+
+def test_count_is_clamped_and_accepts_digit_strings(vault):
+    assert vault.issue_keys_offline(10 ** 9)["count"] == MAX_KEYS_PER_CALL
+    assert vault.issue_keys_offline("3")["count"] == 3
+
+@pytest.mark.parametrize("count", [0, -5, 1.5, "many", None, True, [2]])
+def test_bad_count_returns_error(vault, count):
+    assert "error" in vault.issue_keys_offline(count)
+
+@pytest.mark.parametrize("purpose", [None, 7, "", "x" * 17])
+def test_bad_purpose_returns_error(vault, purpose):
+    assert "error" in vault.issue_keys_offline(1, purpose)
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from src.core.verse_index import VerseIndex
+
+CSV = "surah,ayah,arabic_text,abjad_sum\n1,1,بسم الله الرحمن الرحيم,786\n112,1,قل هو الله احد,0\n"
+
+
+def test_rebuild_survives_leftovers_of_an_interrupted_build(tmp_path):
+    source = tmp_path / "quran_abjad.csv"
+    source.write_text(CSV, encoding="utf-8")
+    out = tmp_path / "verse_index"
+    VerseIndex.build(str(source), str(out))
+    for leftover in ("verse_index.old", "verse_index.tmp"):
+        (tmp_path / leftover / "nested").mkdir(parents=True)
+        (tmp_path / leftover / "stale.npy").write_bytes(b"stale")
+
+    index = VerseIndex.build(str(source), str(out))
+
+    assert len(index) == 2
+    assert not (tmp_path / "verse_index.old").exists()
+    assert not (tmp_path / "verse_index.tmp").exists()
+    assert not (out / "stale.npy").exists()
+
+
+# Two ayahs share the value 66; nothing in the fixture is worth 1000
+FIXTURE = (
+    "surah,ayah,arabic_text,abjad_sum\n"
+    "1,1,بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ,786\n"
+    "112,1,قل هو الله احد,0\n"
+    "112,2,الله,66\n"
+    "2,255,الله,66\n"
+    "112,4,احد,13\n"
+)
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    source = tmp_path / "quran_abjad.csv"
+    source.write_text(FIXTURE, encoding="utf-8")
+    out = tmp_path / "verse_index"
+    VerseIndex.build(str(source), str(out), use_csv_values=True)
+    return out
+
+
+def test_build_stores_every_ayah(index_dir):
+    index = VerseIndex(str(index_dir))
+
+    assert len(index) == 5
+    assert index.verse(4) == {"surah": 112, "ayah": 4, "abjad_value": 13, "text": "احد"}
+
+
+def test_reopened_index_is_memory_mapped(index_dir):
+    index = VerseIndex(str(index_dir))
+
+    for name in VerseIndex.ARRAYS:
+        assert isinstance(getattr(index, name), np.memmap)
+    assert index.meta["values"] == "csv"
+
+
+def test_value_with_several_ayahs_returns_all_of_them(index_dir):
+    matches = VerseIndex(str(index_dir)).by_value(66)
+
+    assert sorted((m["surah"], m["ayah"]) for m in matches) == [(2, 255), (112, 2)]
+
+
+def test_value_with_no_ayah_returns_empty(index_dir):
+    index = VerseIndex(str(index_dir))
+
+    assert index.by_value(1000) == []
+    assert index.in_range(14, 65) == []
+
+
+def test_range_and_text_lookup(index_dir):
+    index = VerseIndex(str(index_dir))
+
+    assert [m["abjad_value"] for m in index.in_range(0, 66)] == [0, 13, 66, 66]
+    assert [(m["surah"], m["ayah"]) for m in index.match_text("قل  هو الله احد")] == [(112, 1)]
+    assert index.validate_bismillah("بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ")
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Audio Feature Cache for the QuranLab recitation dataset
+Extracts Whisper log-mel features once, on a process pool, into sharded memory-mapped arrays
+"""
+
+import argparse
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+FEATURE_MODEL = "tarteel-ai/whisper-base-ar-quran"
+DEFAULT_CACHE_PATH = "offline/offline_cache/audio_features"
+SHARD_SIZE = 1024
+AUDIO_COLUMNS = ("audio_path", "audio_file")
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac", ".ogg", ".m4a")
+INDEX_VERSION = 1
+
+# ==============================
+# EXTRACTION (worker processes)
+# ==============================
+_extractor = None
+
+def _init_worker(model_id):
+    global _extractor
+    from transformers import WhisperFeatureExtractor
+    _extractor = WhisperFeatureExtractor.from_pretrained(model_id)
+
+def _extract(audio_path, resolved_path, shard_file, row, dtype):
+    """Decode one file and write its features straight into its shard slot
+
+    Whisper features cover a fixed window (30 s); longer files are rejected
+    rather than silently truncated to it.
+    """
+    import librosa
+    try:
+        audio, _ = librosa.load(resolved_path, sr=SAMPLE_RATE, mono=True)
+        duration = len(audio) / SAMPLE_RATE
+        if len(audio) > _extractor.n_samples:
+            return audio_path, duration, (f"too long: {duration:.1f}s exceeds the "
+                                          f"{_extractor.chunk_length}s feature window")
+        features = _extractor(audio, sampling_rate=SAMPLE_RATE, return_tensors="np").input_features[0]
+        shard = np.load(shard_file, mmap_mode="r+")
+        shard[row] = features.astype(dtype)
+        shard.flush()
+        return audio_path, duration, None
+    except Exception as e:
+        return audio_path, None, f"{type(e).__name__}: {e}"
+
+# ==============================
+# CACHE
+# ==============================
+class AudioFeatureCache:
+    """Whisper input features keyed by audio_path.
+
+    features-00000.npy ...  shards of SHARD_SIZE x n_mels x n_frames
+    index.json              audio_path -> shard, row, duration, source path/size/mtime;
+                            rows freed by failed re-extractions are reused
+
+    Reads are np.load(mmap_mode="r") slices, so an epoch over cached audio
+    costs page-cache reads instead of decoding and resampling every file.
+    lookup() finds features by the file on disk instead, for consumers such
+    as the QuranLab batch pipeline that only know resolved paths.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = Path(path)
+        index_file = self.path / "index.json"
+        if index_file.exists():
+            with open(index_file, "r") as f:
+                self.index = json.load(f)
+            if self.index.get("version") != INDEX_VERSION:
+                raise ValueError(f"Unsupported feature cache version {self.index.get('version')} at {self.path}")
+        else:
+            self.index = {"version": INDEX_VERSION, "model": None, "dtype": None,
+                          "shape": None, "shards": 0, "next_row": SHARD_SIZE, "entries": {}}
+        self.index.setdefault("free", [])
+        self._shards = {}
+        self._by_source = None
+
+    def __contains__(self, audio_path):
+        return audio_path in self.index["entries"]
+
+    def __len__(self):
+        return len(self.index["entries"])
+
+    def _shard(self, shard: int):
+        if shard not in self._shards:
+            self._shards[shard] = np.load(self.path / f"features-{shard:05d}.npy", mmap_mode="r")
+        return self._shards[shard]
+
+    def get(self, audio_path: str) -> np.ndarray:
+        """Features for one file as a read-only view into its shard"""
+        entry = self.index["entries"][audio_path]
+        return self._shard(entry["shard"])[entry["row"]]
+
+    def lookup(self, source_path: str):
+        """Features for the file at source_path, or None if it is not cached or changed since"""
+        if self._by_source is None:
+            self._by_source = {e["source"]: p for p, e in self.index["entries"].items() if "source" in e}
+        audio_path = self._by_source.get(os.path.abspath(source_path))
+        if audio_path is None:
+            return None
+        entry = self.index["entries"][audio_path]
+        try:
+            stat = os.stat(source_path)
+        except OSError:
+            return None
+        if entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+            return None
+        return self.get(audio_path)
+
+    def get_batch(self, audio_paths) -> np.ndarray:
+        return np.stack([self.get(p) for p in audio_paths]).astype(np.float32)
+
+    def _save_index(self):
+        tmp = self.path / "index.json.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.index, f)
+        os.replace(tmp, self.path / "index.json")
+
+    def _allocate(self, count: int, shape, dtype):
+        """Reserve count rows, freed rows first, then opening new shards as needed; returns (shard, row) slots"""
+        slots = []
+        while self.index["free"] and len(slots) < count:
+            slots.append(tuple(self.index["free"].pop()))
+        for _ in range(count - len(slots)):
+            if self.index["next_row"] >= SHARD_SIZE:
+                np.lib.format.open_memmap(self.path / f"features-{self.index['shards']:05d}.npy",
+                                          mode="w+", dtype=dtype, shape=(SHARD_SIZE, *shape))
+                self.index["shards"] += 1
+                self.index["next_row"] = 0
+            slots.append((self.index["shards"] - 1, self.index["next_row"]))
+            self.index["next_row"] += 1
+        return slots
+
+    def build(self, audio_paths: dict, model_id: str = FEATURE_MODEL, workers: int = None,
+              dtype: str = "float16") -> dict:
+        """Extract features for {audio_path: file on disk}; unchanged files are skipped"""
+        from transformers import WhisperFeatureExtractor
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        if self.index["model"] not in (None, model_id) or self.index["dtype"] not in (None, dtype):
+            raise ValueError(f"{self.path} holds {self.index['model']} {self.index['dtype']} features; "
+                             f"use another cache path for {model_id} {dtype}")
+        extractor = WhisperFeatureExtractor.from_pretrained(model_id)
+        shape = (extractor.feature_size, extractor.nb_max_frames)
+        self.index.update(model=model_id, dtype=dtype, shape=list(shape))
+
+        todo, errors = {}, {}
+        for audio_path, resolved in audio_paths.items():
+            if not os.path.exists(resolved):
+                errors[audio_path] = f"missing: {resolved}"
+                continue
+            stat = os.stat(resolved)
+            entry = self.index["entries"].get(audio_path)
+            if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                continue
+            todo[audio_path] = (resolved, stat)
+
+        # A changed file is re-extracted into the row it already owns
+        owned = {p: (e["shard"], e["row"]) for p in todo if (e := self.index["entries"].get(p))}
+        fresh = iter(self._allocate(len(todo) - len(owned), shape, dtype))
+        slots = [owned[p] if p in owned else next(fresh) for p in todo]
+        self._save_index()
+        skipped = len(audio_paths) - len(todo) - len(errors)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_id,)) as pool:
+            futures = {
+                pool.submit(_extract, audio_path, resolved, str(self.path / f"features-{shard:05d}.npy"), row, dtype):
+                    (audio_path, stat, shard, row)
+                for (audio_path, (resolved, stat)), (shard, row) in zip(todo.items(), slots)
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                audio_path, stat, shard, row = futures[future]
+                _, duration, error = future.result()
+                if error:
+                    errors[audio_path] = error
+                    self.index["entries"].pop(audio_path, None)  # never serve features of an older version
+                    self.index["free"].append([shard, row])
+                    continue
+                self.index["entries"][audio_path] = {
+                    "shard": shard, "row": row, "duration": round(duration, 3),
+                    "source": os.path.abspath(todo[audio_path][0]),
+                    "size": stat.st_size, "mtime_ns": stat.st_mtime_ns
+                }
+                if done % 256 == 0:
+                    self._save_index()  # progress survives an interrupted run
+        self._save_index()
+        self._shards.clear()
+        self._by_source = None
+        extracted = sum(audio_path not in errors for audio_path in todo)
+        return {"extracted": extracted, "skipped": skipped, "errors": errors, "cached": len(self)}
+
+# ==============================
+# INPUTS
+# ==============================
+def collect_audio(sources, audio_root: str = None) -> dict:
+    """{audio_path as written in the CSV (or relative to the directory): file on disk}"""
+    found = {}
+    for source in sources:
+        if os.path.isdir(source):
+            for root, _, files in os.walk(source):
+                for f in sorted(files):
+                    if f.lower().endswith(AUDIO_EXTENSIONS):
+                        full = os.path.join(root, f)
+                        found[os.path.relpath(full, source)] = full
+            continue
+        base = audio_root or os.path.dirname(source)
+        with open(source, "r", encoding="utf-8", newline="") as f:
+            reader = csv.DictReader(f)
+            column = next((c for c in AUDIO_COLUMNS if c in (reader.fieldnames or [])), None)
+            if column is None:
+                raise ValueError(f"{source} has none of the columns {', '.join(AUDIO_COLUMNS)}")
+            for row in reader:
+                audio_path = row[column]
+                if audio_path:
+                    found[audio_path] = audio_path if os.path.isabs(audio_path) else os.path.join(base, audio_path)
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute Whisper log-mel features for recitation audio")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Extract features for new or changed audio")
+    build.add_argument("sources", nargs="+", help="Dataset CSVs (audio_path/audio_file column) or audio directories")
+    build.add_argument("--audio-root", help="Directory CSV audio paths are relative to (default: the CSV's directory)")
+    build.add_argument("--cache", default=DEFAULT_CACHE_PATH)
+    build.add_argument("--model", default=FEATURE_MODEL)
+    build.add_argument("--workers", type=int, help="Extraction processes (default: all CPUs)")
+    build.add_argument("--dtype", default="float16", choices=["float16", "float32"])
+    stats = sub.add_parser("stats", help="Summarize the cache")
+    stats.add_argument("--cache", default=DEFAULT_CACHE_PATH)
+    args = parser.parse_args()
+
+    cache = AudioFeatureCache(args.cache)
+    if args.command == "stats":
+        entries = cache.index["entries"].values()
+        print(json.dumps({"files": len(cache), "shards": cache.index["shards"], "free_rows": len(cache.index["free"]),
+                          "model": cache.index["model"],
+                          "hours": round(sum(e["duration"] for e in entries) / 3600, 2)}, indent=2))
+        return
+
+    report = cache.build(collect_audio(args.sources, args.audio_root), args.model, args.workers, args.dtype)
+    for audio_path, error in report["errors"].items():
+        print(f"⚠️ {audio_path}: {error}")
+    print(f"✅ Extracted {report['extracted']}, skipped {report['skipped']} unchanged; {report['cached']} files cached")
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,187 @@
+import argparse
+import errno
+import hashlib
+import json
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-def upload_quranlab_data(local_data_dir: str, opencloud_repo: str = "."):
-    """Upload QuranLab dataset to ADANiD OpenCloud structure."""
+try:
+    import fcntl
+except ImportError:  # Windows: no reflinks, copies only
+    fcntl = None
+
+MANIFEST_NAME = ".sync_manifest.json"
+SYNC_ITEMS = ["metadata.csv", "audio", "labels"]
+FICLONE = 0x40049409  # Linux ioctl: copy-on-write clone (btrfs, XFS, ...)
+
+def _sha256(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _scan(local_data_dir):
+    """{relative path: os.stat_result} for every file that is synced"""
+    files = {}
+    for item in SYNC_ITEMS:
+        src = os.path.join(local_data_dir, item)
+        if os.path.isfile(src):
+            files[item] = os.stat(src)
+        for root, _, names in os.walk(src):
+            for name in names:
+                full = os.path.join(root, name)
+                files[os.path.relpath(full, local_data_dir)] = os.stat(full)
+    return files
+
+def _load_manifest(dest):
+    path = dest / MANIFEST_NAME
+    if path.exists():
+        with open(path, "r") as f:
+            return json.load(f)
+    return {}
+
+def _save_manifest(dest, manifest):
+    tmp = dest / f"{MANIFEST_NAME}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, dest / MANIFEST_NAME)
+
+def _place(src, dst, hardlink=False):
+    """Put src at dst: reflink where the filesystem supports it, else a real copy.
+
+    hardlink=True tries a hardlink before copying. Hardlinks share the inode
+    with the source archive, so an in-place edit of either side changes both;
+    only use them when the source files are never modified.
+    """
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".{dst.name}.sync")
+    if tmp.exists():
+        tmp.unlink()
+    if fcntl is not None:
+        try:
+            with open(src, "rb") as s, open(tmp, "wb") as d:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            shutil.copystat(src, tmp)
+            os.replace(tmp, dst)
+            return "reflink"
+        except OSError:
+            tmp.unlink(missing_ok=True)
+    if hardlink:
+        try:
+            os.link(src, tmp)
+            os.replace(tmp, dst)
+            return "hardlink"
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+    shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+    return "copy"
+
+def _prune_empty_dirs(dest, rel):
+    """Remove the directories above dest/rel that the deletion left empty, up to dest"""
+    parent = (dest / rel).parent
+    while parent != dest and dest in parent.parents:
+        try:
+            parent.rmdir()
+        except OSError:
+            return  # not empty (or already gone)
+        parent = parent.parent
+
+def plan_sync(local_data_dir, dest, checksum=False, workers=8):
+    """Diff the source tree against the manifest of the last sync.
+
+    Files whose size and mtime match the manifest are unchanged without
+    being read; everything else is hashed (on the thread pool) so a touched
+    but identical file is not copied again. checksum=True hashes every file.
+    """
+    manifest = _load_manifest(dest)
+    files = _scan(local_data_dir)
+    plan = {"added": [], "changed": [], "deleted": [], "unchanged": [], "touched": {}}
+
+    to_hash = []
+    for rel, st in files.items():
+        entry = manifest.get(rel)
+        if entry is None or not (dest / rel).exists():
+            plan["added" if entry is None else "changed"].append(rel)
+        elif checksum or entry["size"] != st.st_size or entry["mtime_ns"] != st.st_mtime_ns:
+            to_hash.append(rel)
+        else:
+            plan["unchanged"].append(rel)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        digests = dict(zip(to_hash, pool.map(lambda rel: _sha256(os.path.join(local_data_dir, rel)), to_hash)))
+    for rel, digest in digests.items():
+        if digest == manifest[rel]["sha256"]:
+            plan["unchanged"].append(rel)
+            plan["touched"][rel] = digest
+        else:
+            plan["changed"].append(rel)
+
+    plan["deleted"] = sorted(set(manifest) - set(files))
+    plan["bytes"] = sum(files[rel].st_size for rel in plan["added"] + plan["changed"])
+    plan["files"], plan["manifest"], plan["digests"] = files, manifest, digests
+    return plan
+
+def upload_quranlab_data(local_data_dir: str, opencloud_repo: str = ".", dry_run: bool = False,
+                         workers: int = 8, hardlink: bool = False, checksum: bool = False):
+    """Sync QuranLab dataset into the ADANiD OpenCloud structure, copying only what changed."""
     dest = Path(opencloud_repo) / "projects" / "quranlab" / "dataset"
     dest.mkdir(parents=True, exist_ok=True)
-    
-    # Copy metadata
-    shutil.copy(os.path.join(local_data_dir, "metadata.csv"), dest)
-    
-    # Copy audio and labels
-    for folder in ["audio", "labels"]:
-        src = os.path.join(local_data_dir, folder)
-        if os.path.exists(src):
-            shutil.rmtree(dest / folder, ignore_errors=True)
-            shutil.copytree(src, dest / folder)
-    
-    print("✅ QuranLab data uploaded to OpenCloud!")
+    plan = plan_sync(local_data_dir, dest, checksum=checksum, workers=workers)
+    report = {key: plan[key] for key in ("added", "changed", "deleted")}
+    report.update(unchanged=len(plan["unchanged"]), bytes=plan["bytes"])
+
+    if dry_run:
+        for key, mark in (("added", "+"), ("changed", "~"), ("deleted", "-")):
+            for rel in sorted(plan[key]):
+                print(f"{mark} {rel}")
+        print(f"🔍 Dry run: {len(plan['added'])} added, {len(plan['changed'])} changed, "
+              f"{len(plan['deleted'])} deleted, {report['unchanged']} unchanged ({plan['bytes']} bytes to copy)")
+        return report
+
+    files, manifest, digests = plan["files"], plan["manifest"], plan["digests"]
+
+    def sync_one(rel):
+        src = os.path.join(local_data_dir, rel)
+        digest = digests.get(rel) or _sha256(src)
+        return rel, digest, _place(src, dest / rel, hardlink)
+
+    methods = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for rel, digest, method in pool.map(sync_one, plan["added"] + plan["changed"]):
+            st = files[rel]
+            manifest[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+            methods[method] = methods.get(method, 0) + 1
+    for rel, digest in plan["touched"].items():
+        st = files[rel]
+        manifest[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+    for rel in plan["deleted"]:
+        (dest / rel).unlink(missing_ok=True)
+        del manifest[rel]
+        _prune_empty_dirs(dest, rel)
+    _save_manifest(dest, manifest)
+
+    report["methods"] = methods
+    print(f"✅ QuranLab data synced to OpenCloud: {len(plan['added'])} added, {len(plan['changed'])} changed, "
+          f"{len(plan['deleted'])} deleted, {report['unchanged']} unchanged")
+    return report
 
 # Usage:
 # upload_quranlab_data("/path/to/your/local/quranlab_dataset")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync a local QuranLab dataset into OpenCloud")
+    parser.add_argument("local_data_dir")
+    parser.add_argument("--repo", default=".", help="OpenCloud repository root")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be copied or deleted")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--hardlink", action="store_true",
+                        help="Hardlink files the filesystem cannot reflink (only if sources are never edited in place)")
+    parser.add_argument("--checksum", action="store_true", help="Hash every file, even when size and mtime match")
+    args = parser.parse_args()
+    upload_quranlab_data(args.local_data_dir, args.repo, dry_run=args.dry_run,
+                         workers=args.workers, hardlink=args.hardlink, checksum=args.checksum)